@@ -1,5 +1,15 @@
-import pandas as pd
+import argparse
+import os
 import re
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# the server package, for the columnar snapshot writer
+WEBAPP_DIR = Path(__file__).resolve().parents[1] / "webapp"
 
 COLUMN_RENAME = {"Name of the NBS intervention (short English title)": "intervention_name",
                  "City": "city",
@@ -41,10 +51,12 @@ def split_range_column(df, column_name, new_col_1, new_col_2, delimiter=" - "):
         print(f"column {column_name} not found")
         return df
 
+    # n=1 + reindex: always two columns, even for a chunk where no cell has the delimiter
     split_col = (
         df[column_name]
         .astype(str)
-        .str.split(delimiter, expand=True)
+        .str.split(delimiter, n=1, expand=True)
+        .reindex(columns=[0, 1])
         .apply(lambda col: col.str.strip())
     )
 
@@ -63,17 +75,17 @@ def fill_empty(df, column_name, replacement="Unknown"):
         print(f"column {column_name} not found")
         return df
 
-    df[column_name] = (
-        df[column_name]
-        .astype(str)
-        .str.strip()
-        .replace({"": replacement, "nan": replacement, "None": replacement})
-        .fillna(replacement)
-    )
+    df[column_name] = _blank_to(df[column_name], replacement)
 
     return df
 
 
+def _blank_to(values, replacement="Unknown"):
+    """Stripped strings with "", "nan" and "None" (what NaN / None become under astype(str)) replaced."""
+    s = values.astype(str).str.strip()
+    return s.where(~s.isin(["", "nan", "None"]), replacement)
+
+
 def clean_column(df, column_name, new_column_name, replacements):
     if column_name not in df.columns:
         print(f"column {column_name} not found")
@@ -128,6 +140,10 @@ def ensure_begin_before_end(df, begin_col="Begin", end_col="End"):
     df = fill_with_numeric_median(df, begin_col)
     df = fill_with_numeric_median(df, end_col)
 
+    return _swap_reversed(df, begin_col, end_col)
+
+
+def _swap_reversed(df, begin_col, end_col):
     mask = df[begin_col] > df[end_col]
     if mask.any():
         tmp = df.loc[mask, begin_col].copy()
@@ -147,9 +163,7 @@ def fill_unknown_other_columns(df, exclude=None):
             continue
 
         if df[col].dtype == object:
-            s = df[col].astype(str).str.strip()
-            s = s.replace({"": "Unknown", "nan": "Unknown", "None": "Unknown"})
-            df[col] = s.fillna("Unknown")
+            df[col] = _blank_to(df[col])
 
     return df
 
@@ -195,13 +209,43 @@ def parse_cost_to_number(val):
     return pd.NA
 
 
+_NUM = r"[\d,.]+"
+
+
+def _tokens_to_float(tokens):
+    return pd.to_numeric(tokens.str.replace(",", "", regex=False), errors="coerce")
+
+
+def parse_cost_column(values):
+    """
+    Vectorized parse_cost_to_number over a column (same numbers, NaN for missing).
+    Each distinct cell is parsed once with str.extract; cost answers are a handful
+    of ranges, so this is a few regex calls whatever the row count.
+    """
+    codes, uniques = pd.factorize(values)
+    s = pd.Series(uniques, dtype=object).astype(str).str.replace("€", "", regex=False).str.strip()
+    lower = s.str.lower()
+
+    first = _tokens_to_float(s.str.extract(f"({_NUM})", expand=False))
+    second = _tokens_to_float(s.str.extract(f"{_NUM}[^\\d,.]+({_NUM})", expand=False))
+    last = _tokens_to_float(s.str.extract(f"({_NUM})[^\\d,.]*$", expand=False))
+
+    parsed = first.where(second.isna(), (first + second) / 2.0)
+    parsed = parsed.where(~lower.str.startswith("more than"), last)
+    parsed = parsed.where((s != "") & (lower != "unknown"))
+
+    out = parsed.to_numpy(dtype=float)[codes]
+    out[codes < 0] = np.nan
+    return pd.Series(out, index=values.index)
+
+
 def fill_cost_with_median(df, column_name="Total cost €"):
     """Parse cost strings/ranges to numbers and fill missing with the median."""
     if column_name not in df.columns:
         print(f"column {column_name} not found")
         return df
 
-    numeric = df[column_name].apply(parse_cost_to_number)
+    numeric = parse_cost_column(df[column_name])
     median_val = numeric.median()
 
     if pd.isna(median_val):
@@ -214,35 +258,48 @@ def fill_cost_with_median(df, column_name="Total cost €"):
 
 # ---------- main cleaning pipeline ----------
 
-def clean_dataset(
-        input_csv,
-        output_file,
-        rem_col=None,
-        split_col=None,
-        clean_custom_column=None,
-        blank_col=None):
+# filled with medians rather than "Unknown"
+NUMERIC_COLUMNS = ["Begin", "End", "NBS area (m2)", "Total cost €"]
 
-    # Only read the 'Worksheet' sheet
-    df = pd.read_excel(input_csv, sheet_name="Worksheet")
 
+def apply_row_steps(df, rem_col=None, split_col=None, clean_custom_column=None, blank_col=None, verbose=True):
+    """The steps that only look at one row at a time (safe to run chunk by chunk)."""
     if rem_col:
         df = remove_columns(df, rem_col)
-        print(f"dropped columns:{rem_col}")
+        if verbose:
+            print(f"dropped columns:{rem_col}")
 
     if split_col:
         for col, (new1, new2) in split_col.items():
             df = split_range_column(df, col, new1, new2)
-            print(f"split column {col} into {new1} and {new2}_*columns")
+            if verbose:
+                print(f"split column {col} into {new1} and {new2}_*columns")
 
     if blank_col:
         for col in blank_col:
             df = fill_empty(df, col)
-            print("filled blank")
+            if verbose:
+                print("filled blank")
 
     if clean_custom_column:
         for col, (newcol, rules) in clean_custom_column.items():
             df = clean_column(df, col, newcol, rules)
 
+    return df
+
+
+def clean_dataset(
+        input_csv,
+        output_file,
+        rem_col=None,
+        split_col=None,
+        clean_custom_column=None,
+        blank_col=None):
+
+    # Only read the 'Worksheet' sheet
+    df = pd.read_excel(input_csv, sheet_name="Worksheet")
+
+    df = apply_row_steps(df, rem_col, split_col, clean_custom_column, blank_col)
 
     # 1. Begin & End: replace categorical/non-numeric with median and ensure Begin <= End
     df = ensure_begin_before_end(df, begin_col="Begin", end_col="End")
@@ -254,10 +311,7 @@ def clean_dataset(
     df = fill_cost_with_median(df, "Total cost €")
 
     # 4. For all other columns, change empty cells to 'Unknown'
-    df = fill_unknown_other_columns(
-        df,
-        exclude=["Begin", "End", "NBS area (m2)", "Total cost €"]
-    )
+    df = fill_unknown_other_columns(df, exclude=NUMERIC_COLUMNS)
 
     # 5. Rename columns for better use in code
     df = rename_columns(df, COLUMN_RENAME)
@@ -268,34 +322,193 @@ def clean_dataset(
     return df
 
 
+# ---------- streaming pipeline ----------
+
+def iter_excel_chunks(path, sheet_name="Worksheet", chunksize=10_000):
+    """
+    Yield the sheet as DataFrames of `chunksize` rows, parsed row by row by openpyxl
+    in read-only mode (the workbook is never held in memory). Cells come out the way
+    pd.read_excel gives them: integral floats as int, the first row as the header,
+    trailing empty rows dropped.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        width = len(columns)
+        empty = (None,) * width
+
+        buf, blank = [], 0
+        for row in rows:
+            if all(v is None for v in row):
+                blank += 1  # kept only if a non-empty row follows
+                continue
+            buf.extend([empty] * blank)
+            blank = 0
+            row = tuple(int(v) if isinstance(v, float) and v.is_integer() else v for v in row[:width])
+            buf.append(row + empty[len(row):])
+            if len(buf) >= chunksize:
+                yield pd.DataFrame.from_records(buf, columns=columns).infer_objects()
+                buf = []
+        if buf:
+            yield pd.DataFrame.from_records(buf, columns=columns).infer_objects()
+    finally:
+        wb.close()
+
+
+def _numeric_pass(chunk, column_name):
+    if column_name == "Total cost €":
+        return parse_cost_column(chunk[column_name])
+    return pd.to_numeric(chunk[column_name], errors="coerce")
+
+
+def clean_dataset_streaming(
+        input_xlsx,
+        output_csv,
+        rem_col=None,
+        split_col=None,
+        clean_custom_column=None,
+        blank_col=None,
+        chunksize=10_000,
+        snapshot_dir=None):
+    """
+    clean_dataset for exports too large to hold in memory, writing CSV instead of .xlsx.
+
+    Pass 1 streams the workbook in row chunks, runs the row-local steps, parses
+    Begin / End / area / cost to numbers and spills each chunk to a temporary CSV;
+    only those numeric columns (8 bytes per row each) are kept for the medians.
+    Pass 2 re-reads the spill in chunks, fills the medians, orders Begin <= End,
+    fills "Unknown" and appends to `output_csv` (replaced atomically at the end).
+
+    `snapshot_dir` also writes the server's columnar snapshot of the result.
+    Returns the number of rows written.
+    """
+    output_csv = Path(output_csv)
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=output_csv.parent) as tmp:
+        spill = Path(tmp) / "pass1.csv"
+        numeric = {}
+        numeric_other = None  # other columns numeric in every chunk so far (read_excel would type them)
+        n_rows = 0
+
+        for i, chunk in enumerate(iter_excel_chunks(input_xlsx, chunksize=chunksize)):
+            chunk = apply_row_steps(chunk, rem_col, split_col, clean_custom_column, blank_col, verbose=i == 0)
+            for col in NUMERIC_COLUMNS:
+                if col in chunk.columns:
+                    chunk[col] = _numeric_pass(chunk, col)
+                    numeric.setdefault(col, []).append(chunk[col].to_numpy(dtype=float))
+
+            typed = {c for c in chunk.columns
+                     if c not in numeric and (pd.api.types.is_numeric_dtype(chunk[c]) or chunk[c].isna().all())}
+            numeric_other = typed if numeric_other is None else numeric_other & typed
+
+            chunk.to_csv(spill, mode="a", header=i == 0, index=False)
+            n_rows += len(chunk)
+
+        if n_rows == 0:
+            print("no rows to clean")
+            return 0
+
+        # exact medians from the numeric columns alone
+        medians, as_int = {}, {}
+        for col, parts in numeric.items():
+            values = np.concatenate(parts)
+            present = values[~np.isnan(values)]
+            if len(present) == 0:
+                print(f"Warning: cannot compute median for {col}")
+                continue
+            medians[col] = float(np.median(present))
+            # what a round trip through .xlsx would give: whole numbers come back as int
+            as_int[col] = bool(np.all(np.mod(present, 1) == 0)) and float(medians[col]).is_integer()
+            print(f"median {col}: {medians[col]}")
+        del numeric
+
+        out_tmp = Path(tmp) / output_csv.name
+        reader = pd.read_csv(spill, dtype=str, keep_default_na=False, chunksize=chunksize)
+        for i, chunk in enumerate(reader):
+            for col in chunk.columns:
+                if col in medians:
+                    chunk[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(medians[col])
+                    if as_int[col]:
+                        chunk[col] = chunk[col].astype(np.int64)
+                elif col in NUMERIC_COLUMNS or col in numeric_other:
+                    chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+            if "Begin" in medians and "End" in medians:
+                chunk = _swap_reversed(chunk, "Begin", "End")
+
+            chunk = fill_unknown_other_columns(chunk, exclude=NUMERIC_COLUMNS)
+            chunk = rename_columns(chunk, COLUMN_RENAME) if i == 0 else chunk.rename(columns=COLUMN_RENAME)
+            chunk.to_csv(out_tmp, mode="a", header=i == 0, index=False)
+
+        os.replace(out_tmp, output_csv)
+    print(f"saved {n_rows} rows to {output_csv}")
+
+    if snapshot_dir:
+        sys.path.insert(0, str(WEBAPP_DIR))
+        from recommenderSystem.snapshot import write_snapshot
+
+        write_snapshot(pd.read_csv(output_csv), snapshot_dir, source=output_csv)
+        print(f"wrote columnar snapshot to {snapshot_dir}")
+
+    return n_rows
+
+
+# ---------- command line ----------
+
+DROP_COLUMNS = [
+    "Native title of the NBS intervention", "City population", "Primary Beneficiaries",
+    "Please specify the roles of the specific government and non-government actor groups involved in the initiative",
+    "NBS intervention implemented in response to a national regulations/strategy/plan",
+    "NBS intervention implemented in response to a local regulation/strategy/plan",
+    "NBS intervention implemented in response to an EU Directive/Strategy",
+    "Type of fund(s) used",
+    "Type of non-financial contribution",
+    "Who provided the non-financial contribution?",
+    "Type of reported impacts",
+    "Presence of formal monitoring system",
+    "Presence of indicators used in reporting",
+    "Presence of monitoring/evaluation reports",
+    "Availability of a web-based monitoring tool",
+    "List of references", "Last updated"
+]
+SPLIT_COLUMNS = {"Duration": ("Begin", "End")}
+CUSTOM_COLUMNS = {
+    "NBS area": ("NBS area (m2)", [(r"[^0-9.]", "")]),
+    "Total cost": ("Total cost €", [])  # keep raw strings; we'll parse later
+}
+
+
 if __name__ == "__main__":
 
-    cleaned_df = clean_dataset(
-        input_csv="data/nbs-xls-export 20251119.xlsx",
-        output_file="data/cleaned.xlsx",
-        rem_col=[
-            "Native title of the NBS intervention", "City population", "Primary Beneficiaries",
-            "Please specify the roles of the specific government and non-government actor groups involved in the initiative",
-            "NBS intervention implemented in response to a national regulations/strategy/plan",
-            "NBS intervention implemented in response to a local regulation/strategy/plan",
-            "NBS intervention implemented in response to an EU Directive/Strategy",
-            "Type of fund(s) used",
-            "Type of non-financial contribution",
-            "Who provided the non-financial contribution?",
-            "Type of reported impacts",
-            "Presence of formal monitoring system",
-            "Presence of indicators used in reporting",
-            "Presence of monitoring/evaluation reports",
-            "Availability of a web-based monitoring tool",
-            "List of references", "Last updated"
-        ],
-        split_col={"Duration": ("Begin", "End")},
-        clean_custom_column={
-            "NBS area": ("NBS area (m2)", [(r"[^0-9.]", "")]),
-            "Total cost": ("Total cost €", [])  # keep raw strings; we'll parse later
-        },
+    parser = argparse.ArgumentParser(description="Clean an NBS Explorer .xlsx export.")
+    parser.add_argument("--input", default="data/nbs-xls-export 20251119.xlsx")
+    parser.add_argument("--output", default=None,
+                        help="default: data/cleaned.xlsx, or data/cleaned.csv with --stream")
+    parser.add_argument("--stream", action="store_true",
+                        help="read the workbook in row chunks and write CSV (bounded memory)")
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    parser.add_argument("--snapshot", default=None,
+                        help="with --stream: also write the server's columnar snapshot here")
+    args = parser.parse_args()
+
+    options = dict(
+        rem_col=DROP_COLUMNS,
+        split_col=SPLIT_COLUMNS,
+        clean_custom_column=CUSTOM_COLUMNS,
         # blank_col can stay None or be set if you want specific columns pre-filled
         # blank_col=["e"]
     )
 
-    print(cleaned_df)
+    if args.stream:
+        clean_dataset_streaming(args.input, args.output or "data/cleaned.csv",
+                                chunksize=args.chunksize, snapshot_dir=args.snapshot, **options)
+    else:
+        cleaned_df = clean_dataset(input_csv=args.input, output_file=args.output or "data/cleaned.xlsx", **options)
+
+        print(cleaned_df)
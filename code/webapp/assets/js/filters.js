@@ -108,11 +108,49 @@ d3.select("#pie-metric").on("change", function(){
         mapVisInstance.updateVis(dataToUse);
     })
 
+// an /api/... URL for the page's dataset (see datasetId)
+function apiUrl(path) {
+    if (!datasetId) return path;
+    return path + (path.includes("?") ? "&" : "?") + "dataset=" + encodeURIComponent(datasetId);
+}
+
+// window.filters as JSON for the API (sets as arrays)
+function filtersPayload() {
+    let payload = {};
+    Object.entries(filters).forEach(([key, value]) => {
+        payload[key] = value instanceof Set ? [...value] : value;
+    });
+    return payload;
+}
+
+// ranked matches from /api/search; only for data loaded through the API (rows carry an id)
+function updateSearchMatches(query) {
+    if (!query || wholeData.length === 0 || wholeData[0].id === undefined) {
+        return Promise.resolve();
+    }
+    return fetch(apiUrl("/api/search"), {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ q: query })
+    })
+        .then(res => res.ok ? res.json() : null)
+        .then(result => {
+            if (result) {
+                searchMatches = { query, rank: new Map(result.ids.map((id, i) => [String(id), i])) };
+            }
+        })
+        .catch(() => {});
+}
+
 function applyFilters() {
     filteredData = wholeData;
 
-    // search
-    if (filters.search) {
+    // search: the server's ranked matches when they are for this text, else a substring scan
+    if (filters.search && searchMatches && searchMatches.query === filters.search) {
+        let rank = searchMatches.rank;
+        filteredData = filteredData.filter(d => rank.has(d.id))
+                                   .sort((a, b) => rank.get(a.id) - rank.get(b.id));
+    } else if (filters.search) {
         filteredData = filteredData.filter(d => {
             let searchText = [
                 d.intervention_name,
@@ -774,6 +812,10 @@ function addActiveTag(label, value, onRemove) {
 }
 
 
+const RESULTS_PAGE_SIZE = 50;
+// neighbours listed under "Similar projects" in the project view (the server keeps up to 20)
+const SIMILAR_PROJECTS = 5;
+
 function renderResults(data) {
     let resultsList = document.getElementById("results-list");
     let resultsCount = document.getElementById("results-count");
@@ -786,7 +828,14 @@ function renderResults(data) {
         return;
     }
 
-    data.forEach(d => {
+    renderResultsPage(data, 0);
+}
+
+// cards are added RESULTS_PAGE_SIZE at a time, so a long list doesn't build thousands of DOM nodes
+function renderResultsPage(data, start) {
+    let resultsList = document.getElementById("results-list");
+
+    data.slice(start, start + RESULTS_PAGE_SIZE).forEach(d => {
         let projectCard = document.createElement("div");
         projectCard.className = "project-card";
         let projectId = d.intervention_name;
@@ -811,9 +860,11 @@ function renderResults(data) {
         
         projectCard.querySelector(".project-card-header")
                                         .addEventListener("click", () => {
-                                            selectedProject = d;
-                                            renderProjectInfo(d);
-                                            showProjectInfoView();
+                                            withProjectDetails(d).then(project => {
+                                                selectedProject = project;
+                                                renderProjectInfo(project);
+                                                showProjectInfoView();
+                                            });
                                         })
 
 
@@ -866,6 +917,18 @@ function renderResults(data) {
         resultsList.appendChild(projectCard);
 
     });
+
+    let next = start + RESULTS_PAGE_SIZE;
+    if (next < data.length) {
+        let moreButton = document.createElement("button");
+        moreButton.className = "btn btn-sm-secondary results-more";
+        moreButton.textContent = `Show more (${data.length - next} left)`;
+        moreButton.addEventListener("click", () => {
+            moreButton.remove();
+            renderResultsPage(data, next);
+        });
+        resultsList.appendChild(moreButton);
+    }
 }
 
 function updateCompareBar() {
@@ -919,6 +982,20 @@ function renderComparisonView(projects) {
 
 }
 
+// the browse data has no long text fields (short_description, project_focus, key_actors, ...);
+// fetch them once per project from the API and merge them in
+function withProjectDetails(project) {
+    if (project.id === undefined || project.short_description !== undefined) {
+        return Promise.resolve(project);
+    }
+    if (!projectDetails.has(project.id)) {
+        projectDetails.set(project.id, fetch(apiUrl(`/api/projects/${project.id}`))
+            .then(res => res.ok ? res.json() : {})
+            .catch(() => ({})));
+    }
+    return projectDetails.get(project.id).then(details => Object.assign(project, details));
+}
+
 function renderProjectInfo(project) {
     let moreInfoPanel = document.getElementById("project-info-panel");
 
@@ -951,6 +1028,10 @@ function renderProjectInfo(project) {
                     <div><strong>Total Cost</strong><span> ${project.total_cost || "-"} €</span></div>
 
                 </div>
+                <div class="project-info-card similar-projects hidden">
+                    <strong>Similar projects</strong>
+                    <ul id="similar-projects-list" data-project="${project.id}"></ul>
+                </div>
             </aside>
 
         </div>`;
@@ -958,6 +1039,56 @@ function renderProjectInfo(project) {
     document.getElementById("back-to-results").addEventListener("click", () => {
         showResultsView();
     });
+
+    renderSimilarProjects(project);
+}
+
+// "more like this": the project's precomputed nearest neighbours (only when the data came from the API)
+function renderSimilarProjects(project) {
+    if (project.id === undefined) return;
+
+    fetch(apiUrl(`/api/projects/${project.id}/similar?k=${SIMILAR_PROJECTS}&fields=intervention_name,city,country`))
+        .then(res => res.ok ? res.json() : { items: [] })
+        .catch(() => ({ items: [] }))
+        .then(result => {
+            let list = document.getElementById("similar-projects-list");
+            // another project may have been opened while this was loading
+            if (!list || list.dataset.project !== String(project.id) || result.items.length === 0) return;
+            list.closest(".similar-projects").classList.remove("hidden");
+
+            result.items.forEach(item => {
+                let entry = document.createElement("li");
+                entry.innerHTML = `
+                    <a href="#" class="similar-project-link">${item.intervention_name || "Unnamed project"}</a>
+                    <span class="similar-project-meta">${item.city || "-"}, ${item.country || "-"}</span>
+                    <label class="compare-option">
+                        <input type="checkbox">
+                        Compare
+                    </label>`;
+
+                entry.querySelector(".similar-project-link").addEventListener("click", (event) => {
+                    event.preventDefault();
+                    let similar = wholeData.find(d => +d.id === item.id) || item;
+                    withProjectDetails(similar).then(p => {
+                        selectedProject = p;
+                        renderProjectInfo(p);
+                    });
+                });
+
+                let compareCheckbox = entry.querySelector('input[type="checkbox"]');
+                compareCheckbox.checked = comparingSet.has(item.intervention_name);
+                compareCheckbox.addEventListener("change", () => {
+                    if (compareCheckbox.checked) {
+                        comparingSet.add(item.intervention_name);
+                    } else {
+                        comparingSet.delete(item.intervention_name);
+                    }
+                    updateCompareBar();
+                });
+
+                list.appendChild(entry);
+            });
+        });
 }
 
 function renderPageLayoutLeftSide(title, value) {
@@ -1,10 +1,22 @@
 let mapVisInstance;
 window.selectedMetrics="nbs_type";
 
-Promise.all([d3.csv("./assets/data/cleaned.csv"), 
-             d3.csv("./assets/data/coordinates.csv"),
+// the API serves a slim, content-hashed "browse" CSV (long text is fetched per project);
+// without the API (plain static server) fall back to the full cleaned.csv
+function loadProjectData() {
+    return fetch(apiUrl("/api/data-manifest"))
+        .then(res => {
+            if (!res.ok) throw new Error(`manifest: ${res.status}`);
+            return res.json();
+        })
+        .then(manifest => Promise.all([d3.csv(manifest.browse), d3.csv(manifest.coordinates)]))
+        .catch(() => Promise.all([d3.csv("./assets/data/cleaned.csv"),
+                                  d3.csv("./assets/data/coordinates.csv")]));
+}
+
+Promise.all([loadProjectData(),
              d3.json("https://cdn.jsdelivr.net/npm/world-atlas@2/countries-50m.json")
-]).then(([data, cities, world]) => {
+]).then(([[data, cities], world]) => {
     
     wholeData = data;
     filteredData = data;
@@ -45,8 +57,12 @@ Promise.all([d3.csv("./assets/data/cleaned.csv"),
     let searchBarInput = document.getElementById("search-input");
 
     searchBarInput.addEventListener("input", (e) => {
-        filters.search = e.target.value.trim().toLowerCase();
-        applyFilters();
+        let query = e.target.value.trim().toLowerCase();
+        filters.search = query;
+        updateSearchMatches(query).then(() => {
+            // skip if a later keystroke changed the search meanwhile (its own request applies it)
+            if (filters.search === query) applyFilters();
+        });
     })
 
     // the overview panel containing the 3 mini/big charts
@@ -66,9 +82,11 @@ Promise.all([d3.csv("./assets/data/cleaned.csv"),
         let comparingProjects = wholeData.filter(d => 
             comparingSet.has(d.intervention_name)
         );
-        renderComparisonView(comparingProjects);
-        renderRadarChart(comparingProjects);
-        showComparisonView();
+        Promise.all(comparingProjects.map(withProjectDetails)).then(projects => {
+            renderComparisonView(projects);
+            renderRadarChart(projects);
+            showComparisonView();
+        });
     });
 
     document.getElementById("clear-compare").addEventListener("click", () => {
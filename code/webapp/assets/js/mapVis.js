@@ -95,6 +95,38 @@ class MapVis{
     }
     // aggregate projects by city and pieglyph rendering
     updateVis(data){
+        let vis = this;
+        vis.currentData = data;
+        // responses can arrive out of order; only the latest update is drawn
+        let request = vis.requestCount = (vis.requestCount || 0) + 1;
+
+        vis.cityPies(data).then(result => {
+            if (request !== vis.requestCount) return;
+            vis.pieglyph(result.cities, result.categories);
+        });
+    }
+    // per-city slices of the selected metric: counted by the server (/api/map) when the
+    // rows came through the API, else grouped here
+    cityPies(data){
+        let vis = this;
+        if (data.length === 0 || data[0].id === undefined) {
+            return Promise.resolve(vis.localCityPies(data));
+        }
+        return fetch(apiUrl("/api/map"), {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({
+                metric: window.selectedMetrics,
+                filters: data === wholeData ? {} : filtersPayload()
+            })
+        })
+            .then(res => {
+                if (!res.ok) throw new Error(`map: ${res.status}`);
+                return res.json();
+            })
+            .catch(() => vis.localCityPies(data));
+    }
+    localCityPies(data){
         let vis = this;
         // group project by city country
         let projectsByCity = d3.rollups(
@@ -103,7 +135,7 @@ class MapVis{
             d => `${d.city}|||${d.country}`
         );
         // merge with coordinates
-        let citycounts = projectsByCity.map(([key, count])=>{
+        let cities = projectsByCity.map(([key, projects])=>{
             let [city, country] = key.split("|||");
 
             let coords = vis.cityData.find(d=> d.city === city && d.country === country);
@@ -113,32 +145,28 @@ class MapVis{
             return {
                 city: city,
                 country: country,
-                projects: count,
-                count: count.length,
+                count: projects.length,
                 latitude: +coords.latitude,
-                longitude: +coords.longitude
+                longitude: +coords.longitude,
+                slices: d3.rollups(
+                    projects,
+                    v=>v.length,
+                    p=>p[window.selectedMetrics] || "Unknown").map(([key, value])=>({key, value}))
             };
         }).filter(d=> d !== null);
 
-       vis.pieglyph(citycounts);
+        // collect categories for same color mapping
+        let categories = Array.from(new Set(cities.flatMap(d => d.slices.map(s => s.key))));
+        return {cities, categories};
     }
     // pieglyph drawing
-    pieglyph(data){
+    pieglyph(data, categories){
         let vis = this;
-        let allcat=new Set();
 
         const pie = d3.pie()
             .value(d=>d.value)
             .sort(null);
 
-        // collect categories for same color mapping
-        data.forEach(d=>{
-            d.projects.forEach(p=>{
-                allcat.add(p[window.selectedMetrics] || "Unknown");
-            });
-        })
- 
-        const categories = Array.from(allcat); 
         const colorScale =d3.scaleOrdinal(d3.schemeTableau10).domain(categories);       
 
         let glyphs= vis.glyphGroup
@@ -165,10 +193,7 @@ class MapVis{
             let glyph = d3.select(this);
 
         
-            const pieData = d3.rollups(
-                d.projects,
-                v=>v.length,
-                p=>p[window.selectedMetrics] || "Unknown").map(([key, value])=>({key, value}));
+            const pieData = d.slices;
 
             const radius = Math.max(2, vis.radiusScale(d.count || 1)/vis.currentZoom);
 
@@ -197,24 +222,21 @@ class MapVis{
 
     
     showPop(event, d){
+        let vis = this;
         let popup = d3.select("#city-popup");
 
         popup.classed("hidden", false)
             .style("left", (event.pageX+10)+"px")
             .style("top", (event.pageY+10)+"px");
         
-        const pieData = d3.rollups(
-                d.projects,
-                v=>v.length,
-                p=>p[window.selectedMetrics] || "Unknown").map(([key, value])=>({key, value}));
-        
-        d.pieData = pieData;
+        d.pieData = d.slices;
+        const projects = (vis.currentData || []).filter(p => p.city === d.city && p.country === d.country);
 
         d3.select("#popup-content").html(`
             <h4>${d.city}, ${d.country}</h4>
             <p>Number of Projects: ${d.count}</p>
             <ul>
-            ${d.projects.map(p => `<li>
+            ${projects.map(p => `<li>
                 ${p.intervention_name || "Unnamed Project"}
                 <button class="popup-more-info-btn" data-project="${p.intervention_name}">more info</button>
                 <button class="popup-compare-btn" data-project="${p.intervention_name}">compare</button>
@@ -234,8 +256,10 @@ class MapVis{
 
                         d3.select("#city-popup").classed("hidden", true);
 
-                        renderProjectInfo(proj);
-                        showProjectInfoView();
+                        withProjectDetails(proj).then(project => {
+                            renderProjectInfo(project);
+                            showProjectInfoView();
+                        });
 
                         event.stopPropagation();
                     })
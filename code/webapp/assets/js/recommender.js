@@ -206,6 +206,21 @@ function formatNumber(x) {
   return n.toLocaleString();
 }
 
+// Detail lines of a result card (title, place and link are rendered separately)
+const RS_IMPORTANT_FIELDS = [
+  { key: "status", label: "Status" },
+  { key: "total_cost", label: "Total cost (€)", fmt: formatNumber },
+  { key: "nbs_area", label: "NbS area (m²)", fmt: formatNumber },
+  { key: "duration", label: "Duration (years)", fmt: formatNumber },
+  { key: "previous_area_type", label: "Area before" },
+  { key: "sources_of_funding", label: "Funding" },
+  { key: "spatial_scale", label: "Spatial scale" },
+  { key: "nbs_type", label: "NbS type" },
+];
+
+// every field renderRSResults reads; the API returns only these
+const RS_RESULT_FIELDS = ["intervention_name", "city", "country", "link", ...RS_IMPORTANT_FIELDS.map(f => f.key)];
+
 /**
  * Results renderer:
  * - Numbers the projects
@@ -226,17 +241,6 @@ function renderRSResults(items) {
     return;
   }
 
-  const IMPORTANT_FIELDS = [
-    { key: "status", label: "Status" },
-    { key: "total_cost", label: "Total cost (€)", fmt: formatNumber },
-    { key: "nbs_area", label: "NbS area (m²)", fmt: formatNumber },
-    { key: "duration", label: "Duration (years)", fmt: formatNumber },
-    { key: "previous_area_type", label: "Area before" },
-    { key: "sources_of_funding", label: "Funding" },
-    { key: "spatial_scale", label: "Spatial scale" },
-    { key: "nbs_type", label: "NbS type" },
-  ];
-
   items.forEach((item, i) => {
     const card = document.createElement("div");
     card.className = "rs-card"; // <-- IMPORTANT for boxed grid styling
@@ -249,7 +253,7 @@ function renderRSResults(items) {
       ? `<a href="${escapeHtml(item.link)}" target="_blank" rel="noopener noreferrer">open</a>`
       : "";
 
-    const detailsLines = IMPORTANT_FIELDS
+    const detailsLines = RS_IMPORTANT_FIELDS
       .filter(f => item[f.key] != null && String(item[f.key]).trim() !== "")
       .map(f => {
         const raw = item[f.key];
@@ -270,7 +274,7 @@ function renderRSResults(items) {
 }
 
 async function loadRSMeta() {
-  const res = await fetch("/api/rs-meta");
+  const res = await fetch(apiUrl("/api/rs-meta"));
   RS_META = await res.json();
 }
 
@@ -279,9 +283,9 @@ async function runRecommendation() {
   const preferences = getPreferencesFromInputs();
   const k = Number(el("rs-k").value);
 
-  const payload = { selected_features, preferences, k };
+  const payload = { selected_features, preferences, k, fields: RS_RESULT_FIELDS };
 
-  const res = await fetch("/api/recommend", {
+  const res = await fetch(apiUrl("/api/recommend"), {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(payload),
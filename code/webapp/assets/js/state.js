@@ -19,6 +19,9 @@ window.filters = {
 // comparing procedure
 window.comparingSet = new Set();
 
+// last /api/search result: { query, rank: Map(row id -> position) }
+window.searchMatches = null;
+
 window.wholeData = [];
 window.filteredData = [];
 // for the radar chart
@@ -26,6 +29,11 @@ window.radarMaxValues = null;
 
 // for the more-info view
 window.selectedProject = null;
+// project id -> promise of its long text fields (see withProjectDetails)
+window.projectDetails = new Map();
+
+// dataset the API serves this page from: ?dataset=<id> in the page URL, else the server's default
+window.datasetId = new URLSearchParams(window.location.search).get("dataset");
 
 // to track the current view in the page
 window.currentView = "results";
\ No newline at end of file
@@ -0,0 +1 @@
+"""Micro-benchmarks for the recommender backend (run from code/webapp: python -m benchmarks.<name>)."""
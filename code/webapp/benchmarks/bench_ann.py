@@ -0,0 +1,95 @@
+"""
+IVF index vs. exact scan: recall@k and per-query latency of recommend() for a
+range of nprobe values, plus index build time. Feature subsets and weightings
+(SUBSETS) are measured at the default nprobe too: the index is clustered over all
+features, so recommend() scans every row for those and their recall must be 1.
+
+    python -m benchmarks.bench_ann [rows ...]
+
+Query profiles are taken from random rows of the table (their country, status,
+area type, funding, cost, area and duration). Recall counts an approximate hit
+as correct if its similarity reaches the exact k-th best (ties are common with
+categorical features, so row-id overlap would understate recall).
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_nbs_frame
+from recommenderSystem.model import SimpleNBSRecommender
+
+ROW_COUNTS = [100_000, 1_000_000]
+NPROBES = [1, 2, 4, 8, 16, 32, 64]
+QUERIES = 50
+K = 10
+# (label, features, weights) queried besides all features
+SUBSETS = [
+    ("country+total_cost", ["country", "total_cost"], None),
+    ("total_cost+nbs_area", ["total_cost", "nbs_area"], None),
+    ("all, cost x3", None, {"total_cost": 3.0}),
+]
+
+
+def _profiles(df, n: int, seed: int = 1) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in rng.choice(len(df), n, replace=False):
+        row = df.iloc[int(i)]
+        out.append({
+            "country": row["country"],
+            "status": row["status"],
+            "previous_area_type": row["previous_area_type"],
+            "sources_of_funding": row["sources_of_funding"],
+            "total_cost": float(row["total_cost"]),
+            "nbs_area": float(row["nbs_area"]),
+            "duration": float(row["end_year"] - row["begin_year"]),
+        })
+    return out
+
+
+def _run_queries(rs: SimpleNBSRecommender, profiles, **kwargs) -> tuple[list[np.ndarray], float]:
+    sims, t0 = [], time.perf_counter()
+    for p in profiles:
+        sims.append(rs.recommend(p, K, columns=[], **kwargs)["similarity"].to_numpy())
+    return sims, (time.perf_counter() - t0) * 1000.0 / len(profiles)
+
+
+def _recall(approx, exact) -> float:
+    return float(np.mean([np.mean(a >= e[-1] - 1e-6) for a, e in zip(approx, exact)]))
+
+
+def run(row_counts=ROW_COUNTS) -> None:
+    print(f"{'rows':>9} {'nlist':>6} {'nprobe':>7} {'scanned':>8} {'recall@' + str(K):>10} {'ms/query':>9} {'speedup':>8}  features")
+    for n in row_counts:
+        df = synthetic_nbs_frame(n)
+        nlist = int(np.sqrt(n))
+        t0 = time.perf_counter()
+        rs = SimpleNBSRecommender(ann_lists=nlist).fit(df)
+        build_s = time.perf_counter() - t0
+        profiles = _profiles(df, QUERIES)
+
+        exact, exact_ms = _run_queries(rs, profiles, exact=True)
+        print(f"{n:>9} {'-':>6} {'exact':>7} {1.0:>8.3f} {1.0:>10.3f} {exact_ms:>9.2f} {1.0:>8.1f}  all")
+        # record how many candidates each query re-ranks
+        index, sizes = rs._ann, []
+        candidates = index.candidates
+        index.candidates = lambda q, nprobe: sizes.append(len(c := candidates(q, nprobe))) or c
+
+        for nprobe in NPROBES:
+            sizes.clear()
+            approx, ms = _run_queries(rs, profiles, nprobe=nprobe)
+            scanned = np.mean(sizes) / n
+            print(f"{n:>9} {nlist:>6} {nprobe:>7} {scanned:>8.3f} {_recall(approx, exact):>10.3f} {ms:>9.2f} {exact_ms / ms:>8.1f}  all")
+
+        for label, features, weights in SUBSETS:
+            sizes.clear()
+            exact, exact_ms = _run_queries(rs, profiles, features=features, weights=weights, exact=True)
+            approx, ms = _run_queries(rs, profiles, features=features, weights=weights)
+            scanned = np.mean(sizes) / n if sizes else 1.0
+            print(f"{n:>9} {nlist:>6} {rs.ann_nprobe:>7} {scanned:>8.3f} {_recall(approx, exact):>10.3f} {ms:>9.2f} {exact_ms / ms:>8.1f}  {label}")
+        print(f"{n:>9} build (fit incl. index) {build_s:.2f}s, index {rs.memory_report()['ann_bytes'] / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or ROW_COUNTS)
@@ -0,0 +1,39 @@
+"""
+SimpleNBSRecommender.fit time (all features) from the bundled export up to 1M synthetic rows.
+
+    python -m benchmarks.bench_fit [rows ...]
+"""
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_nbs_frame
+from recommenderSystem.model import SimpleNBSRecommender
+
+CSV_PATH = Path(__file__).resolve().parents[1] / "assets" / "data" / "cleaned.csv"
+ROW_COUNTS = [10_000, 100_000, 1_000_000]
+
+
+def _time_fit(df: pd.DataFrame, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        SimpleNBSRecommender().fit(df)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def run(row_counts=ROW_COUNTS) -> None:
+    print(f"{'dataset':<14} {'rows':>9} {'fit_ms':>10}")
+    if CSV_PATH.exists():
+        df = pd.read_csv(CSV_PATH)
+        print(f"{'cleaned.csv':<14} {len(df):>9} {_time_fit(df, 5):>10.1f}")
+    for n in row_counts:
+        df = synthetic_nbs_frame(n)
+        print(f"{'synthetic':<14} {n:>9} {_time_fit(df, 3 if n < 1_000_000 else 1):>10.1f}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or ROW_COUNTS)
@@ -0,0 +1,74 @@
+"""
+Cold-start cost of loading the cleaned dataset: pd.read_csv vs. the memory-mapped
+columnar snapshot (all columns, and only the recommender's columns).
+Each measurement runs in a fresh interpreter so peak RSS is per method (Linux, /proc).
+
+    python -m benchmarks.bench_load [copies ...]
+
+`copies` replicates assets/data/cleaned.csv to get larger tables (default 1, 10, 100).
+"""
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from recommenderSystem.snapshot import write_snapshot
+
+WEBAPP_DIR = Path(__file__).resolve().parents[1]
+CSV_PATH = WEBAPP_DIR / "assets" / "data" / "cleaned.csv"
+RECOMMENDER_COLUMNS = [
+    "country", "status", "previous_area_type", "sources_of_funding",
+    "begin_year", "end_year", "nbs_area", "total_cost",
+]
+
+_CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+import pandas as pd
+from recommenderSystem.snapshot import load_snapshot
+t1 = time.perf_counter()
+method, path, cols = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+if method == "csv":
+    df = pd.read_csv(path, usecols=cols)
+else:
+    df = load_snapshot(path, columns=cols)
+t2 = time.perf_counter()
+# VmHWM (peak RSS of this address space); ru_maxrss would carry over the parent's peak across exec
+hwm_kb = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmHWM"))
+print(json.dumps({"load_s": t2 - t1, "rows": len(df), "max_rss_mb": hwm_kb / 1024}))
+"""
+
+
+def _measure(method: str, path: Path, columns) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, method, str(path), json.dumps(columns)],
+        cwd=WEBAPP_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def run(copies=(1, 10, 100)) -> None:
+    base = pd.read_csv(CSV_PATH)
+    print(f"{'rows':>8} {'method':<22} {'load_ms':>9} {'max_rss_mb':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for c in copies:
+            csv = Path(tmp) / f"cleaned_x{c}.csv"
+            snap = Path(tmp) / f"cleaned_x{c}.snapshot"
+            pd.concat([base] * c, ignore_index=True).to_csv(csv, index=False)
+            write_snapshot(pd.read_csv(csv), snap, source=csv)
+
+            for label, method, path, cols in [
+                ("csv", "csv", csv, None),
+                ("snapshot", "snapshot", snap, None),
+                ("csv (rec. columns)", "csv", csv, RECOMMENDER_COLUMNS),
+                ("snapshot (rec. columns)", "snapshot", snap, RECOMMENDER_COLUMNS),
+            ]:
+                r = _measure(method, path, cols)
+                print(f"{r['rows']:>8} {label:<22} {r['load_s'] * 1000:>9.1f} {r['max_rss_mb']:>11.1f}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or (1, 10, 100))
@@ -0,0 +1,51 @@
+"""
+Latency of the recommend() result step: full copy + sort_values (old path)
+vs. argpartition top-k + projected k-row materialization (current path).
+
+    python -m benchmarks.bench_topk [rows ...]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import synthetic_nbs_frame
+from recommenderSystem.model import SimpleNBSRecommender, _top_k
+
+ROW_COUNTS = [10_000, 100_000, 1_000_000]
+REPEATS = 5
+K = 10
+
+
+def _best_of(fn, repeats: int = REPEATS) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def run(row_counts=ROW_COUNTS) -> None:
+    print(f"{'rows':>10} {'sort_ms':>10} {'topk_ms':>10} {'recommend_ms':>14}")
+    for n in row_counts:
+        rs = SimpleNBSRecommender().fit(synthetic_nbs_frame(n))
+        prefs = {"country": "Country 003", "status": "Ongoing", "total_cost": 250_000, "duration": 4}
+        u = rs._make_user_vector(prefs)
+        sims = rs._cosine_sim_matrix(u, rs._feature_weights())
+
+        def old_path():
+            out = rs._df.copy()
+            out["similarity"] = sims
+            return out.sort_values("similarity", ascending=False).head(K)
+
+        def new_path():
+            rows = _top_k(sims, K)
+            return rs._result_frame(rows, sims[rows], columns=[])
+
+        t_sort = _best_of(old_path)
+        t_topk = _best_of(new_path)
+        t_rec = _best_of(lambda: rs.recommend(prefs, K, columns=[]))
+        print(f"{n:>10} {t_sort:>10.2f} {t_topk:>10.2f} {t_rec:>14.2f}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or ROW_COUNTS)
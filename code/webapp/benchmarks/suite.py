@@ -0,0 +1,244 @@
+"""
+End-to-end benchmark suite over synthetic NBS tables: times each backend stage,
+records its peak traced memory and writes everything to a JSON file so runs on
+different commits can be compared.
+
+    python -m benchmarks.suite [--rows 1000 10000 100000 1000000] [--repeats N]
+                               [--stages fit recommend ...] [--no-memory] [--out FILE]
+    python -m benchmarks.suite --compare OLD.json NEW.json
+
+Timings are best-of-N wall clock; peak memory is tracemalloc's peak for one extra
+run of the stage (numpy and pandas buffers included). Results go to
+benchmarks/results/<timestamp>-<commit>.json unless --out is given.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_nbs_frame, synthetic_raw_export
+from recommenderSystem.meta import build_rs_meta
+from recommenderSystem.model import SimpleNBSRecommender
+from recommenderSystem.neighbours import build_neighbours
+from recommenderSystem.query import FilterIndex
+from recommenderSystem.search import SearchIndex
+from recommenderSystem.snapshot import load_snapshot, write_snapshot
+
+WEBAPP_DIR = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+CLEANING_PATH = WEBAPP_DIR.parent / "data wrangling scripts" / "data_cleaning.py"
+
+ROW_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+# both cleaning pipelines parse the .xlsx through openpyxl; keep them to sizes that finish
+CLEAN_MAX_ROWS = 20_000
+# the neighbour graph scores every pair of rows
+NEIGHBOURS_MAX_ROWS = 100_000
+# a stage this much slower than the baseline is flagged by --compare
+REGRESSION_RATIO = 1.2
+
+PREFERENCES = {
+    "country": "Country 001",
+    "status": "Ongoing",
+    "previous_area_type": "Residential",
+    "sources_of_funding": ["EU funds", "Public local authority budget"],
+    "total_cost": 250_000,
+    "nbs_area": 20_000,
+    "duration": 4,
+}
+FILTERS = {
+    "countries": ["Country 000", "Country 001", "Country 002"],
+    "startYear": 2010,
+    "totalCost": [50_000, 5_000_000],
+}
+BATCH_PROFILES = 32
+SEARCH_QUERY = "urban gre"
+
+
+# ---------- stages ----------
+
+def _load_cleaning():
+    spec = importlib.util.spec_from_file_location("data_cleaning", CLEANING_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _stages(n: int, tmp: Path) -> List[tuple[str, Callable[..., Any], Any]]:
+    """
+    (name, run, keep) per stage. `run(ctx)` is the timed work; `keep(ctx, result)`
+    stores what later stages need. Stages run in order and share `ctx`.
+    """
+    csv, snap = tmp / "data.csv", tmp / "data.snapshot"
+    raw_xlsx, clean_xlsx, clean_csv = tmp / "raw.xlsx", tmp / "clean.xlsx", tmp / "clean.csv"
+
+    def cleaner(streaming):
+        def clean(ctx):
+            if not raw_xlsx.exists():
+                synthetic_raw_export(n).to_excel(raw_xlsx, sheet_name="Worksheet", index=False)
+            cleaning = ctx["cleaning"]
+            options = dict(split_col=cleaning.SPLIT_COLUMNS, clean_custom_column=cleaning.CUSTOM_COLUMNS)
+            with contextlib.redirect_stdout(io.StringIO()):
+                if streaming:
+                    return cleaning.clean_dataset_streaming(raw_xlsx, clean_csv, **options)
+                return cleaning.clean_dataset(raw_xlsx, clean_xlsx, **options)
+        return clean
+
+    return [
+        ("generate", lambda ctx: synthetic_nbs_frame(n), lambda ctx, df: ctx.update(df=df)),
+        ("write_csv", lambda ctx: ctx["df"].to_csv(csv, index=False), None),
+        ("read_csv", lambda ctx: pd.read_csv(csv), lambda ctx, df: ctx.update(df=df)),
+        ("write_snapshot", lambda ctx: write_snapshot(ctx["df"], snap, source=csv), None),
+        ("load_snapshot", lambda ctx: load_snapshot(snap), None),
+        ("rs_meta", lambda ctx: build_rs_meta(ctx["df"]), None),
+        ("filter_index", lambda ctx: FilterIndex(ctx["df"]), lambda ctx, index: ctx.update(index=index)),
+        ("query", lambda ctx: ctx["index"].rows(FILTERS), None),
+        ("search_index", lambda ctx: SearchIndex(ctx["df"], ctx["index"]), lambda ctx, search: ctx.update(search=search)),
+        ("search", lambda ctx: ctx["search"].search(SEARCH_QUERY, rows=ctx["index"].rows(FILTERS)), None),
+        ("fit", lambda ctx: SimpleNBSRecommender().fit(ctx["df"]), lambda ctx, model: ctx.update(model=model)),
+        ("recommend", lambda ctx: ctx["model"].recommend(PREFERENCES, 10), None),
+        ("recommend_batch", lambda ctx: ctx["model"].recommend_batch([PREFERENCES] * BATCH_PROFILES, 10), None),
+        ("neighbours", lambda ctx: build_neighbours(ctx["model"], workers=os.cpu_count() or 1), None),
+        ("clean", cleaner(False), None),
+        ("clean_stream", cleaner(True), None),
+    ]
+
+
+def _measure(fn: Callable[[], Any], repeats: int, memory: bool) -> tuple[Any, Dict[str, Any]]:
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        result = None  # drop the previous result before measuring the next run
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+
+    out: Dict[str, Any] = {"seconds": best, "repeats": repeats}
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            out["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return result, out
+
+
+def run(row_counts=ROW_COUNTS, stages=None, repeats=None, memory: bool = True) -> List[Dict[str, Any]]:
+    results = []
+    print(f"{'rows':>9} {'stage':<16} {'ms':>11} {'peak_mb':>9}")
+    for n in row_counts:
+        ctx: Dict[str, Any] = {"cleaning": _load_cleaning()}
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, fn, keep in _stages(n, Path(tmp)):
+                if name.startswith("clean") and n > CLEAN_MAX_ROWS:
+                    continue
+                if name == "neighbours" and n > NEIGHBOURS_MAX_ROWS:
+                    continue
+                # later stages depend on these, so they run even when not selected
+                needed = name in {"generate", "filter_index", "search_index", "fit"}
+                if stages and name not in stages and not needed:
+                    continue
+                r = repeats or (3 if n <= 100_000 else 1)
+                result, m = _measure(lambda: fn(ctx), r, memory and (not stages or name in stages))
+                if keep is not None:
+                    keep(ctx, result)
+                if stages and name not in stages:
+                    continue
+                results.append({"rows": n, "stage": name, **m})
+                peak = f"{m['peak_mb']:>9.1f}" if "peak_mb" in m else f"{'-':>9}"
+                print(f"{n:>9} {name:<16} {m['seconds'] * 1000:>11.1f} {peak}", flush=True)
+    return results
+
+
+# ---------- results ----------
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=WEBAPP_DIR, capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=WEBAPP_DIR, capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save(results: List[Dict[str, Any]], env: Dict[str, Any], out: Path = None) -> Path:
+    if out is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        out = RESULTS_DIR / f"{stamp}-{env['commit']}.json"
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"environment": env, "results": results}, f, indent=1)
+    return out
+
+
+def compare(old_path: Path, new_path: Path) -> int:
+    """Print per-stage ratios NEW/OLD; returns the number of flagged regressions."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    base = {(r["rows"], r["stage"]): r for r in old["results"]}
+
+    print(f"{old['environment']['commit']} -> {new['environment']['commit']}")
+    print(f"{'rows':>9} {'stage':<16} {'old_ms':>10} {'new_ms':>10} {'ratio':>7} {'old_mb':>8} {'new_mb':>8}")
+    flagged = 0
+    for r in new["results"]:
+        b = base.get((r["rows"], r["stage"]))
+        if b is None:
+            continue
+        ratio = r["seconds"] / b["seconds"] if b["seconds"] > 0 else float("inf")
+        mark = "  <- slower" if ratio > REGRESSION_RATIO else ""
+        flagged += bool(mark)
+        old_mb = f"{b['peak_mb']:>8.1f}" if "peak_mb" in b else f"{'-':>8}"
+        new_mb = f"{r['peak_mb']:>8.1f}" if "peak_mb" in r else f"{'-':>8}"
+        print(f"{r['rows']:>9} {r['stage']:<16} {b['seconds'] * 1000:>10.1f} {r['seconds'] * 1000:>10.1f} {ratio:>7.2f} {old_mb} {new_mb}{mark}")
+    return flagged
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=ROW_COUNTS)
+    parser.add_argument("--stages", nargs="+", default=None)
+    parser.add_argument("--repeats", type=int, default=None)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(*args.compare) else 0
+
+    env = environment()
+    results = run(args.rows, args.stages, args.repeats, memory=not args.no_memory)
+    print(f"results: {save(results, env, args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Synthetic NBS tables for benchmarks.
+
+synthetic_nbs_frame(n) has the cleaned.csv schema (same columns, order and dtypes)
+with cardinalities close to the real export: ~110 countries with a Zipf-like skew,
+cities tied to one country each, the 9 real status labels at their real shares,
+~130 previous_area_type values, 1-3 newline-separated funding tags from the real
+vocabulary, and heavy-tailed nbs_area / total_cost.
+
+synthetic_raw_export(n) is the same kind of table before cleaning, with the
+column headers and value formats of the "Worksheet" sheet data_cleaning.py reads.
+"""
+import numpy as np
+import pandas as pd
+
+CLEANED_COLUMNS = [
+    "intervention_name", "city", "country", "begin_year", "end_year", "status",
+    "spatial_scale", "nbs_area", "previous_area_type", "short_description", "nbs_type",
+    "sustainability_challenges", "project_focus", "intervention_goals",
+    "implementation_activities",
+    "Climate change adaptation: What activities are implemented to realize the conservation goals and targets?",
+    "Climate change mitigation: What activities are implemented to realize the conservation goals and targets?",
+    "Habitats and biodiversity conservation: What activities are implemented to realize the conservation goals and targets?",
+    "Habitats and biodiversity restoration: What activities are implemented to realize the restoration goals and targets?",
+    "governance_arrangements", "key_actors", "participatory_methods", "total_cost",
+    "sources_of_funding", "environmental_impacts", "economic_impacts",
+    "social_cultural_impacts", "link",
+]
+
+# shares from the bundled export
+STATUS_SHARES = {
+    "Completed": 683, "Ongoing": 365, "Completed and archived or cancelled": 21,
+    "In planning stage": 21, "Unknown": 19, "Other": 13, "Planned, but cancelled": 9,
+    "In piloting stage": 5, "Envisioned": 5,
+}
+FUNDING_TAGS = [
+    "Public local authority budget", "Public national budget", "EU funds",
+    "Public regional budget", "Corporate investment", "Other",
+    "Funds provided by non-governmental organization (NGO)", "Private Foundation/Trust",
+    "Crowdfunding", "Multilateral funds/international funding", "Commercial banks",
+    "Angel / informal investors", "National or regional development bank",
+    "Insurance firms", "Private equity funds", "Research organisation / University",
+]
+AREA_TYPES = [
+    "Other", "Public Greenspace Area", "Building", "Residential", "Previous derelict area",
+    "Central Business District / City Centre", "Natural Heritage Area/Untouched nature",
+    "Industrial", "Agricultural", "Transport infrastructure", "Waterfront", "Unknown",
+]
+SPATIAL_SCALES = [
+    "Micro-scale: District/neighbourhood level",
+    "Sub-microscale: Street scale (including buildings)",
+    "Meso-scale: Regional, metropolitan and urban level",
+]
+NBS_TYPES = {
+    "Parks and urban forests": ["Large urban parks or forests", "Pocket parks/neighbourhood green spaces", "Botanical gardens"],
+    "Nature on buildings (external)": ["Green roofs", "Green walls or facades", "Balcony greens"],
+    "Blue infrastructure": ["Lakes/ponds", "Rivers/streams/canals/estuaries", "Wetlands"],
+    "Green areas for water management": ["Sustainable urban drainage systems", "Rain gardens", "Swales/filter strips"],
+    "Community gardens and allotments": ["Allotments", "Community gardens", "Urban farms"],
+    "Grey infrastructure featuring greens": ["Alley or street trees and other street vegetation", "Green playgrounds and school grounds"],
+}
+# Total cost € answer ranges of the export and the value data_cleaning.py parses them to
+COST_RANGES = {
+    "Less than 10,000": 10_000, "10,000 - 50,000": 30_000, "50,000 - 100,000": 75_000,
+    "100,000 - 500,000": 300_000, "500,000 - 2,000,000": 1_250_000,
+    "2,000,000 - 4,000,000": 3_000_000, "More than 4,000,000": 4_000_000,
+}
+
+_WORDS = (
+    "urban green space project city park water residents local nature municipality "
+    "biodiversity climate area trees community garden public new river flood restoration "
+    "sustainable development planning citizens habitat network roof street district "
+    "management quality air heat health recreation pilot design maintenance"
+).split()
+
+
+def _zipf(k: int, s: float = 1.1) -> np.ndarray:
+    w = 1.0 / np.arange(1, k + 1) ** s
+    return w / w.sum()
+
+
+def _pick(rng: np.random.Generator, levels, n: int, p=None) -> np.ndarray:
+    levels = np.asarray(levels, dtype=object)
+    return levels[rng.choice(len(levels), n, p=_zipf(len(levels)) if p is None else p)]
+
+
+def _combos(rng: np.random.Generator, vocab, pool: int, max_tags: int, sep: str) -> list[str]:
+    """`pool` distinct-ish multi-valued cells of 1..max_tags Zipf-weighted tags."""
+    p = _zipf(len(vocab))
+    out = []
+    for _ in range(pool):
+        k = min(int(rng.integers(1, max_tags + 1)), len(vocab))
+        picks = np.sort(rng.choice(len(vocab), k, replace=False, p=p))
+        out.append(sep.join(vocab[i] for i in picks))
+    return out
+
+
+def _sentences(rng: np.random.Generator, pool: int, words: int) -> list[str]:
+    out = []
+    for _ in range(pool):
+        w = rng.choice(_WORDS, int(rng.integers(words // 2, words * 3 // 2)))
+        out.append(" ".join(w).capitalize() + ".")
+    return out
+
+
+def _nbs_types(rng: np.random.Generator, pool: int) -> list[str]:
+    groups = list(NBS_TYPES)
+    out = []
+    for _ in range(pool):
+        lines = []
+        for g in rng.choice(len(groups), int(rng.integers(1, 4)), replace=False):
+            subs = NBS_TYPES[groups[g]]
+            lines.append(groups[g])
+            lines += ["- " + s for s in rng.choice(subs, int(rng.integers(1, len(subs) + 1)), replace=False)]
+        out.append("\n".join(lines))
+    return out
+
+
+def _geography(rng: np.random.Generator, n: int) -> tuple[np.ndarray, np.ndarray]:
+    countries = np.array([f"Country {i:03d}" for i in range(110)], dtype=object)
+    n_cities = int(np.clip(n // 5, 200, 20_000))
+    city_country = countries[rng.choice(len(countries), n_cities, p=_zipf(len(countries), 1.2))]
+    cities = np.array([f"City {i:05d}" for i in range(n_cities)], dtype=object)
+    which = rng.choice(n_cities, n, p=_zipf(n_cities, 0.8))
+    return cities[which], city_country[which]
+
+
+def _funding(rng: np.random.Generator, n: int) -> np.ndarray:
+    out = _pick(rng, _combos(rng, FUNDING_TAGS, 400, 3, "\n"), n)
+    out[rng.random(n) < 0.08] = "Unknown"
+    return out
+
+
+def synthetic_nbs_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    """A cleaned.csv-shaped table of `n` synthetic interventions (deterministic per seed)."""
+    rng = np.random.default_rng(seed)
+    city, country = _geography(rng, n)
+    begin = np.clip(np.rint(rng.normal(2011, 5, n)), 1990, 2024).astype(np.int64)
+    end = begin + rng.poisson(3, n)
+
+    # heavy tails: lognormal areas (some zeros), Pareto costs from 10k
+    nbs_area = np.round(rng.lognormal(10.2, 2.5, n), 1)
+    nbs_area[rng.random(n) < 0.01] = 0.0
+    total_cost = np.minimum((rng.pareto(1.1, n) + 1) * 10_000, 1e10).astype(np.int64)
+
+    status_p = np.array(list(STATUS_SHARES.values()), dtype=float)
+    area_levels = AREA_TYPES + [f"{a}, {b}" for a in AREA_TYPES[:8] for b in AREA_TYPES[:8] if a != b] + [f"Area type {i}" for i in range(62)]
+    text = np.array(_sentences(rng, 512, 100), dtype=object)
+    short = np.array(_sentences(rng, 256, 12), dtype=object)
+
+    def long_text():
+        return text[rng.integers(0, len(text), n)]
+
+    def short_text():
+        return short[rng.integers(0, len(short), n)]
+
+    cols = {
+        "intervention_name": np.array([f"NBS intervention {i}" for i in range(n)], dtype=object),
+        "city": city,
+        "country": country,
+        "begin_year": begin,
+        "end_year": end,
+        "status": _pick(rng, list(STATUS_SHARES), n, status_p / status_p.sum()),
+        "spatial_scale": _pick(rng, SPATIAL_SCALES + _combos(rng, SPATIAL_SCALES, 6, 2, ", "), n),
+        "nbs_area": nbs_area,
+        "previous_area_type": _pick(rng, area_levels[:130], n),
+        "short_description": long_text(),
+        "nbs_type": _pick(rng, _nbs_types(rng, 600), n),
+        "sustainability_challenges": short_text(),
+        "project_focus": short_text(),
+        "intervention_goals": long_text(),
+        "implementation_activities": long_text(),
+        CLEANED_COLUMNS[15]: short_text(),
+        CLEANED_COLUMNS[16]: short_text(),
+        CLEANED_COLUMNS[17]: short_text(),
+        CLEANED_COLUMNS[18]: short_text(),
+        "governance_arrangements": short_text(),
+        "key_actors": short_text(),
+        "participatory_methods": short_text(),
+        "total_cost": total_cost,
+        "sources_of_funding": _funding(rng, n),
+        "environmental_impacts": short_text(),
+        "economic_impacts": short_text(),
+        "social_cultural_impacts": short_text(),
+        "link": np.array([f"https://una.city/nbs/synthetic/{i}" for i in range(n)], dtype=object),
+    }
+    return pd.DataFrame(cols, columns=CLEANED_COLUMNS)
+
+
+def synthetic_raw_export(n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    The same table in export form: raw headers, "Duration" as "begin - end",
+    "NBS area" / "Total cost" as text, and ~5% blanks/"Unknown" in the fields
+    data_cleaning.py fills with medians.
+    """
+    import importlib.util
+    from pathlib import Path
+
+    path = Path(__file__).resolve().parents[2] / "data wrangling scripts" / "data_cleaning.py"
+    spec = importlib.util.spec_from_file_location("data_cleaning", path)
+    cleaning = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(cleaning)
+
+    rng = np.random.default_rng(seed + 1)
+    df = synthetic_nbs_frame(n, seed)
+    raw_names = {v: k for k, v in cleaning.COLUMN_RENAME.items()}
+    raw_names.update({c: c for c in CLEANED_COLUMNS[15:19]})
+
+    duration = (df["begin_year"].astype(str) + " - " + df["end_year"].astype(str)).to_numpy(dtype=object)
+    area = df["nbs_area"].astype(str).to_numpy(dtype=object)
+    cost = _pick(rng, list(COST_RANGES), n)
+    for values in (duration, area, cost):
+        values[rng.random(n) < 0.05] = "Unknown"
+
+    out = df.rename(columns=raw_names)
+    out.insert(out.columns.get_loc("Begin"), "Duration", duration)
+    out = out.drop(columns=["Begin", "End"])
+    out["NBS area (m2)"] = area
+    out["Total cost €"] = cost
+    return out.rename(columns={"NBS area (m2)": "NBS area", "Total cost €": "Total cost"})
@@ -1,49 +1,239 @@
+"""
+Geocode the (city, country) pairs of cleaned.csv into coordinates.csv for the map.
+
+Results are kept in an SQLite cache, so a run only queries pairs it has never
+seen (misses are cached too; --retry-missing asks again). Queries go through a
+small worker pool behind a token-bucket rate limiter (Nominatim allows 1 request/s)
+and are retried with exponential backoff. The geocoder is pluggable: --fixture
+answers from a CSV instead of the network, e.g. for offline runs and tests.
+
+    python coordinates.py [--fixture FILE] [--workers N] [--rate R] [--retry-missing]
+"""
+import argparse
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
 import pandas as pd
-from geopy.geocoders import Nominatim
-from time import sleep
 
-INPUT="./assets/data/cleaned.csv"
-OUTPUT="./assets/data/coordinates.csv"
+INPUT = "./assets/data/cleaned.csv"
+OUTPUT = "./assets/data/coordinates.csv"
+CACHE = "./assets/data/geocode_cache.sqlite"
+
+# cleaned.csv uses the renamed columns; raw exports the original headers
+CITY_COLS = ["city", "City"]
+COUNTRY_COLS = ["country", "Country"]
+
+# a geocoder maps "City, Country" to (latitude, longitude), or None if not found;
+# exceptions are treated as transient and retried
+Geocoder = Callable[[str], Optional[tuple[float, float]]]
+
+
+# ---------- geocoders ----------
+
+class NominatimGeocoder:
+    """OpenStreetMap Nominatim through geopy."""
+
+    def __init__(self, user_agent: str = "nbs-geocoder", timeout: float = 10.0):
+        from geopy.geocoders import Nominatim
+
+        self._geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def __call__(self, query: str) -> Optional[tuple[float, float]]:
+        location = self._geolocator.geocode(query)
+        if location is None:
+            return None
+        return location.latitude, location.longitude
+
+
+class FixtureGeocoder:
+    """Answers from a CSV with city, country, latitude, longitude columns (no network)."""
+
+    def __init__(self, path):
+        df = pd.read_csv(path)
+        self._coords = {
+            f"{city}, {country}": (float(lat), float(lon))
+            for city, country, lat, lon in df[["city", "country", "latitude", "longitude"]].itertuples(index=False)
+        }
+
+    def __call__(self, query: str) -> Optional[tuple[float, float]]:
+        return self._coords.get(query)
+
+
+# ---------- cache ----------
+
+class GeocodeCache:
+    """(city, country) -> coordinates in SQLite; a row with NULL coordinates records a miss."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " city TEXT NOT NULL, country TEXT NOT NULL,"
+            " latitude REAL, longitude REAL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (city, country))"
+        )
+        self._db.commit()
 
-CITY_COL ="City"
-COUNTRY_COL="Country"
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
 
-geolocator = Nominatim(user_agent="nbs-geocoder")
+    def lookup(self) -> Dict[tuple[str, str], Optional[tuple[float, float]]]:
+        rows = self._db.execute("SELECT city, country, latitude, longitude FROM geocode")
+        return {(city, country): (None if lat is None else (lat, lon)) for city, country, lat, lon in rows}
 
-df =pd.read_csv(INPUT)
+    def put(self, city: str, country: str, coords: Optional[tuple[float, float]]) -> None:
+        lat, lon = coords if coords is not None else (None, None)
+        self._db.execute(
+            "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)",
+            (city, country, lat, lon, time.time()),
+        )
+        self._db.commit()
 
-cities = (
-    df[[CITY_COL, COUNTRY_COL]]
-    .dropna()
-    .drop_duplicates()
-)
+    def import_csv(self, path) -> int:
+        """Seed from an existing coordinates.csv; returns the number of rows read."""
+        df = pd.read_csv(path)
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR IGNORE INTO geocode VALUES (?, ?, ?, ?, ?)",
+            [(str(c), str(k), float(lat), float(lon), now)
+             for c, k, lat, lon in df[["city", "country", "latitude", "longitude"]].itertuples(index=False)],
+        )
+        self._db.commit()
+        return len(df)
 
-results=[]
+    def close(self) -> None:
+        self._db.close()
 
-for _, row in cities.iterrows():
-    city = row[CITY_COL]
-    country = row[COUNTRY_COL]
 
-    query = f"{city}, {country}"
-    print(f"Geocoding: {query}")
+# ---------- rate limiting ----------
 
+class TokenBucket:
+    """`rate` tokens per second, at most `burst` saved up; acquire() blocks until one is free."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _geocode_with_retry(geocoder: Geocoder, query: str, bucket: TokenBucket, retries: int, backoff: float):
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            return geocoder(query)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            print(f"retrying {query} in {delay:.1f}s ({e})")
+            time.sleep(delay)
+
+
+def geocode_pairs(
+    pairs: Iterable[tuple[str, str]],
+    geocoder: Geocoder,
+    cache: GeocodeCache,
+    workers: int = 2,
+    rate: float = 1.0,
+    retries: int = 3,
+    backoff: float = 2.0,
+    retry_missing: bool = False,
+) -> Dict[tuple[str, str], Optional[tuple[float, float]]]:
+    """
+    Coordinates for every pair, querying `geocoder` only for pairs not in `cache`
+    (or cached as misses, with retry_missing). New answers are cached as they arrive;
+    pairs whose retries all fail are left out of the cache and retried next run.
+    """
+    known = cache.lookup()
+    pairs = list(dict.fromkeys(pairs))
+    todo = [p for p in pairs if p not in known or (retry_missing and known[p] is None)]
+    print(f"{len(pairs)} locations, {len(pairs) - len(todo)} cached, {len(todo)} to geocode")
+
+    bucket = TokenBucket(rate)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(_geocode_with_retry, geocoder, f"{city}, {country}", bucket, retries, backoff): (city, country)
+            for city, country in todo
+        }
+        for future in as_completed(futures):
+            city, country = futures[future]
+            try:
+                coords = future.result()
+            except Exception as e:
+                print(f"error for query {city}, {country}: {e}")
+                continue
+            if coords is None:
+                print(f"no query found: {city}, {country}")
+            cache.put(city, country, coords)  # only this thread touches the connection
+            known[(city, country)] = coords
+
+    return {p: known.get(p) for p in pairs}
+
+
+def _column(df: pd.DataFrame, names: list[str]) -> str:
+    for name in names:
+        if name in df.columns:
+            return name
+    raise KeyError(f"None of {names} in {list(df.columns)}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=INPUT)
+    parser.add_argument("--output", default=OUTPUT)
+    parser.add_argument("--cache", default=CACHE)
+    parser.add_argument("--fixture", default=None, help="geocode from this CSV instead of Nominatim")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=1.0, help="requests per second (Nominatim policy: 1)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--retry-missing", action="store_true", help="query again pairs cached as not found")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(args.input)
+    city_col, country_col = _column(df, CITY_COLS), _column(df, COUNTRY_COLS)
+    cities = df[[city_col, country_col]].dropna().drop_duplicates()
+    pairs = [(str(c), str(k)) for c, k in cities.itertuples(index=False)]
+
+    cache = GeocodeCache(args.cache)
     try:
-        location = geolocator.geocode(query)
-        if location:
-            results.append({
-                "city": city,
-                "country": country,
-                "latitude": location.latitude,
-                "longtitude": location.longitude
-            })
-        else:
-            print(f"no query found: {query}")
-        
-    except Exception as e:
-        print(f"error for query{query}:{e}")
-    
-    sleep(1) # To respect Nominatim's usage policy
-    
-output_df = pd.DataFrame(results)
-output_df.to_csv(OUTPUT, index=False)
-print(f"saved {len(output_df)} cities to {OUTPUT}")
\ No newline at end of file
+        if len(cache) == 0 and Path(args.output).exists():
+            # first run with a cache: start from the coordinates already geocoded
+            print(f"seeded cache with {cache.import_csv(args.output)} rows from {args.output}")
+
+        geocoder = FixtureGeocoder(args.fixture) if args.fixture else NominatimGeocoder()
+        coords = geocode_pairs(pairs, geocoder, cache, workers=args.workers, rate=args.rate,
+                               retries=args.retries, retry_missing=args.retry_missing)
+    finally:
+        cache.close()
+
+    results = [
+        {"city": city, "country": country, "latitude": c[0], "longitude": c[1]}
+        for (city, country), c in coords.items() if c is not None
+    ]
+    output_df = pd.DataFrame(results, columns=["city", "country", "latitude", "longitude"])
+    output_df.to_csv(args.output, index=False)
+    print(f"saved {len(output_df)} cities to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
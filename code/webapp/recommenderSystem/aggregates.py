@@ -0,0 +1,189 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .query import FilterIndex, filter_signature
+
+
+# ---------- d3 scale helpers (same numbers as d3.scaleLinear().nice() / .ticks()) ----------
+
+_E10, _E5, _E2 = math.sqrt(50), math.sqrt(10), math.sqrt(2)
+
+
+def _js_round(x: float) -> int:
+    # Math.round rounds .5 up; Python's round() is banker's rounding
+    return math.floor(x + 0.5)
+
+
+def _tick_spec(start: float, stop: float, count: float) -> tuple[int, int, float]:
+    step = (stop - start) / max(0, count)
+    power = math.floor(math.log10(step))
+    error = step / 10 ** power
+    factor = 10 if error >= _E10 else 5 if error >= _E5 else 2 if error >= _E2 else 1
+    if power < 0:
+        inc = 10 ** -power / factor
+        i1, i2 = _js_round(start * inc), _js_round(stop * inc)
+        if i1 / inc < start:
+            i1 += 1
+        if i2 / inc > stop:
+            i2 -= 1
+        inc = -inc
+    else:
+        inc = 10 ** power * factor
+        i1, i2 = _js_round(start / inc), _js_round(stop / inc)
+        if i1 * inc < start:
+            i1 += 1
+        if i2 * inc > stop:
+            i2 -= 1
+    if i2 < i1 and 0.5 <= count < 2:
+        return _tick_spec(start, stop, count * 2)
+    return i1, i2, inc
+
+
+def d3_ticks(start: float, stop: float, count: int) -> list[float]:
+    if not count > 0:
+        return []
+    if start == stop:
+        return [start]
+    i1, i2, inc = _tick_spec(start, stop, count)
+    if not i2 >= i1:
+        return []
+    if inc < 0:
+        return [(i1 + i) / -inc for i in range(i2 - i1 + 1)]
+    return [(i1 + i) * inc for i in range(i2 - i1 + 1)]
+
+
+def d3_nice(start: float, stop: float, count: int = 10) -> tuple[float, float]:
+    prestep = None
+    for _ in range(10):
+        if start == stop:
+            break
+        step = _tick_spec(start, stop, count)[2]
+        if step == prestep:
+            break
+        if step > 0:
+            start = math.floor(start / step) * step
+            stop = math.ceil(stop / step) * step
+        elif step < 0:
+            start = math.ceil(start * step) / step
+            stop = math.floor(stop * step) / step
+        else:
+            break
+        prestep = step
+    return start, stop
+
+
+# ---------- memo ----------
+
+class _Memo:
+    """Small thread-safe LRU for aggregate results keyed by (name, params, filter signature)."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Any, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        value = compute()
+        with self._lock:
+            self.misses += 1
+            self._items[key] = value
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """{"hits", "misses", "size"}."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
+
+
+class OverviewAggregates:
+    """
+    The overview chart numbers from assets/js/charts.js, computed over the rows
+    a FilterIndex selects:
+      - country_counts: overviewProjectsCountry (top-N + "Other")
+      - cost_histogram: settingUpCostHistogram (nice domain, d3.bin over ticks)
+      - yearly_counts:  settingUpProjectsByYear (projects per begin_year)
+    Results are memoized per normalized filter signature.
+    """
+
+    def __init__(self, df: pd.DataFrame, index: FilterIndex, maxsize: int = 256):
+        self.index = index
+
+        country = df["country"].fillna("").astype(str) if "country" in df.columns else pd.Series([""] * len(df))
+        country = country.where(country != "", "Unknown")
+        # factorize keeps first-appearance order, like d3.rollups
+        self._country_codes, self._countries = pd.factorize(country)
+
+        cost = pd.to_numeric(df.get("total_cost"), errors="coerce").to_numpy(dtype=float) if "total_cost" in df.columns else np.full(len(df), np.nan)
+        self._cost = cost
+
+        years = pd.to_numeric(df.get("begin_year"), errors="coerce").to_numpy(dtype=float) if "begin_year" in df.columns else np.full(len(df), np.nan)
+        self._year_ok = ~np.isnan(years)
+        self._years = np.where(self._year_ok, years, 0).astype(np.int64)
+
+        self._memo = _Memo(maxsize)
+
+    def _mask(self, signature: str, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        return self._memo.get_or_compute(("mask", signature), lambda: self.index.mask(filters))
+
+    def country_counts(self, filters: Optional[Dict[str, Any]], top: int = 15) -> list[Dict[str, Any]]:
+        sig = filter_signature(filters)
+        return self._memo.get_or_compute(("countries", top, sig), lambda: self._country_counts(self._mask(sig, filters), top))
+
+    def cost_histogram(self, filters: Optional[Dict[str, Any]], bins: int = 10) -> Dict[str, Any]:
+        sig = filter_signature(filters)
+        return self._memo.get_or_compute(("cost", bins, sig), lambda: self._cost_histogram(self._mask(sig, filters), bins))
+
+    def yearly_counts(self, filters: Optional[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        sig = filter_signature(filters)
+        return self._memo.get_or_compute(("years", sig), lambda: self._yearly_counts(self._mask(sig, filters)))
+
+    def _country_counts(self, mask: np.ndarray, top: int) -> list[Dict[str, Any]]:
+        counts = np.bincount(self._country_codes[mask], minlength=len(self._countries))
+        present = np.flatnonzero(counts)
+        present = present[np.argsort(-counts[present], kind="stable")]
+
+        out = [{"country": str(self._countries[j]), "count": int(counts[j])} for j in present[:top]]
+        if len(present) > top:
+            out.append({"country": "Other", "count": int(counts[present[top:]].sum()), "isOther": True})
+        return out
+
+    def _cost_histogram(self, mask: np.ndarray, count: int) -> Dict[str, Any]:
+        values = self._cost[mask]
+        values = values[~np.isnan(values) & (values > 0)]
+        if len(values) == 0:
+            return {"domain": None, "bins": []}
+
+        x0, x1 = d3_nice(float(values.min()), float(values.max()), 10)
+        thresholds = [t for t in d3_ticks(x0, x1, count) if x0 < t <= x1]
+
+        tz = np.asarray(thresholds, dtype=float)
+        inside = values[(values >= x0) & (values <= x1)]
+        hist = np.bincount(np.searchsorted(tz, inside, side="right"), minlength=len(tz) + 1)
+
+        edges = [x0, *thresholds, x1]
+        bins = [{"x0": edges[i], "x1": edges[i + 1], "count": int(hist[i])} for i in range(len(tz) + 1)]
+        return {"domain": [x0, x1], "bins": bins}
+
+    def _yearly_counts(self, mask: np.ndarray) -> list[Dict[str, Any]]:
+        years = self._years[mask & self._year_ok]
+        if len(years) == 0:
+            return []
+        uniq, counts = np.unique(years, return_counts=True)
+        return [{"year": int(y), "count": int(c)} for y, c in zip(uniq, counts)]
+
+    def stats(self) -> Dict[str, int]:
+        return self._memo.stats()
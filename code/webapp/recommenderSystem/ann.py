@@ -0,0 +1,103 @@
+"""
+IVF (inverted file) index for approximate cosine search, NumPy only.
+
+Rows are L2-normalized and clustered with spherical k-means on a sample; every
+row is then filed under its nearest centroid. A query is compared with the
+centroids only, and the rows of the `nprobe` best lists become candidates that
+the recommender re-ranks exactly. Scanning nprobe/nlist of the table instead of
+all of it is what makes this sub-linear; recall grows with nprobe.
+"""
+from typing import Callable, Optional
+
+import numpy as np
+
+# rows per dense chunk while clustering / assigning (chunk x dims float32)
+CHUNK_ROWS = 8192
+
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+    norms = np.sqrt(np.einsum("ij,ij->i", X, X))
+    norms[norms == 0] = 1.0
+    return X / norms[:, None]
+
+
+def _assign(X: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (max inner product) per row of X, chunked."""
+    out = np.empty(len(X), dtype=np.int64)
+    for a in range(0, len(X), CHUNK_ROWS):
+        out[a:a + CHUNK_ROWS] = np.argmax(X[a:a + CHUNK_ROWS] @ centroids.T, axis=1)
+    return out
+
+
+class IVFIndex:
+    """
+    nlist spherical k-means centroids plus, per list, the row ids filed under it
+    (CSR layout: rows[offsets[j]:offsets[j + 1]], ascending within a list).
+    """
+
+    def __init__(self, centroids: np.ndarray, assignment: np.ndarray):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.nlist = len(self.centroids)
+        self.rows = np.argsort(assignment, kind="stable").astype(np.int64)
+        self.offsets = np.searchsorted(assignment[self.rows], np.arange(self.nlist + 1))
+
+    @classmethod
+    def from_arrays(cls, centroids: np.ndarray, rows: np.ndarray, offsets: np.ndarray) -> "IVFIndex":
+        """Wrap saved arrays (e.g. read-only memory maps) as they are."""
+        index = cls.__new__(cls)
+        index.centroids, index.rows, index.offsets = centroids, rows, offsets
+        index.nlist = len(centroids)
+        return index
+
+    @classmethod
+    def build(
+        cls,
+        take: Callable[[np.ndarray], np.ndarray],
+        n: int,
+        nlist: int,
+        iters: int = 10,
+        sample: Optional[int] = None,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """
+        `take(rows)` returns the dense (len(rows), d) feature rows for row ids;
+        only CHUNK_ROWS rows are densified at a time (plus the training sample,
+        64 rows per list by default).
+        """
+        rng = np.random.default_rng(seed)
+        nlist = max(1, min(int(nlist), n))
+        m = min(n, sample or max(64 * nlist, 10_000))
+        train_rows = np.sort(rng.choice(n, m, replace=False))
+        S = _normalize(take(train_rows))
+
+        centroids = S[rng.choice(m, nlist, replace=False)]
+        for _ in range(iters):
+            labels = _assign(S, centroids)
+            counts = np.bincount(labels, minlength=nlist)
+            filled = np.flatnonzero(counts)
+            starts = (np.cumsum(counts) - counts)[filled]
+            sums = np.zeros_like(centroids)
+            sums[filled] = np.add.reduceat(S[np.argsort(labels, kind="stable")], starts, axis=0)
+            # re-seed empty lists from random training rows
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                sums[empty] = S[rng.choice(m, len(empty))]
+            centroids = _normalize(sums)
+
+        assignment = np.empty(n, dtype=np.int64)
+        for a in range(0, n, CHUNK_ROWS):
+            chunk = np.arange(a, min(a + CHUNK_ROWS, n))
+            assignment[chunk] = np.argmax(take(chunk) @ centroids.T, axis=1)
+        return cls(centroids, assignment)
+
+    def candidates(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        """Row ids (ascending) in the `nprobe` lists whose centroids score highest against q."""
+        nprobe = max(1, min(int(nprobe), self.nlist))
+        scores = self.centroids @ q.astype(np.float32)
+        lists = np.argpartition(-scores, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+        parts = [self.rows[self.offsets[j]:self.offsets[j + 1]] for j in lists]
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes + self.rows.nbytes + self.offsets.nbytes
@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import pandas as pd
+
+from .featurestore import FeatureStore
+from .model import FEATURE_CHOICES, SimpleNBSRecommender
+
+FEATURE_KEYS = [f["key"] for f in FEATURE_CHOICES]
+
+
+def canonical_features(selected_features: Optional[Iterable[Any]]) -> tuple[str, ...]:
+    """
+    Normalize a client feature selection into a cache key:
+    unknown keys are dropped, duplicates removed, order fixed to FEATURE_CHOICES.
+    (Column order does not change cosine scores, so any permutation is the same model.)
+    """
+    wanted = {str(f) for f in (selected_features or [])}
+    return tuple(k for k in FEATURE_KEYS if k in wanted)
+
+
+class RecommenderCache:
+    """
+    LRU cache of fitted SimpleNBSRecommender models, keyed by canonical feature set.
+
+    A cache is bound to one DataFrame: passing a different frame (or calling
+    .invalidate()) drops every fitted model.
+
+    With selected_features=None the model is fitted on every feature, which lets
+    callers score any subset through SimpleNBSRecommender.recommend(features=...).
+
+    `levels` is passed to every fit (see SimpleNBSRecommender.fit).
+    With a FeatureStore, the all-features model is attached from the store's copy
+    for `version` (the frame's content hash) instead of being fitted in-process.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 32,
+        levels: Optional[Dict[str, list[str]]] = None,
+        store: Optional[FeatureStore] = None,
+        version: Optional[str] = None,
+    ):
+        self.maxsize = max(1, int(maxsize))
+        self.levels = levels
+        self.store = store if version is not None else None
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+        self._models: "OrderedDict[tuple[str, ...], SimpleNBSRecommender]" = OrderedDict()
+        self._df_id: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self, df: pd.DataFrame, selected_features: Optional[Iterable[Any]] = None) -> SimpleNBSRecommender:
+        key = tuple(FEATURE_KEYS) if selected_features is None else canonical_features(selected_features)
+
+        with self._lock:
+            if self._df_id != id(df):
+                self._models.clear()
+                self._df_id = id(df)
+
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+
+            self.misses += 1
+            model = self._load(df, key)
+            self._models[key] = model
+            while len(self._models) > self.maxsize:
+                self._models.popitem(last=False)
+            return model
+
+    def _load(self, df: pd.DataFrame, key: tuple[str, ...]) -> SimpleNBSRecommender:
+        if self.store is not None and key == tuple(FEATURE_KEYS):
+            try:
+                return self.store.load_or_fit(df, self.version, levels=self.levels)
+            except OSError as e:
+                print(f"[WARN] Feature store unavailable, fitting in-process: {e}")
+        return SimpleNBSRecommender().fit(df, list(key), levels=self.levels)
+
+    def fitted_levels(self) -> Optional[Dict[str, list[str]]]:
+        """Levels of the all-features model, if one is cached."""
+        with self._lock:
+            model = self._models.get(tuple(FEATURE_KEYS))
+        return model.levels() if model is not None else None
+
+    def nbytes(self) -> int:
+        """Feature blocks + IVF index of every cached model (attached ones count their mapped files)."""
+        with self._lock:
+            models = list(self._models.values())
+        total = 0
+        for model in models:
+            report = model.memory_report()
+            total += report["bytes"] + report["ann_bytes"]
+        return int(total)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._df_id = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._models),
+                "maxsize": self.maxsize,
+            }
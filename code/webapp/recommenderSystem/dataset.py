@@ -0,0 +1,310 @@
+"""
+The loaded dataset and everything derived from it, swapped atomically on reload.
+
+A DatasetState (frame, /api/rs-meta payload, filter index, search index, sorted
+listings, aggregates, fitted models, similar-projects graph, precompressed browse
+CSV) is built completely before it is published, and never modified after.
+Endpoints read DatasetManager.current once per request and use only that state,
+so a reload never changes data under a running request; the old state is freed
+when the last request holding it returns.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import OverviewAggregates
+from .cache import RecommenderCache
+from .delivery import DatasetBundle
+from .featurestore import FeatureStore
+from .listing import ProjectListing
+from .mapcube import CityCube
+from .meta import CachedJSON, build_rs_meta, dataset_version, row_hashes
+from .neighbours import GRAPH_MAX_ROWS, SimilarProjects
+from .query import FilterIndex
+from .search import SearchIndex
+
+
+@dataclass(frozen=True)
+class DatasetState:
+    generation: int  # 1, 2, ... per successful load
+    df: pd.DataFrame
+    version: str  # content hash, used for ETags
+    rs_meta: CachedJSON
+    query_index: FilterIndex
+    search: SearchIndex
+    listing: ProjectListing  # sort permutations + memoized filtered orderings for /api/projects
+    map_cube: CityCube  # city x category counts for the map pies
+    aggregates: OverviewAggregates
+    models: RecommenderCache
+    neighbours: SimilarProjects  # top-k similar projects per project, for /api/projects/{id}/similar
+    delivery: DatasetBundle  # browse CSV for the frontend, compressed on first request
+    source: Any = None  # signature of the files it was read from
+    df_bytes: int = 0  # deep memory of the frame, measured once
+    appended: bool = False  # built incrementally from the previous generation
+    loaded_at: float = field(default_factory=time.time)
+    _hashes: Optional[np.ndarray] = field(default=None, repr=False)
+    _meta: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+    def nbytes(self) -> int:
+        """Estimated memory of the frame and its artifacts (lazily built ones once they are built)."""
+        artifacts = (self.query_index, self.search, self.listing, self.map_cube, self.models, self.neighbours, self.delivery)
+        return int(self.df_bytes + sum(a.nbytes() for a in artifacts))
+
+
+def _appends_to(previous: DatasetState, df: pd.DataFrame, hashes: np.ndarray) -> bool:
+    """True if df is previous.df plus rows at the end (same columns, same leading rows)."""
+    n = len(previous.df)
+    return (
+        0 < n <= len(df)
+        and list(df.columns) == list(previous.df.columns)
+        and bool(np.array_equal(hashes[:n], previous._hashes))
+    )
+
+
+def build_state(
+    df: pd.DataFrame,
+    generation: int,
+    previous: Optional[DatasetState] = None,
+    source: Any = None,
+    model_cache_size: int = 4,
+    warm: bool = True,
+    store: Optional[FeatureStore] = None,
+    coordinates: Optional[pd.DataFrame] = None,
+    neighbour_workers: int = 1,
+    neighbour_max_rows: int = GRAPH_MAX_ROWS,
+) -> DatasetState:
+    """
+    Every derived artifact for `df`. When df only appends rows to `previous.df`,
+    the rs-meta category lists / funding tags and the models' category levels /
+    funding vocabulary are extended from the previous generation instead of rebuilt.
+    warm=True fits the all-features model now, so the first request doesn't pay for
+    it, and starts building the neighbour graph in the background (on up to
+    `neighbour_workers` processes, for up to `neighbour_max_rows` rows; an append
+    keeps the previous graph instead, see neighbours.py). With a FeatureStore both
+    are shared with other processes (see featurestore.py).
+    `coordinates` (city, country, latitude, longitude) places the map pies.
+    """
+    hashes = row_hashes(df)
+    appended = previous is not None and _appends_to(previous, df, hashes)
+
+    if appended:
+        meta = build_rs_meta(df, base=previous._meta, base_rows=len(previous.df))
+        levels = previous.models.fitted_levels()
+    else:
+        meta = build_rs_meta(df)
+        levels = None
+
+    version = dataset_version(df, hashes)
+    query_index = FilterIndex(df)
+    models = RecommenderCache(maxsize=model_cache_size, levels=levels, store=store, version=version)
+    neighbours = SimilarProjects(
+        df,
+        models,
+        store=store,
+        version=version,
+        workers=neighbour_workers,
+        max_rows=neighbour_max_rows,
+        previous=previous.neighbours if appended else None,
+    )
+    if warm and len(df):
+        models.get(df)
+        neighbours.start()
+
+    return DatasetState(
+        generation=generation,
+        df=df,
+        version=version,
+        rs_meta=CachedJSON(meta, version),
+        query_index=query_index,
+        search=SearchIndex(df, query_index),
+        listing=ProjectListing(df, query_index),
+        map_cube=CityCube(df, coordinates),
+        aggregates=OverviewAggregates(df, query_index),
+        models=models,
+        neighbours=neighbours,
+        delivery=DatasetBundle(df),
+        source=source,
+        df_bytes=int(df.memory_usage(deep=True).sum()),
+        appended=appended,
+        _hashes=hashes,
+        _meta=meta,
+    )
+
+
+class DatasetManager:
+    """
+    Holds the current DatasetState and replaces it when the data changes.
+
+      loader:    () -> DataFrame, reads the data files
+      signature: () -> anything comparable that changes when the files do (e.g. sizes + mtimes)
+      store:     optional FeatureStore the all-features model is published to / attached from
+      coordinates: optional () -> DataFrame of city coordinates for the map (read with the data)
+      neighbour_workers: processes that build the similar-projects graph
+      neighbour_max_rows: largest dataset that gets a similar-projects graph (larger ones scan per lookup)
+      on_reload: optional () -> None, called after each reload that swapped in a new state
+
+    reload() builds the next state on a background thread (or inline with wait=True)
+    and publishes it with one reference assignment. Builds never overlap: a reload
+    requested during a build runs once that build is done. watch() polls `signature`
+    and reloads once a change has held still for one interval (so a file still being
+    written is not read half-way). A failed build keeps the current state, and
+    watch() does not retry it until the files change again.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], pd.DataFrame],
+        signature: Callable[[], Any],
+        model_cache_size: int = 4,
+        store: Optional[FeatureStore] = None,
+        coordinates: Optional[Callable[[], pd.DataFrame]] = None,
+        neighbour_workers: int = 1,
+        neighbour_max_rows: int = GRAPH_MAX_ROWS,
+        on_reload: Optional[Callable[[], None]] = None,
+    ):
+        self._loader = loader
+        self._on_reload = on_reload
+        self._coordinates = coordinates
+        self._signature = signature
+        self.model_cache_size = model_cache_size
+        self.store = store
+        self.neighbour_workers = neighbour_workers
+        self.neighbour_max_rows = neighbour_max_rows
+
+        self._state: Optional[DatasetState] = None
+        self._lock = threading.Lock()  # guards _building / _pending
+        self._building = False
+        self._pending = False
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.failed_source: Any = None  # signature of the files the last build failed on
+
+    @property
+    def current(self) -> DatasetState:
+        state = self._state
+        if state is None:
+            raise RuntimeError("No dataset loaded; call .load() first.")
+        return state
+
+    def load(self) -> DatasetState:
+        """First load, inline; errors propagate (there is nothing to fall back to)."""
+        self._build()
+        return self.current
+
+    def _build(self) -> None:
+        source = self._signature()
+        previous = self._state
+        try:
+            df = self._loader()
+            coordinates = self._coordinates() if self._coordinates is not None else None
+            state = build_state(
+                df,
+                generation=(previous.generation + 1) if previous else 1,
+                previous=previous,
+                source=source,
+                model_cache_size=self.model_cache_size,
+                store=self.store,
+                coordinates=coordinates,
+                neighbour_workers=self.neighbour_workers,
+                neighbour_max_rows=self.neighbour_max_rows,
+            )
+        except Exception:
+            self.failed_source = source
+            raise
+        self.failed_source = None
+        self._state = state  # the swap: readers see either the old or the new state, whole
+
+    def _run_builds(self) -> None:
+        while True:
+            try:
+                self._build()
+                self.reloads += 1
+                self.last_error = None
+                if self._on_reload is not None:
+                    self._on_reload()
+            except Exception as e:  # keep serving the current state
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"[WARN] Dataset reload failed, keeping generation {self._state.generation if self._state else None}: {self.last_error}")
+            with self._lock:
+                if not self._pending:
+                    self._building = False
+                    return
+                self._pending = False
+
+    def reload(self, wait: bool = False) -> bool:
+        """
+        Rebuild from the data files. Returns False if a build was already running
+        (this request then runs right after it). With wait=True the build runs in the
+        calling thread.
+        """
+        with self._lock:
+            if self._building:
+                self._pending = True
+                return False
+            self._building = True
+        if wait:
+            self._run_builds()
+        else:
+            threading.Thread(target=self._run_builds, name="dataset-reload", daemon=True).start()
+        return True
+
+    def watch(self, interval: float = 2.0) -> None:
+        """Poll the data files every `interval` s on a daemon thread; reload on a settled change."""
+        if self._watcher is not None or interval <= 0:
+            return
+        self._stop.clear()
+
+        def run():
+            seen = None
+            while not self._stop.wait(interval):
+                try:
+                    sig = self._signature()
+                except OSError:
+                    continue
+                state = self._state
+                if state is None or sig == state.source or sig == self.failed_source:
+                    seen = None  # unchanged, or the files the last build failed on: wait for the next change
+                elif sig == seen:
+                    self.reload()
+                    seen = None
+                else:
+                    seen = sig  # changed since the last poll; wait for it to settle
+
+        self._watcher = threading.Thread(target=run, name="dataset-watch", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def nbytes(self) -> int:
+        """Estimated memory of the state being served (0 before the first load)."""
+        state = self._state
+        return state.nbytes() if state is not None else 0
+
+    def status(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "generation": state.generation if state else 0,
+            "version": state.version if state else None,
+            "rows": len(state.df) if state else 0,
+            "bytes": state.nbytes() if state else 0,
+            "appended": state.appended if state else False,
+            "loaded_at": state.loaded_at if state else None,
+            "reloading": self._building,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "watching": self._watcher is not None,
+        }
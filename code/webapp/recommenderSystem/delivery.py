@@ -0,0 +1,210 @@
+"""
+Precompressed, cache-validated delivery of the dataset and the static assets.
+
+Every payload is compressed once (gzip, and brotli when the `brotli` package is
+installed) and served with a strong ETag per encoding, conditional GET (304) and
+Vary: Accept-Encoding. URLs carrying the content hash (/data/browse.<hash>.csv,
+/assets/...?v=<hash>) are cached as immutable; plain URLs are revalidated.
+
+The browser no longer loads cleaned.csv: it loads a "browse" projection with
+only the columns the filters, results list, map and overview charts read (plus a
+row id), and fetches a project's long text fields from /api/projects/{id}.
+"""
+import gzip
+import hashlib
+import io
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# columns read by filters.js (applyFilters / renderResults / option lists), mapVis.js and charts.js
+BROWSE_COLUMNS = [
+    "intervention_name",
+    "city",
+    "country",
+    "begin_year",
+    "end_year",
+    "nbs_area",
+    "previous_area_type",
+    "nbs_type",
+    "total_cost",
+    "sources_of_funding",
+    "environmental_impacts",
+    "economic_impacts",
+]
+ID_COLUMN = "id"  # row position in the dataset, the key for /api/projects/{id}
+
+# static files worth compressing (images and fonts are already compressed)
+COMPRESSIBLE = {".js", ".css", ".csv", ".html", ".json", ".svg", ".txt"}
+MIN_COMPRESS_BYTES = 1024
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def _negotiate(accept_encoding: str, available) -> str:
+    """Best of br > gzip > identity that the client accepts (q=0 excludes)."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        m = re.search(r"q=([0-9.]+)", params)
+        if m:
+            try:
+                q = float(m.group(1))
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for enc in ("br", "gzip"):
+        if enc in available and accepted.get(enc, accepted.get("*", 0.0)) > 0:
+            return enc
+    return "identity"
+
+
+class Payload:
+    """One body in every encoding worth sending, with its strong ETags."""
+
+    def __init__(self, body: bytes, media_type: str, compress: bool = True):
+        self.media_type = media_type
+        self.hash = content_hash(body)
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if compress and len(body) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=11)
+        # distinct representations need distinct strong validators
+        self.etags = {enc: f'"{self.hash}"' if enc == "identity" else f'"{self.hash}-{enc}"' for enc in self.variants}
+
+    def not_modified(self, if_none_match: str) -> bool:
+        if not if_none_match:
+            return False
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or bool(tags & set(self.etags.values()))
+
+    def response(self, request: Request, immutable: bool = False) -> Response:
+        enc = _negotiate(request.headers.get("accept-encoding", ""), self.variants)
+        headers = {
+            "ETag": self.etags[enc],
+            "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+        if self.not_modified(request.headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=headers)
+        if enc != "identity":
+            headers["Content-Encoding"] = enc
+        body = self.variants[enc]
+        return Response(content=b"" if request.method == "HEAD" else body, media_type=self.media_type, headers=headers)
+
+    def sizes(self) -> Dict[str, int]:
+        return {enc: len(b) for enc, b in self.variants.items()}
+
+
+def browse_csv(df: pd.DataFrame) -> bytes:
+    """The browse projection: id + BROWSE_COLUMNS (those present), as CSV."""
+    cols = [c for c in BROWSE_COLUMNS if c in df.columns]
+    out = df[cols].copy()
+    out.insert(0, ID_COLUMN, range(len(df)))
+    buf = io.StringIO()
+    out.to_csv(buf, index=False)
+    return buf.getvalue().encode("utf-8")
+
+
+class DatasetBundle:
+    """Per-dataset-version payloads, built on first use (compression runs once per version)."""
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self._browse: Optional[Payload] = None
+        self._lock = threading.Lock()
+
+    @property
+    def browse(self) -> Payload:
+        with self._lock:
+            if self._browse is None:
+                self._browse = Payload(browse_csv(self._df), "text/csv; charset=utf-8")
+            return self._browse
+
+    def nbytes(self) -> int:
+        browse = self._browse
+        return sum(browse.sizes().values()) if browse is not None else 0
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves text files from compressed in-memory copies, keyed by
+    (path, mtime, size) so an edited file is picked up. `?v=<content hash>` marks
+    a request as content-addressed and gets an immutable Cache-Control.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._payloads: Dict[str, Tuple[Tuple[int, int], Payload]] = {}
+        self._lock = threading.Lock()
+
+    def payload(self, full_path: str) -> Payload:
+        st = Path(full_path).stat()
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._payloads.get(full_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        body = Path(full_path).read_bytes()
+        media_type = FileResponse(full_path).media_type or "application/octet-stream"
+        p = Payload(body, media_type)
+        with self._lock:
+            self._payloads[full_path] = (key, p)
+        return p
+
+    def file_hash(self, path: str) -> Optional[str]:
+        """Content hash of a file under the mount (path relative to it), or None."""
+        full_path, stat = self.lookup_path(path)
+        return self.payload(full_path).hash if stat is not None else None
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            return response
+        if Path(response.path).suffix.lower() not in COMPRESSIBLE:
+            return response
+        request = Request(scope)
+        payload = self.payload(str(response.path))
+        return payload.response(request, immutable=request.query_params.get("v") == payload.hash)
+
+
+_ASSET_REF = re.compile(r'(?P<attr>href|src)="(?P<url>\./assets/(?P<path>[^"?#]+))"')
+
+
+def versioned_html(html: str, assets: PrecompressedStaticFiles) -> str:
+    """index.html with every ./assets/... reference suffixed with ?v=<content hash>."""
+
+    def sub(m: re.Match) -> str:
+        h = assets.file_hash(m.group("path"))
+        if h is None:
+            return m.group(0)
+        return f'{m.group("attr")}="{m.group("url")}?v={h}"'
+
+    return _ASSET_REF.sub(sub, html)
+
+
+@lru_cache(maxsize=4)
+def page_payload(text: str, media_type: str = "text/html; charset=utf-8") -> Payload:
+    """Payload for a generated document (page, manifest); compressed once per distinct text."""
+    return Payload(text.encode("utf-8"), media_type)
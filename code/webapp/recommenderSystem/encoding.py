@@ -0,0 +1,100 @@
+"""
+JSON encoding of result frames straight from their NumPy columns.
+
+Each column is turned into JSON tokens once (NaN / inf / None -> null), then the
+tokens are joined into the response body; no per-row dicts are built. Shapes:
+  records:  [{"field": value, ...}, ...]            (what DataFrame.to_dict gives)
+  columnar: {"columns": [...], "data": [[...], ...]} (one value array per column)
+"""
+import json
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SHAPES = ("records", "columnar")
+
+_dumps = json.JSONEncoder(ensure_ascii=False, allow_nan=False).encode
+
+
+def _encode_value(v) -> str:
+    if v is None:
+        return "null"
+    if isinstance(v, str):
+        return _dumps(v)
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, int):
+        return str(v)
+    if isinstance(v, float):
+        return repr(v) if np.isfinite(v) else "null"
+    if v is pd.NA or v is pd.NaT:
+        return "null"
+    return _dumps(str(v))
+
+
+def encode_column(values: pd.Series) -> list[str]:
+    """JSON token for every value of a column."""
+    arr = values.to_numpy()
+    if arr.dtype.kind == "f":
+        tokens = np.array([repr(x) for x in arr.tolist()], dtype=object)
+        tokens[~np.isfinite(arr)] = "null"
+        return tokens.tolist()
+    if arr.dtype.kind in "iu":
+        return [str(x) for x in arr.tolist()]
+    if arr.dtype.kind == "b":
+        return ["true" if x else "false" for x in arr.tolist()]
+    missing = pd.isna(arr)
+    return ["null" if m else _encode_value(v) for v, m in zip(arr.tolist(), missing.tolist())]
+
+
+def check_fields(fields: Optional[Sequence[str]], available: Iterable[str]) -> None:
+    """Raise ValueError naming every field in `fields` that is not in `available`."""
+    if fields is None:
+        return
+    available = set(available)
+    unknown = [f for f in dict.fromkeys(fields) if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+
+def project(df: pd.DataFrame, fields: Optional[Sequence[str]]) -> pd.DataFrame:
+    """Keep only `fields` (in that order, names not in df skipped; see check_fields); None keeps every column."""
+    if fields is None:
+        return df
+    return df[[f for f in dict.fromkeys(fields) if f in df.columns]]
+
+
+def encode_frame(df: pd.DataFrame, shape: str = "records") -> str:
+    names = [str(c) for c in df.columns]
+    columns = [encode_column(df[c]) for c in df.columns]
+    if shape == "columnar":
+        data = ",".join("[" + ",".join(col) + "]" for col in columns)
+        return '{"columns":' + _dumps(names) + ',"data":[' + data + "]}"
+    if shape != "records":
+        raise ValueError(f"Unknown shape {shape!r} (expected one of {', '.join(SHAPES)})")
+    keys = [_dumps(n) + ":" for n in names]
+    rows = (
+        "{" + ",".join(k + col[i] for k, col in zip(keys, columns)) + "}"
+        for i in range(len(df))
+    )
+    return "[" + ",".join(rows) + "]"
+
+
+def encode_frames(dfs: Iterable[pd.DataFrame], shape: str = "records") -> str:
+    """A JSON array with one encoded frame per element."""
+    return "[" + ",".join(encode_frame(df, shape) for df in dfs) + "]"
+
+
+def parse_fields(value) -> Optional[list[str]]:
+    """`fields` as a list or a comma-separated string; None / empty = all fields."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        raise ValueError("fields must be a list of names or a comma-separated string")
+    fields = [str(f).strip() for f in value if str(f).strip()]
+    return fields or None
@@ -0,0 +1,114 @@
+"""
+Encoded recommender features published once on disk and memory-mapped by every
+server process (e.g. uvicorn --workers N), so the feature blocks, row norms and
+numeric columns exist once in the page cache instead of once per worker.
+
+Layout: <root>/<dataset version>/ (written by SimpleNBSRecommender.save_features).
+The first process to need a version fits and publishes it under an exclusive
+file lock; the others wait on the lock and attach to what it wrote. The
+"similar projects" neighbour graph (neighbours.py) is kept in the same directory.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .model import SimpleNBSRecommender
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, concurrent builders just race to os.replace
+    fcntl = None
+
+# versions kept next to the one just published (workers still on an older generation)
+KEEP_VERSIONS = 2
+
+
+@contextmanager
+def _locked(path: Path):
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class FeatureStore:
+    """Versioned directory of memory-mappable all-features models."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, version: str) -> Path:
+        return self.root / version
+
+    def load_or_fit(
+        self,
+        df: pd.DataFrame,
+        version: str,
+        levels: Optional[Dict[str, list[str]]] = None,
+    ) -> SimpleNBSRecommender:
+        """
+        The all-features model for `df` (content hash `version`), attached read-only.
+        Fitted and published here if no process has done it yet.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        directory = self.path(version)
+        with _locked(self.root / f"{version}.lock"):
+            if not (directory / "features.json").exists():
+                tmp = Path(tempfile.mkdtemp(prefix=f"{version}.", dir=self.root))
+                try:
+                    SimpleNBSRecommender().fit(df, levels=levels).save_features(tmp)
+                    os.replace(tmp, directory)
+                except BaseException:
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    raise
+                self._prune(keep=version)
+        return SimpleNBSRecommender.attach_features(directory, df)
+
+    def load_or_build_neighbours(
+        self,
+        version: str,
+        k: int,
+        build: Callable[[], Tuple[np.ndarray, np.ndarray]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The neighbour graph (ids, similarities) saved with `version`'s features,
+        attached read-only; built with `build()` and saved if no process has done
+        it yet for this k. Call load_or_fit first (this reuses its lock).
+        """
+        directory = self.path(version)
+        ids_path, sims_path = directory / f"neighbours.{k}.ids.npy", directory / f"neighbours.{k}.sims.npy"
+        with _locked(self.root / f"{version}.lock"):
+            if not (directory / "features.json").exists():
+                raise FileNotFoundError(f"No published features for version {version}")
+            if not (ids_path.exists() and sims_path.exists()):
+                ids, sims = build()
+                try:
+                    for path, arr in ((sims_path, sims), (ids_path, ids)):  # ids last: it marks a complete graph
+                        tmp = path.with_suffix(".tmp.npy")
+                        np.save(tmp, arr)
+                        os.replace(tmp, path)
+                except OSError as e:
+                    print(f"[WARN] Could not save the neighbour graph, keeping it in memory: {e}")
+                    return ids, sims
+        return np.load(ids_path, mmap_mode="r"), np.load(sims_path, mmap_mode="r")
+
+    def _prune(self, keep: str) -> None:
+        """Drop all but the newest KEEP_VERSIONS versions (mapped files stay readable until unmapped)."""
+        versions = sorted(
+            (p for p in self.root.iterdir() if p.is_dir() and (p / "features.json").exists() and p.name != keep),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        for p in versions[KEEP_VERSIONS - 1:]:
+            shutil.rmtree(p, ignore_errors=True)
+            (self.root / f"{p.name}.lock").unlink(missing_ok=True)
@@ -0,0 +1,144 @@
+"""
+Sorted, filtered, paginated project lists for /api/projects (the results table).
+
+Every sortable column gets a sort permutation once per dataset version (the
+common ones at build time, others on first use). A filtered + sorted list is the
+permutation with the rows the FilterIndex rejects dropped: one O(n) pass, no sort,
+memoized per (filters, sort). Each page after that is an O(k) slice of it.
+
+Missing values sort last in both directions; ties keep row order.
+"""
+import base64
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import _Memo
+from .query import FilterIndex, filter_signature
+
+# permutations built with the dataset state (what the results table sorts by)
+SORT_COLUMNS = [
+    "intervention_name",
+    "country",
+    "city",
+    "begin_year",
+    "end_year",
+    "nbs_area",
+    "total_cost",
+    "status",
+]
+
+MAX_PAGE_SIZE = 500
+
+
+def _sort_key(values: pd.Series) -> np.ndarray:
+    """Float key per row, NaN for missing: the value for numeric columns, the (case-folded) rank for the rest."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+    text = values.astype("string").str.strip().str.casefold()
+    codes, _ = pd.factorize(text.where(text != "", pd.NA), sort=True)
+    return np.where(codes < 0, np.nan, codes).astype(float)
+
+
+def parse_sort(sort: Optional[str]) -> tuple[Optional[str], bool]:
+    """(column, descending): "col" ascending, "-col" descending; None / "" -> (None, False), row order."""
+    if not sort:
+        return None, False
+    sort = str(sort).strip()
+    return (sort[1:], True) if sort.startswith("-") else (sort, False)
+
+
+class ProjectListing:
+    """Sort permutations + memoized filtered orderings over one dataset version."""
+
+    def __init__(self, df: pd.DataFrame, index: FilterIndex, maxsize: int = 128):
+        self.n = len(df)
+        self._df = df
+        self.index = index
+        self._keys: Dict[str, np.ndarray] = {}
+        self._perms: Dict[tuple[str, bool], np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._memo = _Memo(maxsize)
+        for col in SORT_COLUMNS:
+            if col in df.columns:
+                self.permutation(col, descending=False)
+
+    def permutation(self, col: str, descending: bool) -> np.ndarray:
+        """Row positions ordered by `col` (missing last, ties by row position)."""
+        with self._lock:
+            perm = self._perms.get((col, descending))
+        if perm is not None:
+            return perm
+        if col not in self._df.columns:
+            raise ValueError(f"Unknown sort column {col!r}")
+        with self._lock:
+            key = self._keys.get(col)
+        if key is None:
+            key = _sort_key(self._df[col])
+        # stable argsort keeps row order within ties and puts NaN last, also for -key
+        perm = np.argsort(-key if descending else key, kind="stable").astype(np.int32)
+        with self._lock:
+            self._keys[col] = key
+            self._perms[(col, descending)] = perm
+        return perm
+
+    def ordered(self, filters: Optional[Dict[str, Any]], sort: Optional[str]) -> np.ndarray:
+        """Row positions matching `filters`, in `sort` order."""
+        col, descending = parse_sort(sort)
+        if col is not None:
+            self.permutation(col, descending)  # unknown column -> ValueError before memoizing
+        key = (filter_signature(filters), col, descending)
+        return self._memo.get_or_compute(key, lambda: self._ordered(filters, col, descending))
+
+    def _ordered(self, filters, col: Optional[str], descending: bool) -> np.ndarray:
+        mask = self.index.mask(filters)
+        if col is None:
+            return np.flatnonzero(mask).astype(np.int32)
+        perm = self.permutation(col, descending)
+        return perm[mask[perm]]
+
+    def page(self, filters: Optional[Dict[str, Any]], sort: Optional[str], offset: int, limit: int) -> tuple[np.ndarray, int]:
+        """(row positions of the page, total matching rows)."""
+        rows = self.ordered(filters, sort)
+        return rows[offset:offset + limit], len(rows)
+
+    def nbytes(self) -> int:
+        with self._lock:
+            arrays = list(self._keys.values()) + list(self._perms.values())
+        return int(sum(a.nbytes for a in arrays))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            perms = len(self._perms)
+        return {**self._memo.stats(), "permutations": perms}
+
+
+# ---------- cursors ----------
+
+def _query_key(filters: Optional[Dict[str, Any]], sort: Optional[str]) -> str:
+    return hashlib.sha1(f"{filter_signature(filters)}|{sort or ''}".encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(version: str, filters: Optional[Dict[str, Any]], sort: Optional[str], offset: int) -> str:
+    """Opaque token for the page starting at `offset` of this query on this dataset version."""
+    raw = json.dumps({"v": version, "q": _query_key(filters, sort), "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, version: str, filters: Optional[Dict[str, Any]], sort: Optional[str]) -> int:
+    """Offset stored in `cursor`; ValueError if it is malformed or from another query / dataset version."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        offset = int(data["o"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Malformed cursor")
+    if data.get("q") != _query_key(filters, sort):
+        raise ValueError("Cursor belongs to a different filter / sort")
+    if data.get("v") != version:
+        raise ValueError("Cursor is from an older dataset version; start again from the first page")
+    return max(0, offset)
@@ -0,0 +1,111 @@
+"""
+City x category counts for the map pie glyphs (/api/map), joined to coordinates.csv.
+
+For every pie metric each row is assigned, once per dataset version, to one cell
+of a sparse city x category cube (the cells that occur). A filtered request sums
+the matching rows' contributions with one bincount over their cell ids, so the
+browser receives per-city slices instead of the projects.
+
+Same grouping as assets/js/mapVis.js: cities keyed by (city, country) and kept
+only if coordinates.csv has them; a slice is a whole field value ("" -> "Unknown");
+cities, slices and the colour domain are in order of first appearance.
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import _Memo
+
+# the options of the #pie-metric select in index.html
+PIE_METRICS = [
+    "nbs_type",
+    "previous_area_type",
+    "sources_of_funding",
+    "environmental_impacts",
+    "economic_impacts",
+]
+UNKNOWN = "Unknown"
+
+
+class CityCube:
+    def __init__(self, df: pd.DataFrame, coordinates: Optional[pd.DataFrame], maxsize: int = 256):
+        self.n = len(df)
+        city = df["city"].fillna("").astype(str) if "city" in df.columns else pd.Series([""] * self.n)
+        country = df["country"].fillna("").astype(str) if "country" in df.columns else pd.Series([""] * self.n)
+
+        # city id per row, -1 where coordinates.csv has no entry (those rows are not drawn)
+        if coordinates is not None and len(coordinates):
+            coords = coordinates.astype({"city": str, "country": str}).drop_duplicates(["city", "country"])
+            keys = pd.MultiIndex.from_frame(coords[["city", "country"]])
+            self._city_of = keys.get_indexer(pd.MultiIndex.from_arrays([city.to_numpy(), country.to_numpy()])).astype(np.int64)
+            self._cities = coords[["city", "country"]].to_numpy(dtype=object)
+            self._latlon = coords[["latitude", "longitude"]].to_numpy(dtype=float)
+        else:
+            self._city_of = np.full(self.n, -1, dtype=np.int64)
+            self._cities = np.empty((0, 2), dtype=object)
+            self._latlon = np.empty((0, 2), dtype=float)
+        self._located = self._city_of >= 0
+
+        # per metric: cell id per row and (city, category) per cell
+        self._cells: Dict[str, tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]] = {}
+        for metric in PIE_METRICS:
+            values = df[metric].fillna("").astype(str) if metric in df.columns else pd.Series([""] * self.n)
+            cat_codes, categories = pd.factorize(values.where(values != "", UNKNOWN))
+            pair = np.where(self._located, self._city_of * len(categories) + cat_codes, -1)
+            cells, cell_of = np.unique(pair, return_inverse=True)
+            if len(cells) and cells[0] == -1:  # unlocated rows
+                cells, cell_of = cells[1:], cell_of - 1
+            self._cells[metric] = (
+                cell_of.astype(np.int64),
+                cells // max(len(categories), 1),
+                cells % max(len(categories), 1),
+                [str(c) for c in categories],
+            )
+
+        self._memo = _Memo(maxsize)
+
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes + b.nbytes + c.nbytes for a, b, c, _ in self._cells.values()) + self._city_of.nbytes)
+
+    def pies(self, metric: str, mask: np.ndarray, signature: str) -> Dict[str, Any]:
+        """Per-city slices of `metric` over the rows in `mask`; memoized under `signature`."""
+        if metric not in self._cells:
+            raise ValueError(f"Unknown pie metric {metric!r} (expected one of {', '.join(PIE_METRICS)})")
+        return self._memo.get_or_compute((metric, signature), lambda: self._pies(metric, mask))
+
+    def _pies(self, metric: str, mask: np.ndarray) -> Dict[str, Any]:
+        cell_of, cell_city, cell_cat, categories = self._cells[metric]
+        rows = np.flatnonzero(mask & self._located)
+        cells = cell_of[rows]
+        counts = np.bincount(cells, minlength=len(cell_city))
+
+        # order of first appearance (rows are ascending, i.e. in data order)
+        present, cell_first = np.unique(cells, return_index=True)
+        city_ids, city_first = np.unique(self._city_of[rows], return_index=True)
+        city_rank = np.empty(len(self._cities), dtype=np.int64)
+        city_rank[city_ids] = np.argsort(np.argsort(city_first))
+        order = np.lexsort((cell_first, city_rank[cell_city[present]]))
+        present = present[order]
+
+        out_cities = []
+        for c in city_ids[np.argsort(city_first)].tolist():
+            (lat, lon), (name, country) = self._latlon[c], self._cities[c]
+            out_cities.append({"city": name, "country": country, "latitude": float(lat), "longitude": float(lon), "count": 0, "slices": []})
+        position = {c: i for i, c in enumerate(city_ids[np.argsort(city_first)].tolist())}
+
+        domain = []
+        seen = set()
+        for cell in present.tolist():
+            entry = out_cities[position[int(cell_city[cell])]]
+            key = categories[int(cell_cat[cell])]
+            value = int(counts[cell])
+            entry["slices"].append({"key": key, "value": value})
+            entry["count"] += value
+            if key not in seen:
+                seen.add(key)
+                domain.append(key)
+        return {"metric": metric, "categories": domain, "cities": out_cities}
+
+    def stats(self) -> Dict[str, int]:
+        return self._memo.stats()
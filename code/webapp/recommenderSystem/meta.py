@@ -0,0 +1,86 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .model import _explode_multivalue
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """One uint64 per row over its values (index ignored)."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def dataset_version(df: pd.DataFrame, hashes: Optional[np.ndarray] = None) -> str:
+    """Content hash of a frame (column names + values), independent of CSV vs snapshot loading."""
+    h = hashlib.sha256()
+    h.update(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    h.update((row_hashes(df) if hashes is None else hashes).tobytes())
+    return h.hexdigest()[:16]
+
+
+def _safe_minmax(series) -> Dict[str, float]:
+    s = pd.to_numeric(series, errors="coerce")
+    s = s.replace([np.inf, -np.inf], np.nan).dropna()
+    if s.empty:
+        return {"min": 0, "max": 0}
+    return {"min": float(s.min()), "max": float(s.max())}
+
+
+def build_rs_meta(df: pd.DataFrame, base: Optional[Dict[str, Any]] = None, base_rows: int = 0) -> Dict[str, Any]:
+    """
+    Category lists, numeric ranges and funding vocabulary for the recommender panel (/api/rs-meta).
+    With `base` (the payload for df's first `base_rows` rows) only the rows after
+    those are scanned for new categories / funding tags.
+    """
+    b = pd.to_numeric(df.get("begin_year"), errors="coerce")
+    e = pd.to_numeric(df.get("end_year"), errors="coerce")
+    duration = (e - b).astype(float)
+
+    new = df.iloc[base_rows:] if base is not None else df
+    known = base["categorical"] if base is not None else {}
+
+    def levels(col: str) -> list[str]:
+        if col not in df.columns:
+            return []
+        return sorted(set(known.get(col, [])) | set(new[col].dropna().astype(str).unique().tolist()))
+
+    _, _, funding_vocab = _explode_multivalue(new.get("sources_of_funding", pd.Series([], dtype=object)))
+    if base is not None:
+        funding_vocab = sorted(set(base["funding_tags"]) | set(funding_vocab))
+
+    return {
+        "categorical": {
+            "country": levels("country"),
+            "status": levels("status"),
+            "previous_area_type": levels("previous_area_type"),
+        },
+        "numeric_ranges": {
+            "duration": _safe_minmax(duration),
+            "nbs_area": _safe_minmax(df.get("nbs_area")),
+            "total_cost": _safe_minmax(df.get("total_cost")),
+        },
+        "funding_tags": funding_vocab,
+    }
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """True if an If-None-Match header value names `etag` (weak comparison, "*" matches all)."""
+    if not if_none_match:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+class CachedJSON:
+    """A JSON payload serialized once, with a strong ETag derived from the dataset version."""
+
+    def __init__(self, payload: Any, version: str):
+        self.body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{version}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        """True if an If-None-Match header value already names this payload."""
+        return etag_matches(if_none_match, self.etag)
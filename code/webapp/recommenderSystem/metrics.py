@@ -0,0 +1,191 @@
+"""
+In-process counters and latency histograms, rendered in the Prometheus text
+exposition format (served by GET /metrics; no client library needed).
+
+    with stage_timer("similarity"):
+        ...
+
+    @timed("fit")
+    def fit(...): ...
+
+Both feed the nbs_stage_seconds{stage=...} histogram.
+"""
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Sequence
+
+# seconds; spans a cached top-k lookup (~0.1 ms) to a cold fit on a large table
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = []
+    for n, v in zip(names, values):
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{n}="{v}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(x: float) -> str:
+    if math.isinf(x):
+        return "+Inf" if x > 0 else "-Inf"
+    return repr(float(x)) if not float(x).is_integer() else str(int(x))
+
+
+class Counter:
+    """Monotonic counter, optionally labelled."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_label_str(self.labels, key)} {_num(v)}"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (seconds), optionally labelled."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)], sum
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._series.items())
+        for key, (counts, total) in items:
+            running = 0
+            for bound, c in zip((*self.buckets, math.inf), counts):
+                running += c
+                le = 'le="' + _num(bound) + '"'
+                yield f"{self.name}_bucket{_label_str(self.labels, key, le)} {running}"
+            yield f"{self.name}_sum{_label_str(self.labels, key)} {_num(total)}"
+            yield f"{self.name}_count{_label_str(self.labels, key)} {running}"
+
+
+class Callback:
+    """
+    A gauge (or counter) whose value is read when /metrics is rendered.
+    `fn` returns a number, or {label value tuple: number} for labelled series.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Any], labels: Sequence[str] = (), type: str = "gauge"):
+        self.name, self.help, self.labels, self.type = name, help, tuple(labels), type
+        self._fn = fn
+
+    def samples(self) -> Iterable[str]:
+        value = self._fn()
+        if value is None:
+            return
+        if not isinstance(value, dict):
+            value = {(): value}
+        for key, v in sorted(value.items()):
+            yield f"{self.name}{_label_str(self.labels, key)} {_num(v)}"
+
+
+class Registry:
+    """Named metrics, created once and looked up by name afterwards."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_add(self, name: str, make: Callable[[], Any]) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = make()
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_add(name, lambda: Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_add(name, lambda: Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable[[], Any], labels: Sequence[str] = (), type: str = "gauge") -> None:
+        """Register (or replace) a value read at render time."""
+        with self._lock:
+            self._metrics[name] = Callback(name, help, fn, labels, type)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            try:
+                samples = list(m.samples())
+            except Exception:  # a broken callback must not take /metrics down
+                continue
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "nbs_stage_seconds",
+    "Time spent in one stage of the recommender / request handling.",
+    labels=("stage",),
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Observe the duration of the with-block under nbs_stage_seconds{stage=...}."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=stage)
+
+
+def timed(stage: str):
+    """Decorator form of stage_timer."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - t0, stage=stage)
+
+        return wrapper
+
+    return decorate
@@ -1,10 +1,19 @@
+import json
 import re
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+from pathlib import Path
 from typing import Any, Dict, Optional, Sequence
 
 import numpy as np
 import pandas as pd
 
+try:
+    from .ann import IVFIndex
+    from .metrics import timed
+except ImportError:  # imported as a top-level module (cwd = recommenderSystem, see test.ipynb)
+    from ann import IVFIndex
+    from metrics import timed
+
 
 # ---- Feature keys (match your dataframe columns) ----
 # df columns: intervention_name, city, country, begin_year, end_year, status, spatial_scale, nbs_area,
@@ -23,6 +32,24 @@ FEATURE_CHOICES = [
 COLUMN_CHOICES = [f["label"] for f in FEATURE_CHOICES]
 LABEL_TO_KEY = {f["label"]: f["key"] for f in FEATURE_CHOICES}
 
+# Result columns shown first (in this order); "similarity" is added by recommend()
+PREFERRED_FIRST = [
+    "intervention_name",
+    "city",
+    "country",
+    "status",
+    "begin_year",
+    "end_year",
+    "duration",
+    "nbs_area",
+    "total_cost",
+    "sources_of_funding",
+    "link",
+]
+
+# Tables at least this long get an IVF index by default (below it a full scan is already fast)
+ANN_MIN_ROWS = 200_000
+
 
 def choose_columns_and_k_interactively() -> tuple[list[str], int]:
     """
@@ -78,21 +105,91 @@ def _split_multivalue(text: Any) -> list[str]:
     return [p.strip() for p in parts if p.strip()]
 
 
+def _extend_levels(known: Optional[Sequence[str]], found) -> list[str]:
+    """`known` in its order, then the values of `found` not in it, sorted."""
+    known = list(known or [])
+    seen = set(known)
+    return known + sorted({v for v in found if v not in seen})
+
+
+def _explode_multivalue(values: pd.Series, vocab: Optional[Sequence[str]] = None) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """
+    _split_multivalue over a whole column. Each distinct cell is split once and its
+    tag codes are broadcast to the rows holding it.
+    Returns (rows, codes, vocab): one entry per distinct tag of each row, rows ascending
+    and codes ascending within a row; codes index into the returned vocab, which is
+    the given `vocab` extended with new tags (sorted), or all tags sorted.
+    """
+    cell_codes, cells = pd.factorize(values.to_numpy(dtype=object))  # missing -> -1
+    cell_tags = [_split_multivalue(c) for c in cells]
+    vocab = _extend_levels(vocab, (t for tags in cell_tags for t in tags))
+    index = {t: i for i, t in enumerate(vocab)}
+    per_cell = [sorted({index[t] for t in tags}) for tags in cell_tags]
+
+    # trailing 0-length slot so code -1 (missing) maps to no tags
+    lengths = np.array([len(c) for c in per_cell] + [0], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lengths)])[:-1]
+    flat = np.array([j for c in per_cell for j in c], dtype=np.int64)
+
+    row_len = lengths[cell_codes]
+    rows = np.repeat(np.arange(len(cell_codes), dtype=np.int64), row_len)
+    within = np.arange(len(rows)) - np.repeat(np.cumsum(row_len) - row_len, row_len)
+    codes = flat[np.repeat(starts[cell_codes], row_len) + within] if len(rows) else np.zeros(0, dtype=np.int64)
+    return rows, codes, vocab
+
+
+@timed("top_k")
+def _preference_number(feature: str, value: Any) -> float:
+    """A numeric preference as a finite float; ValueError otherwise (lists, "abc", "inf", NaN)."""
+    try:
+        x = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Preference for {feature!r} must be a number, got {value!r}")
+    if not np.isfinite(x):
+        raise ValueError(f"Preference for {feature!r} must be a finite number, got {value!r}")
+    return x
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Row indices of the k highest scores, best first, in O(n).
+    Ties are broken by lower row index (NaN counts as -inf), so results are deterministic.
+    """
+    n = len(scores)
+    k = min(int(k), n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    s = np.where(np.isnan(scores), -np.inf, scores)
+    kth = s[np.argpartition(s, n - k)[n - k]]
+
+    above = np.flatnonzero(s > kth)
+    ties = np.flatnonzero(s == kth)[: k - len(above)]
+    rows = np.concatenate([above, ties])
+
+    order = np.lexsort((rows, -s[rows]))
+    return rows[order]
+
+
 @dataclass
 class _Scaler:
     means: Dict[str, float]
     stds: Dict[str, float]
     use_log1p: set
 
+    def transform_column(self, c: str, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        if c in self.use_log1p:
+            x = np.log1p(np.clip(x, a_min=0, a_max=None))
+        m = self.means[c]
+        s = self.stds[c] if self.stds[c] != 0 else 1.0
+        return (x - m) / s
+
     def transform(self, df: pd.DataFrame, numeric_cols: list[str]) -> np.ndarray:
         arrs = []
         for c in numeric_cols:
             x = df[c].astype(float).to_numpy()
-            if c in self.use_log1p:
-                x = np.log1p(np.clip(x, a_min=0, a_max=None))
-            m = self.means[c]
-            s = self.stds[c] if self.stds[c] != 0 else 1.0
-            arrs.append(((x - m) / s).reshape(-1, 1))
+            arrs.append(self.transform_column(c, x).reshape(-1, 1))
         return np.hstack(arrs) if arrs else np.zeros((len(df), 0), dtype=float)
 
     def transform_user(self, user_vals: Dict[str, Any], numeric_cols: list[str]) -> np.ndarray:
@@ -111,6 +208,130 @@ class _Scaler:
         return np.array(vals, dtype=float)
 
 
+class _DenseBlock:
+    """Numeric feature columns, stored as float32."""
+
+    def __init__(self, values: np.ndarray):
+        self.values = np.ascontiguousarray(values, dtype=np.float32).reshape(len(values), -1)
+        self.shape = self.values.shape
+        self.sq_norms = np.einsum("ij,ij->i", self.values, self.values)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"values": self.values, "sq_norms": self.sq_norms}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "_DenseBlock":
+        """Wrap saved arrays (e.g. read-only memory maps) without copying or recomputing."""
+        block = cls.__new__(cls)
+        block.values, block.sq_norms = arrays["values"], arrays["sq_norms"]
+        block.shape = block.values.shape
+        return block
+
+    def meta(self) -> Dict[str, Any]:
+        return {"kind": "dense"}
+
+    def dot(self, u: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        values = self.values if rows is None else self.values[rows]
+        return values @ u.astype(np.float32)
+
+    def dot_many(self, U: np.ndarray) -> np.ndarray:
+        """Scores for p user rows at once: (p, m) @ X.T -> (p, n)."""
+        return U.astype(np.float32) @ self.values.T
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        """Dense float32 copy of the given rows."""
+        return self.values[rows]
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.sq_norms.nbytes
+
+
+class _CSRBlock:
+    """
+    0/1 one-hot or multi-hot columns in CSR form (indptr/indices/data), NumPy only.
+    Row i has non-zeros indices[indptr[i]:indptr[i + 1]].
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, n_cols: int, data: Optional[np.ndarray] = None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.ones(len(self.indices), dtype=np.float32) if data is None else np.asarray(data, dtype=np.float32)
+        self.shape = (len(self.indptr) - 1, int(n_cols))
+        # one-hot blocks have exactly one entry per row, so row sums are a plain gather
+        self.one_per_row = len(self.indices) == self.shape[0] and bool(np.all(np.diff(self.indptr) == 1))
+        self.binary = bool(np.all(self.data == 1))
+        self.sq_norms = self._row_sums(self.data * self.data).astype(np.float32)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"indptr": self.indptr, "indices": self.indices, "data": self.data, "sq_norms": self.sq_norms}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "_CSRBlock":
+        """Wrap saved arrays (e.g. read-only memory maps) without copying or recomputing."""
+        block = cls.__new__(cls)
+        for name in ("indptr", "indices", "data", "sq_norms"):
+            setattr(block, name, arrays[name])
+        block.shape = (len(block.indptr) - 1, int(meta["n_cols"]))
+        block.one_per_row = bool(meta["one_per_row"])
+        block.binary = bool(meta["binary"])
+        return block
+
+    def meta(self) -> Dict[str, Any]:
+        return {"kind": "csr", "n_cols": self.shape[1], "one_per_row": self.one_per_row, "binary": self.binary}
+
+    def _row_sums(self, vals: np.ndarray) -> np.ndarray:
+        if self.one_per_row:
+            return vals.astype(float)
+        # prefix sums handle empty rows, unlike np.add.reduceat
+        c = np.concatenate([[0.0], np.cumsum(vals, dtype=float)])
+        return c[self.indptr[1:]] - c[self.indptr[:-1]]
+
+    def dot(self, u: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        if rows is None:
+            return self._row_sums(self.data * u[self.indices])
+        if self.one_per_row:
+            return self.data[rows] * u[self.indices[rows]]
+        r, pos = self._positions(rows)
+        return np.bincount(r, weights=self.data[pos] * u[self.indices[pos]], minlength=len(rows))
+
+    def _positions(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(output row, position in indices/data) for every non-zero of the given rows."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, counts = self.indptr[rows], self.indptr[rows + 1] - self.indptr[rows]
+        r = np.repeat(np.arange(len(rows)), counts)
+        pos = np.arange(len(r)) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+        return r, pos
+
+    def dot_many(self, U: np.ndarray) -> np.ndarray:
+        """Scores for p user rows at once: (p, m) @ X.T -> (p, n)."""
+        if self.one_per_row:
+            out = U[:, self.indices]
+            return out if self.binary else out * self.data
+        # multi-hot: gather every non-zero's column for all profiles at once, then
+        # per-row sums as differences of prefix sums along the non-zeros (as _row_sums)
+        vals = U[:, self.indices]
+        if not self.binary:
+            vals = vals * self.data
+        c = np.zeros((len(U), len(self.indices) + 1), dtype=float)
+        np.cumsum(vals, axis=1, out=c[:, 1:])
+        return c[:, self.indptr[1:]] - c[:, self.indptr[:-1]]
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        """Dense float32 copy of the given rows."""
+        out = np.zeros((len(rows), self.shape[1]), dtype=np.float32)
+        if self.one_per_row:
+            out[np.arange(len(rows)), self.indices[rows]] = self.data[rows]
+            return out
+        r, pos = self._positions(rows)
+        out[r, self.indices[pos]] = self.data[pos]
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes + self.sq_norms.nbytes
+
+
 class SimpleNBSRecommender:
     """
     Recommender with:
@@ -118,25 +339,61 @@ class SimpleNBSRecommender:
       - multi-hot for funding tags
       - scaled numerics (log1p for big ranges)
       - cosine similarity to a user's preference vector
+
+    By default every key in FEATURE_CHOICES is encoded once, one block per
+    feature (float32 numerics, CSR for one-hot / multi-hot), with squared row
+    norms precomputed, so any subset (optionally weighted) can be scored
+    block-wise without refitting.
+
+    Optionally fit() also builds an IVF index (see ann.py) and recommend() scores
+    only the rows of the `ann_nprobe` closest lists, exactly, for queries on all
+    features at equal weight (the space it is clustered in; others scan every row).
+      ann_lists: number of IVF lists; None = sqrt(rows) when rows >= ANN_MIN_ROWS, 0 = never
     """
 
-    def __init__(self):
+    def __init__(self, ann_lists: Optional[int] = None, ann_nprobe: int = 32):
+        self.ann_lists = ann_lists
+        self.ann_nprobe = ann_nprobe
         self.selected_features: list[str] = []
         self.numeric_cols: list[str] = []
         self.categorical_cols: list[str] = []
         self.use_funding: bool = False
 
-        self._df: Optional[pd.DataFrame] = None
-        self._X: Optional[np.ndarray] = None
+        self._df: Optional[pd.DataFrame] = None  # the frame passed to fit (not copied)
+        self._work: Optional[pd.DataFrame] = None  # cleaned feature columns (filled, + duration)
+        self._blocks: Dict[str, Any] = {}  # feature -> _DenseBlock | _CSRBlock
+        self._spans: Dict[str, slice] = {}  # feature -> columns in the user vector
 
         self._cat_levels: Dict[str, list[str]] = {}
+        self._cat_index: Dict[str, Dict[str, int]] = {}  # level -> column within the block
         self._funding_vocab: list[str] = []
+        self._funding_index: Dict[str, int] = {}
         self._scaler: Optional[_Scaler] = None
-
-    def fit(self, df: pd.DataFrame, selected_features: Sequence[str]) -> "SimpleNBSRecommender":
+        self._ann: Optional[IVFIndex] = None
+
+    @timed("fit")
+    def fit(
+        self,
+        df: pd.DataFrame,
+        selected_features: Optional[Sequence[str]] = None,
+        levels: Optional[Dict[str, Sequence[str]]] = None,
+    ) -> "SimpleNBSRecommender":
+        """
+        Encode `df`. `levels` ({feature: category levels / funding tags}, e.g. a
+        previous model's .levels() when df only appends rows to its frame) keeps those
+        columns in place and appends new values, instead of re-sorting every level.
+        Column order never changes cosine scores.
+        """
+        levels = levels or {}
+        if selected_features is None:
+            selected_features = [f["key"] for f in FEATURE_CHOICES]
         self.selected_features = list(selected_features)
 
-        work = df.copy()
+        # copy only the columns the encoders read; result rows come from df itself
+        source_cols = [c for c in self.selected_features if c != "duration"]
+        if "duration" in self.selected_features:
+            source_cols += ["begin_year", "end_year"]
+        work = df[[c for c in dict.fromkeys(source_cols) if c in df.columns]].copy()
 
         # Ensure required base columns exist if duration is used
         if "duration" in self.selected_features:
@@ -163,13 +420,12 @@ class SimpleNBSRecommender:
             med = float(work[c].median()) if work[c].notna().any() else 0.0
             work[c] = work[c].fillna(med)
 
-        # funding tags
-        funding_tags = None
+        # funding tags: one (row, tag) pair per tag
         if self.use_funding:
             if "sources_of_funding" not in work.columns:
                 raise KeyError("Missing column in df: sources_of_funding")
-            funding_tags = work["sources_of_funding"].apply(_split_multivalue)
-            self._funding_vocab = sorted({t for tags in funding_tags for t in tags})
+            tag_rows, tag_codes, self._funding_vocab = _explode_multivalue(work["sources_of_funding"], levels.get("sources_of_funding"))
+            self._funding_index = {t: i for i, t in enumerate(self._funding_vocab)}
 
         # scaler for numeric
         means, stds = {}, {}
@@ -184,109 +440,422 @@ class SimpleNBSRecommender:
         self._scaler = _Scaler(means=means, stds=stds, use_log1p=use_log1p)
 
         X_num = self._scaler.transform(work, self.numeric_cols)
+        n = len(work)
+
+        self._blocks = {}
+        for j, c in enumerate(self.numeric_cols):
+            self._blocks[c] = _DenseBlock(X_num[:, j])
 
-        # categorical one-hot
-        cat_blocks = []
+        # categorical one-hot (exactly one non-zero per row): sorted factorize codes
         for c in self.categorical_cols:
-            levels = sorted(work[c].astype(str).unique().tolist())
-            self._cat_levels[c] = levels
-
-            col_vals = work[c].astype(str).to_numpy()
-            block = np.zeros((len(work), len(levels)), dtype=float)
-            idx = {lvl: j for j, lvl in enumerate(levels)}
-            for i, v in enumerate(col_vals):
-                j = idx.get(v)
-                if j is not None:
-                    block[i, j] = 1.0
-            cat_blocks.append(block)
-        X_cat = np.hstack(cat_blocks) if cat_blocks else np.zeros((len(work), 0), dtype=float)
-
-        # funding multi-hot
-        if self.use_funding:
-            vocab_index = {t: i for i, t in enumerate(self._funding_vocab)}
-            X_fund = np.zeros((len(work), len(self._funding_vocab)), dtype=float)
-            for i, tags in enumerate(funding_tags):
-                for t in tags:
-                    j = vocab_index.get(t)
-                    if j is not None:
-                        X_fund[i, j] = 1.0
-        else:
-            X_fund = np.zeros((len(work), 0), dtype=float)
+            if levels.get(c):
+                self._cat_levels[c] = _extend_levels(levels[c], pd.unique(work[c]))
+                codes = pd.Index(self._cat_levels[c]).get_indexer(work[c])
+            else:
+                codes, found = pd.factorize(work[c], sort=True)
+                self._cat_levels[c] = [str(lvl) for lvl in found]
+            self._cat_index[c] = {lvl: j for j, lvl in enumerate(self._cat_levels[c])}
+            self._blocks[c] = _CSRBlock(np.arange(n + 1), codes, len(self._cat_levels[c]))
 
-        self._X = np.hstack([X_num, X_cat, X_fund]).astype(float)
-        self._df = work
+        # funding multi-hot: (row, code) pairs are already unique and row-sorted -> CSR
+        if self.use_funding:
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(tag_rows, minlength=n), out=indptr[1:])
+            self._blocks["sources_of_funding"] = _CSRBlock(indptr, tag_codes, len(self._funding_vocab))
+
+        self._df = df
+        self._work = work
+        self._set_spans()
+
+        nlist = self.ann_lists
+        if nlist is None:
+            nlist = int(np.sqrt(n)) if n >= ANN_MIN_ROWS else 0
+        self._ann = IVFIndex.build(self._take_rows, n, nlist) if nlist > 0 and n > 0 else None
         return self
 
+    def _set_spans(self) -> None:
+        """Column span of every feature inside the user vector (same order as _make_user_vector)."""
+        self._spans = {}
+        start = 0
+        for c in self.numeric_cols:
+            self._spans[c] = slice(start, start + 1)
+            start += 1
+        for c in self.categorical_cols:
+            width = len(self._cat_levels[c])
+            self._spans[c] = slice(start, start + width)
+            start += width
+        if self.use_funding:
+            self._spans["sources_of_funding"] = slice(start, start + len(self._funding_vocab))
+
+    # ---------- feature store ----------
+
+    def save_features(self, directory) -> Path:
+        """
+        Write the fitted state to `directory`: every block array and the filled
+        numeric columns as .npy, the rest (features, levels, scaler) in features.json.
+        attach_features() maps it back read-only, so several processes share one copy.
+        """
+        if self._df is None:
+            raise RuntimeError("Call .fit(df, selected_features) before .save_features().")
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        blocks = {}
+        for i, (f, block) in enumerate(self._blocks.items()):
+            for name, arr in block.arrays().items():
+                np.save(directory / f"b{i}.{name}.npy", np.ascontiguousarray(arr))
+            blocks[f] = {"file": f"b{i}", **block.meta()}
+        for c in self.numeric_cols:
+            np.save(directory / f"w.{c}.npy", self._work[c].to_numpy())
+        if self._ann is not None:
+            for name in ("centroids", "rows", "offsets"):
+                np.save(directory / f"ann.{name}.npy", getattr(self._ann, name))
+
+        meta = {
+            "rows": len(self._df),
+            "selected_features": self.selected_features,
+            "numeric_cols": self.numeric_cols,
+            "categorical_cols": self.categorical_cols,
+            "use_funding": self.use_funding,
+            "cat_levels": self._cat_levels,
+            "funding_vocab": self._funding_vocab,
+            "scaler": {**asdict(self._scaler), "use_log1p": sorted(self._scaler.use_log1p)},
+            "blocks": blocks,
+            "ann": self._ann is not None,
+        }
+        with open(directory / "features.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        return directory
+
+    @classmethod
+    def attach_features(cls, directory, df: pd.DataFrame, ann_nprobe: int = 32) -> "SimpleNBSRecommender":
+        """
+        A model over `df` (the frame save_features was called for) whose arrays are
+        read-only memory maps of `directory`; nothing is refitted and the pages are
+        shared with every other process attached to the same files.
+        """
+        directory = Path(directory)
+        with open(directory / "features.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["rows"] != len(df):
+            raise ValueError(f"Feature store has {meta['rows']} rows, frame has {len(df)}")
+
+        def load(name: str) -> np.ndarray:
+            return np.load(directory / f"{name}.npy", mmap_mode="r")
+
+        model = cls(ann_lists=0, ann_nprobe=ann_nprobe)
+        model.selected_features = meta["selected_features"]
+        model.numeric_cols = meta["numeric_cols"]
+        model.categorical_cols = meta["categorical_cols"]
+        model.use_funding = meta["use_funding"]
+        model._cat_levels = meta["cat_levels"]
+        model._cat_index = {c: {lvl: j for j, lvl in enumerate(levels)} for c, levels in model._cat_levels.items()}
+        model._funding_vocab = meta["funding_vocab"]
+        model._funding_index = {t: i for i, t in enumerate(model._funding_vocab)}
+        scaler = meta["scaler"]
+        model._scaler = _Scaler(means=scaler["means"], stds=scaler["stds"], use_log1p=set(scaler["use_log1p"]))
+
+        kinds = {"dense": _DenseBlock, "csr": _CSRBlock}
+        for f, b in meta["blocks"].items():
+            names = ["values", "sq_norms"] if b["kind"] == "dense" else ["indptr", "indices", "data", "sq_norms"]
+            model._blocks[f] = kinds[b["kind"]].from_arrays({n: load(f"{b['file']}.{n}") for n in names}, b)
+        if meta["ann"]:
+            model._ann = IVFIndex.from_arrays(load("ann.centroids"), load("ann.rows"), load("ann.offsets"))
+
+        # numeric feature columns (filled, duration derived) share the mapped files;
+        # categorical ones are rebuilt per result row from the one-hot codes
+        model._df = df
+        model._work = pd.DataFrame({c: load(f"w.{c}") for c in model.numeric_cols}, index=df.index, copy=False)
+        model._set_spans()
+        return model
+
+    def levels(self) -> Dict[str, list[str]]:
+        """Category levels and funding tags in block column order (see fit(levels=...))."""
+        out = {c: list(self._cat_levels[c]) for c in self.categorical_cols}
+        if self.use_funding:
+            out["sources_of_funding"] = list(self._funding_vocab)
+        return out
+
+    def _take_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Dense (len(rows), width) feature rows laid out like _spans, all weights 1."""
+        return np.hstack([self._blocks[f].take(rows) for f in self._spans])
+
+    def unit_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        _take_rows scaled to unit length (all-zero rows stay zero), so the cosine
+        similarity of two rows over every feature is their dot product.
+        """
+        sq = np.zeros(len(rows), dtype=float)
+        for block in self._blocks.values():
+            sq += block.sq_norms[rows]
+        norms = np.sqrt(sq)
+        norms[norms == 0] = 1.0
+        return self._take_rows(rows) / norms[:, None].astype(np.float32)
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Bytes held by the encoded feature blocks vs. the old dense float64 _X."""
+        n = len(self._df) if self._df is not None else 0
+        blocks = {}
+        for f, block in self._blocks.items():
+            blocks[f] = {
+                "shape": list(block.shape),
+                "bytes": int(block.nbytes),
+                "dense_float64_bytes": int(block.shape[0] * block.shape[1] * 8),
+            }
+        stored = sum(b["bytes"] for b in blocks.values())
+        dense = sum(b["dense_float64_bytes"] for b in blocks.values())
+        return {
+            "rows": n,
+            "columns": sum(b["shape"][1] for b in blocks.values()),
+            "bytes": stored,
+            "dense_float64_bytes": dense,
+            "saving_ratio": (dense / stored) if stored else 0.0,
+            "blocks": blocks,
+            "ann_bytes": int(self._ann.nbytes) if self._ann is not None else 0,
+        }
+
     def _make_user_vector(self, preferences: Dict[str, Any]) -> np.ndarray:
-        u_num = self._scaler.transform_user(preferences, self.numeric_cols) if self.numeric_cols else np.zeros((0,), dtype=float)
+        return self._make_user_matrix([preferences])[0]
+
+    @timed("user_vector")
+    def _make_user_matrix(self, preferences_list: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """One row per preference dict, columns laid out like _spans."""
+        p = len(preferences_list)
+        width = max((span.stop for span in self._spans.values()), default=0)
+        U = np.zeros((p, width), dtype=float)
+
+        # numerics (missing value -> 0, i.e. the scaled mean)
+        for c in self.numeric_cols:
+            raw = [prefs.get(c, None) for prefs in preferences_list]
+            given = np.array([v is not None and v != "" for v in raw], dtype=bool)
+            x = np.array([_preference_number(c, v) if ok else 0.0 for v, ok in zip(raw, given)], dtype=float)
+            U[:, self._spans[c].start] = np.where(given, self._scaler.transform_column(c, x), 0.0)
 
         # categoricals
-        u_cat_parts = []
         for c in self.categorical_cols:
-            levels = self._cat_levels.get(c, [])
-            vec = np.zeros((len(levels),), dtype=float)
-            v = preferences.get(c, None)
-            if v is not None and v != "":
-                v = str(v)
-                if v in levels:
-                    vec[levels.index(v)] = 1.0
-            u_cat_parts.append(vec)
-        u_cat = np.concatenate(u_cat_parts) if u_cat_parts else np.zeros((0,), dtype=float)
+            idx = self._cat_index[c]
+            codes = np.array(
+                [idx.get(str(v), -1) if v is not None and v != "" else -1 for v in (prefs.get(c, None) for prefs in preferences_list)],
+                dtype=np.int64,
+            )
+            hit = np.flatnonzero(codes >= 0)
+            U[hit, self._spans[c].start + codes[hit]] = 1.0
 
         # funding
         if self.use_funding:
-            vec = np.zeros((len(self._funding_vocab),), dtype=float)
-            user_f = preferences.get("sources_of_funding", [])
-            if isinstance(user_f, str):
-                user_tags = _split_multivalue(user_f)
-            elif isinstance(user_f, (list, tuple, set)):
-                user_tags = [str(x).strip() for x in user_f if str(x).strip()]
+            vocab_index = self._funding_index
+            rows, cols = [], []
+            for r, prefs in enumerate(preferences_list):
+                user_f = prefs.get("sources_of_funding", [])
+                if isinstance(user_f, str):
+                    user_tags = _split_multivalue(user_f)
+                elif isinstance(user_f, (list, tuple, set)):
+                    user_tags = [str(x).strip() for x in user_f if str(x).strip()]
+                else:
+                    user_tags = []
+                for t in user_tags:
+                    j = vocab_index.get(t)
+                    if j is not None:
+                        rows.append(r)
+                        cols.append(j)
+            U[np.array(rows, dtype=np.int64), self._spans["sources_of_funding"].start + np.array(cols, dtype=np.int64)] = 1.0
+
+        return U
+
+    def _feature_weights(
+        self,
+        features: Optional[Sequence[str]] = None,
+        weights: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, float]:
+        """Resolve a feature subset + optional per-feature weights into {feature: weight}."""
+        if features is None:
+            features = list(self._spans)
+        weights = weights or {}
+
+        out: Dict[str, float] = {}
+        for f in features:
+            if f not in self._spans or f in out:
+                continue
+            w = weights.get(f, 1.0)
+            try:
+                w = float(w)
+            except (TypeError, ValueError):
+                raise ValueError(f"Weight for {f!r} is not a number: {w!r}")
+            if not np.isfinite(w) or w < 0:
+                raise ValueError(f"Weight for {f!r} must be finite and non-negative, got {w}")
+            out[f] = w
+        return out
+
+    @timed("similarity")
+    def _cosine_sim_matrix(self, u: np.ndarray, feature_weights: Dict[str, float], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cosine similarity over the selected feature blocks.
+        A weight w multiplies a block's contribution to both the dot product and the
+        squared norms (i.e. block columns are scaled by sqrt(w)); all-ones reproduces
+        the plain cosine over the concatenated blocks.
+
+        u is one user vector (-> shape (n,)) or a (p, d) user matrix (-> shape (p, n),
+        one U @ X.T per block, a row of scores per profile).
+        `rows` (single u only) restricts scoring to those rows; the result is aligned with it.
+        """
+        single = u.ndim == 1
+        n = len(self._df) if rows is None else len(rows)
+        shape = (n,) if single else (u.shape[0], n)
+        dots = np.zeros(shape, dtype=float)
+        X_sq = np.zeros(n, dtype=float)
+        u_sq = 0.0 if single else np.zeros(u.shape[0], dtype=float)
+        for f, w in feature_weights.items():
+            if w == 0:
+                continue
+            block = self._blocks[f]
+            span = self._spans[f]
+            if single:
+                u_f = u[span]
+                dots += w * block.dot(u_f, rows)
+                u_sq += w * float(u_f @ u_f)
             else:
-                user_tags = []
-            vocab_index = {t: i for i, t in enumerate(self._funding_vocab)}
-            for t in user_tags:
-                j = vocab_index.get(t)
-                if j is not None:
-                    vec[j] = 1.0
-            u_fund = vec
+                U_f = u[:, span]
+                part = block.dot_many(U_f)
+                if w != 1:
+                    part *= w
+                dots += part
+                u_sq += w * np.einsum("ij,ij->i", U_f, U_f)
+            X_sq += w * (block.sq_norms if rows is None else block.sq_norms[rows])
+
+        u_norm = np.sqrt(u_sq)
+        if single:
+            u_norm = u_norm or 1.0
         else:
-            u_fund = np.zeros((0,), dtype=float)
-
-        return np.concatenate([u_num, u_cat, u_fund]).astype(float)
-
-    @staticmethod
-    def _cosine_sim_matrix(X: np.ndarray, u: np.ndarray) -> np.ndarray:
-        u_norm = np.linalg.norm(u) or 1.0
-        X_norm = np.linalg.norm(X, axis=1)
+            u_norm[u_norm == 0] = 1.0
+        X_norm = np.sqrt(X_sq)
         X_norm[X_norm == 0] = 1.0
-        return (X @ u) / (X_norm * u_norm)
-
-    def recommend(self, preferences: Dict[str, Any], n_results: int = 5) -> pd.DataFrame:
-        if self._df is None or self._X is None:
+        if single:
+            return dots / (X_norm * u_norm)
+        return dots / (u_norm[:, None] * X_norm[None, :])
+
+    @timed("result_frame")
+    def _result_frame(self, rows: np.ndarray, row_sims: np.ndarray, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Materialize only the winning rows (with their similarities `row_sims`), projected to PREFERRED_FIRST (+ `columns`, or every column if None).
+        Feature columns show their cleaned values (filled categoricals / numerics, derived duration).
+        """
+        df_cols = list(self._df.columns) + [c for c in self._work.columns if c not in self._df.columns]
+        if columns is None:
+            extra = [c for c in df_cols if c not in PREFERRED_FIRST]
+        else:
+            extra = [c for c in dict.fromkeys(columns) if c in df_cols and c not in PREFERRED_FIRST]
+        first = [c for c in PREFERRED_FIRST if c in df_cols]
+
+        out = pd.DataFrame({c: self._column_at(c, rows) for c in first + extra})
+        out.insert(len(first), "similarity", row_sims)
+        return out
+
+    def _column_at(self, c: str, rows: np.ndarray) -> pd.Series:
+        """Cleaned feature value of column c (or df's own) for the given rows."""
+        index = self._df.index[rows]
+        if c in self._work.columns:
+            return pd.Series(np.asarray(self._work[c])[rows], index=index, name=c)
+        if c in self._cat_levels and c in self._blocks:
+            # attached model: the filled category is its one-hot column
+            levels = np.asarray(self._cat_levels[c], dtype=object)
+            return pd.Series(levels[self._blocks[c].indices[rows]], index=index, name=c)
+        return self._df[c].iloc[rows]
+
+    def _exact_top_k(self, u: np.ndarray, feature_weights: Dict[str, float], k: int):
+        """(rows, similarities) of the top k over every row."""
+        sims = self._cosine_sim_matrix(u, feature_weights)
+        rows = _top_k(sims, k)
+        return rows, sims[rows]
+
+    def _ann_covers(self, feature_weights: Dict[str, float]) -> bool:
+        """
+        Whether the IVF index applies to this selection: it is clustered over every
+        fitted feature at equal weight (a common weight cancels in the cosine). Any
+        other subset or weighting ranks rows by a different similarity, for which
+        its lists are not a good shortlist, so those queries scan every row.
+        """
+        weights = set(feature_weights.values())
+        return self._ann is not None and feature_weights.keys() == self._spans.keys() and len(weights) == 1 and 0 not in weights
+
+    def _ann_top_k(self, u: np.ndarray, feature_weights: Dict[str, float], k: int, nprobe: Optional[int]):
+        """
+        (rows, similarities) of the top k among the IVF candidates, or None if the
+        index does not cover `feature_weights` (see _ann_covers) or the probed
+        lists hold fewer than k rows. Candidates are scored exactly.
+        """
+        if not self._ann_covers(feature_weights):
+            return None
+        cand = self._ann.candidates(u, nprobe or self.ann_nprobe)
+        if len(cand) < k:
+            return None
+        sims = self._cosine_sim_matrix(u, feature_weights, rows=cand)
+        top = _top_k(sims, k)
+        return cand[top], sims[top]
+
+    def recommend(
+        self,
+        preferences: Dict[str, Any],
+        n_results: int = 5,
+        features: Optional[Sequence[str]] = None,
+        weights: Optional[Dict[str, Any]] = None,
+        columns: Optional[Sequence[str]] = None,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Top-n projects for a preference dict.
+          features: subset of the fitted features to score on (None = all fitted)
+          weights:  optional {feature: non-negative weight}, default 1.0 each
+          columns:  extra columns to return after PREFERRED_FIRST (None = all columns)
+          nprobe:   IVF lists to re-rank exactly when an index was built (None = ann_nprobe);
+                    the index is only used for all features at equal weight
+          exact:    ignore the IVF index and scan every row
+        Ties in similarity are broken by row order.
+        """
+        if self._df is None:
             raise RuntimeError("Call .fit(df, selected_features) before .recommend().")
 
         n = max(3, min(10, int(n_results)))
 
+        feature_weights = self._feature_weights(features, weights)
         u = self._make_user_vector(preferences)
-        sims = self._cosine_sim_matrix(self._X, u)
-
-        out = self._df.copy()
-        out["similarity"] = sims
-        out = out.sort_values("similarity", ascending=False).head(n)
-
-        preferred_first = [
-            "intervention_name",
-            "city",
-            "country",
-            "status",
-            "begin_year",
-            "end_year",
-            "duration",
-            "nbs_area",
-            "total_cost",
-            "sources_of_funding",
-            "link",
-            "similarity",
-        ]
-        cols = [c for c in preferred_first if c in out.columns] + [c for c in out.columns if c not in preferred_first]
-        return out[cols]
+
+        found = None if exact else self._ann_top_k(u, feature_weights, n, nprobe)
+        if found is None:
+            found = self._exact_top_k(u, feature_weights, n)
+        return self._result_frame(*found, columns)
+
+    def recommend_batch(
+        self,
+        preferences_list: Sequence[Dict[str, Any]],
+        n_results: int = 5,
+        features: Optional[Sequence[str]] = None,
+        weights: Optional[Dict[str, Any]] = None,
+        columns: Optional[Sequence[str]] = None,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+    ) -> list[pd.DataFrame]:
+        """
+        recommend() for many preference dicts sharing one feature selection:
+        the profiles are stacked into a user matrix and scored together.
+        Returns one result frame per profile, in input order.
+        """
+        if self._df is None:
+            raise RuntimeError("Call .fit(df, selected_features) before .recommend_batch().")
+        if not preferences_list:
+            return []
+
+        n = max(3, min(10, int(n_results)))
+
+        feature_weights = self._feature_weights(features, weights)
+        U = self._make_user_matrix(preferences_list)
+
+        if self._ann_covers(feature_weights) and not exact:
+            # each profile probes its own IVF lists
+            found = [self._ann_top_k(u, feature_weights, n, nprobe) or self._exact_top_k(u, feature_weights, n) for u in U]
+        else:
+            found = []
+            for sims in self._cosine_sim_matrix(U, feature_weights):
+                rows = _top_k(sims, n)
+                found.append((rows, sims[rows]))
+        return [self._result_frame(rows, row_sims, columns) for rows, row_sims in found]
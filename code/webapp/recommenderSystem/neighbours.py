@@ -0,0 +1,230 @@
+"""
+Every project's top-k most similar projects, for /api/projects/{id}/similar
+("more like this" in the project view and the comparison list).
+
+Similarity is the cosine over the all-features recommender space (every feature
+block, weight 1), i.e. the score /api/recommend gives a profile equal to the
+project. All pairs are scored once per dataset version: the unit-length feature
+rows are written to a scratch .npy, then blocks of projects are multiplied
+against all of it and each block is reduced to its top k straight away, so peak
+memory is O(block rows x n) rather than O(n^2). With workers > 1 and enough rows
+the blocks are spread over processes that memory-map that one file.
+
+The graph is two (n, k) arrays, int32 neighbour ids and float32 similarities,
+best first, ties by lower row position (as model._top_k); a lookup is a slice
+of one row. With a FeatureStore they are saved next to the model's features, so
+other workers and restarts map them instead of rebuilding.
+
+Building it is O(n^2), so it never delays a load: it runs on a background thread,
+only up to GRAPH_MAX_ROWS rows, and until it is ready (or above that size) each
+lookup scores its one project against all rows, O(n). A reload that only appends
+rows keeps the previous graph for the rows it covers and scans the new ones.
+"""
+import multiprocessing
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache import RecommenderCache
+from .featurestore import FeatureStore
+from .model import SimpleNBSRecommender, _top_k
+
+NEIGHBOURS = 20  # kept per project; requests ask for up to this many
+BLOCK_BYTES = 64 << 20  # working memory of one score block (scores, partition copy, masks)
+PARALLEL_MIN_ROWS = 20_000  # below this, starting processes costs more than it saves
+GRAPH_MAX_ROWS = 50_000  # larger datasets answer every lookup with a per-row scan
+
+
+def _top_k_rows(S: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """(columns, scores) of the k highest scores in every row of S, best first, ties by lower column."""
+    b, n = S.shape
+    kth = np.partition(S, n - k, axis=1)[:, n - k]
+    above = S > kth[:, None]
+    ties = S == kth[:, None]
+    room = k - above.sum(axis=1)
+    keep = above | ties
+    # rows with more ties at the k-th score than places left keep the first ones
+    surplus = np.flatnonzero(ties.sum(axis=1) > room)
+    if len(surplus):
+        t = ties[surplus]
+        keep[surplus] = above[surplus] | (t & (np.cumsum(t, axis=1) <= room[surplus, None]))
+
+    cols = np.nonzero(keep)[1].reshape(b, k)
+    scores = np.take_along_axis(S, cols, axis=1)
+    order = np.lexsort((cols, -scores))
+    return np.take_along_axis(cols, order, axis=1).astype(np.int32), np.take_along_axis(scores, order, axis=1)
+
+
+def _block_neighbours(Z: np.ndarray, start: int, stop: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k neighbours of rows start..stop of the unit-row matrix Z, excluding each row itself."""
+    S = np.asarray(Z[start:stop]) @ np.asarray(Z).T
+    S[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+    return _top_k_rows(S, k)
+
+
+# worker processes: the scratch matrix, mapped once per process
+_Z: Optional[np.ndarray] = None
+
+
+def _attach(path: str) -> None:
+    global _Z
+    _Z = np.load(path, mmap_mode="r")
+
+
+def _work(bounds: tuple[int, int], k: int) -> tuple[np.ndarray, np.ndarray]:
+    return _block_neighbours(_Z, bounds[0], bounds[1], k)
+
+
+def build_neighbours(
+    model: SimpleNBSRecommender,
+    k: int = NEIGHBOURS,
+    workers: int = 1,
+    block_bytes: int = BLOCK_BYTES,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(ids, similarities), both (n, min(k, n - 1)): every row's nearest other rows (see module docstring)."""
+    n = len(model._df)
+    k = max(0, min(int(k), n - 1))
+    ids = np.empty((n, k), dtype=np.int32)
+    sims = np.empty((n, k), dtype=np.float32)
+    if k == 0:
+        return ids, sims
+
+    block_rows = int(max(1, min(n, block_bytes // (n * 12))))
+    bounds = [(start, min(n, start + block_rows)) for start in range(0, n, block_rows)]
+
+    with tempfile.TemporaryDirectory(prefix="nbs-neighbours.") as tmp:
+        path = Path(tmp) / "unit_rows.npy"
+        width = sum(block.shape[1] for block in model._blocks.values())
+        Z = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, width))
+        for start, stop in bounds:
+            Z[start:stop] = model.unit_rows(np.arange(start, stop))
+        Z.flush()
+        del Z
+
+        results = None
+        if workers > 1 and n >= PARALLEL_MIN_ROWS:
+            # spawn, not fork: the server process has threads (and their locks) running
+            context = multiprocessing.get_context("spawn")
+            try:
+                with ProcessPoolExecutor(workers, mp_context=context, initializer=_attach, initargs=(str(path),)) as pool:
+                    results = list(pool.map(_work, bounds, repeat(k)))
+            except (OSError, BrokenProcessPool) as e:
+                print(f"[WARN] Neighbour worker processes failed, building in-process: {e}")
+        if results is None:
+            Z = np.load(path, mmap_mode="r")
+            results = (_block_neighbours(Z, start, stop, k) for start, stop in bounds)
+
+        for (start, stop), (block_ids, block_sims) in zip(bounds, results):
+            ids[start:stop] = block_ids
+            sims[start:stop] = block_sims
+    return ids, sims
+
+
+class SimilarProjects:
+    """
+    The neighbour graph of one dataset version: built by start() on a background
+    thread (or graph()), then every similar() is O(k); before that, similar() scans.
+    `previous`: the SimilarProjects of a generation this one only appends rows to;
+    its graph is reused for its rows instead of rebuilt.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        models: RecommenderCache,
+        store: Optional[FeatureStore] = None,
+        version: Optional[str] = None,
+        k: int = NEIGHBOURS,
+        workers: int = 1,
+        max_rows: int = GRAPH_MAX_ROWS,
+        previous: Optional["SimilarProjects"] = None,
+    ):
+        self.n = len(df)
+        self.k = int(k)
+        self.workers = int(workers)
+        self.max_rows = int(max_rows)
+        self._df = df
+        self._models = models
+        self._store = store if version is not None else None
+        self._version = version
+        self._graph: Optional[tuple[np.ndarray, np.ndarray]] = None
+        self.inherited = False  # _graph is the previous generation's, covering only its rows
+        if previous is not None and previous._graph is not None and previous.k == self.k:
+            self._graph = previous._graph
+            self.inherited = True
+        self._lock = threading.Lock()
+        self.build_seconds = 0.0
+        self.scans = 0  # lookups answered by scanning, graph not (yet) covering the row
+
+    def start(self) -> None:
+        """Build the graph on a daemon thread, unless it exists or n > max_rows."""
+        if self._graph is not None or not 1 < self.n <= self.max_rows:
+            return
+        threading.Thread(target=self._build_quietly, name="neighbours-build", daemon=True).start()
+
+    def _build_quietly(self) -> None:
+        try:
+            self.graph()
+        except Exception as e:  # lookups keep scanning
+            print(f"[WARN] Similar-projects graph build failed: {type(e).__name__}: {e}")
+
+    def graph(self) -> tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            if self._graph is None:
+                t0 = time.perf_counter()
+                model = self._models.get(self._df)
+
+                def build():
+                    return build_neighbours(model, self.k, self.workers)
+
+                if self._store is not None:
+                    try:
+                        self._graph = self._store.load_or_build_neighbours(self._version, self.k, build)
+                    except OSError as e:
+                        print(f"[WARN] Feature store unavailable, building neighbours in-process: {e}")
+                if self._graph is None:
+                    self._graph = build()
+                self.build_seconds = time.perf_counter() - t0
+            return self._graph
+
+    def similar(self, row: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """(ids, similarities) of the k projects most similar to `row`, best first."""
+        graph = self._graph
+        if graph is not None and row < len(graph[0]):
+            ids, sims = graph
+            k = max(0, min(int(k), ids.shape[1]))
+            return ids[row, :k], sims[row, :k]
+        return self._scan(row, k)
+
+    def _scan(self, row: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """similar() without the graph: the row against every row, O(n)."""
+        self.scans += 1
+        model = self._models.get(self._df)
+        u = model.unit_rows(np.array([row]))[0].astype(float)
+        sims = model._cosine_sim_matrix(u, {f: 1.0 for f in model._blocks})
+        sims[row] = -np.inf
+        top = _top_k(sims, max(0, min(int(k), self.k, self.n - 1)))
+        return top.astype(np.int32), sims[top].astype(np.float32)
+
+    def nbytes(self) -> int:
+        graph = self._graph
+        return int(graph[0].nbytes + graph[1].nbytes) if graph is not None else 0
+
+    def stats(self) -> Dict[str, float]:
+        graph = self._graph
+        return {
+            "built": graph is not None,
+            "inherited": self.inherited,
+            "scans": self.scans,
+            "k": graph[0].shape[1] if graph is not None else 0,
+            "build_seconds": self.build_seconds,
+            "bytes": self.nbytes(),
+        }
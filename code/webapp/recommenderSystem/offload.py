@@ -0,0 +1,83 @@
+"""
+Bounded worker pool for the CPU-bound part of a request (model fit, scoring,
+serialization), so `async def` endpoints never run it on the event loop.
+
+At most `workers` jobs run at once and at most `queue_size` more wait; a request
+beyond that is refused straight away (Overloaded -> 503) instead of queueing
+without bound, and a job that has not finished within `timeout` seconds gives
+its request up (ComputeTimeout -> 504). NumPy and pandas release the GIL in the
+heavy kernels, so threads overlap the scoring; for more cores run more uvicorn
+workers, which share the feature store.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class Overloaded(Exception):
+    """Every worker is busy and the queue is full."""
+
+
+class ComputeTimeout(Exception):
+    """The job did not finish within the pool's timeout."""
+
+
+class ComputePool:
+    def __init__(self, workers: int = 4, queue_size: int = 16, timeout: Optional[float] = 10.0):
+        self.workers = max(1, int(workers))
+        self.queue_size = max(0, int(queue_size))
+        self.timeout = timeout if timeout and timeout > 0 else None
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="nbs-compute")
+        # one slot per running or queued job; a slot is released when its job ends
+        # (not when its request times out), so abandoned work still counts
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """fn(*args, **kwargs) on a pool thread; raises Overloaded / ComputeTimeout."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_flight += 1
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # only stops a job that is still queued
+            with self._lock:
+                self.timeouts += 1
+            raise ComputeTimeout()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.workers + self.queue_size,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,91 @@
+"""
+A sampling profiler for hot-path investigation on a running server.
+
+A daemon thread wakes every `interval` seconds, reads the current stack of every
+other thread (sys._current_frames) and counts it. The result is in the collapsed
+"frame;frame;frame count" format that flamegraph.pl / speedscope read.
+Sampling only costs a stack walk per thread per tick, and nothing while stopped.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# never sample for longer than this, even if nobody calls stop()
+MAX_DURATION = 300.0
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """Start/stop stack sampler; one instance per process is enough."""
+
+    def __init__(self):
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.interval = 0.005
+        self.samples = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.005, duration: float = MAX_DURATION) -> bool:
+        """Begin sampling (clears earlier samples). False if already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self.interval = max(0.001, float(interval))
+            self._stacks = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(min(float(duration), MAX_DURATION),), name="nbs-sampling-profiler", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks."""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        return self.collapsed()
+
+    def _run(self, duration: float) -> None:
+        me = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        stacks = list(self._stacks.items())
+        return "".join(f"{s} {n}\n" for s, n in sorted(stacks, key=lambda kv: -kv[1]))
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self.samples,
+            "stacks": len(self._stacks),
+            "started_at": self.started_at,
+        }
@@ -0,0 +1,243 @@
+import json
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Filter keys follow window.filters in assets/js/state.js.
+# Exact-match columns: a row matches if its (whole) value is one of the selected values.
+VALUE_FILTERS = {
+    "countries": "country",
+    "cities": "city",
+    "previousArea": "previous_area_type",
+    "funding": "sources_of_funding",
+}
+# ";"-separated columns: a row matches if any of its tags is selected.
+TAG_FILTERS = {
+    "nbsType": "nbs_type",
+    "envImpacts": "environmental_impacts",
+    "econImpacts": "economic_impacts",
+}
+# [min, max] ranges (inclusive); startYear / endYear are one-sided.
+RANGE_FILTERS = {
+    "nbsArea": "nbs_area",
+    "totalCost": "total_cost",
+}
+SEARCH_COLUMNS = [
+    "intervention_name",
+    "country",
+    "city",
+    "nbs_type",
+    "previous_area_type",
+    "sources_of_funding",
+]
+
+# values applyFilters never matches for funding / tag filters
+_EMPTY_VALUES = {"", "Unknown"}
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [v for v in value if v is not None]
+    return [value]
+
+
+def _as_float(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Not a number: {value!r}")
+    return None if np.isnan(v) else v
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Canonical form of a filter object: only active filters, sorted value lists,
+    floats for numbers. Equivalent filters normalize to the same dict.
+    """
+    filters = filters or {}
+    out: Dict[str, Any] = {}
+
+    search = str(filters.get("search") or "").strip().lower()
+    if search:
+        out["search"] = search
+    for key in [*VALUE_FILTERS, *TAG_FILTERS]:
+        selected = sorted({str(v) for v in _as_list(filters.get(key))})
+        if selected:
+            out[key] = selected
+    for key in ["startYear", "endYear"]:
+        v = _as_float(filters.get(key))
+        if v is not None:
+            out[key] = v
+    for key in RANGE_FILTERS:
+        bounds = filters.get(key)
+        if isinstance(bounds, (list, tuple)) and len(bounds) == 2 and bounds[0] is not None:
+            lo, hi = _as_float(bounds[0]), _as_float(bounds[1])
+            if lo is not None and hi is not None and lo > hi:
+                lo, hi = hi, lo
+            out[key] = [lo, hi]
+    return out
+
+
+def filter_signature(filters: Optional[Dict[str, Any]]) -> str:
+    """Stable string key for memoizing per-filter results."""
+    return json.dumps(normalize_filters(filters), sort_keys=True, separators=(",", ":"))
+
+
+class FilterIndex:
+    """
+    Bitmap indexes over the cleaned table answering the same filters as
+    assets/js/filters.js::applyFilters:
+      - one packed bitmap per value of the exact-match and ";"-tag columns
+      - sorted value arrays (+ row order) for begin_year, end_year, nbs_area, total_cost
+    A query ANDs one bitmap per active filter; multi-valued selections OR their
+    value bitmaps. Bitmaps are np.packbits arrays (n / 8 bytes each).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n = len(df)
+        self._all = self._pack(np.ones(self.n, dtype=bool))
+        self._none = np.zeros_like(self._all)
+
+        self._values: Dict[str, Dict[str, np.ndarray]] = {}
+        for col in VALUE_FILTERS.values():
+            self._values[col] = self._value_bitmaps(self._column(df, col), drop_empty=(col == "sources_of_funding"))
+        for col in TAG_FILTERS.values():
+            self._values[col] = self._tag_bitmaps(self._column(df, col))
+
+        self._sorted: Dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for col in ["begin_year", "end_year", *RANGE_FILTERS.values()]:
+            x = self._numbers(df[col]) if col in df.columns else np.full(self.n, np.nan)
+            order = np.argsort(x, kind="stable")
+            order = order[~np.isnan(x[order])]  # non-numeric text never matches a range
+            self._sorted[col] = (x[order], order)
+
+        # same string applyFilters builds: non-empty fields joined by " ", lowercased
+        text = pd.Series([""] * self.n, index=df.index, dtype=object)
+        for c in SEARCH_COLUMNS:
+            if c not in df.columns:
+                continue
+            part = df[c].fillna("").astype(str)
+            sep = np.where((text != "") & (part != ""), " ", "")
+            text = text + sep + part
+        self._search_text = text.str.lower()
+
+    # ---------- build ----------
+
+    @staticmethod
+    def _column(df: pd.DataFrame, col: str) -> pd.Series:
+        if col not in df.columns:
+            return pd.Series([""] * len(df), dtype=object)
+        return df[col].fillna("").astype(str)
+
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask)
+
+    def _group_bitmaps(self, rows: np.ndarray, codes: np.ndarray, levels: list[str]) -> Dict[str, np.ndarray]:
+        """One bitmap per level from (row, level code) pairs."""
+        order = np.argsort(codes, kind="stable")
+        rows, codes = rows[order], codes[order]
+        bounds = np.searchsorted(codes, np.arange(len(levels) + 1))
+
+        out = {}
+        mask = np.zeros(self.n, dtype=bool)
+        for j, level in enumerate(levels):
+            group = rows[bounds[j]:bounds[j + 1]]
+            mask[group] = True
+            out[level] = self._pack(mask)
+            mask[group] = False
+        return out
+
+    @staticmethod
+    def _numbers(values: pd.Series) -> np.ndarray:
+        """
+        The column as applyFilters reads it (JavaScript's unary + on the CSV text):
+        an empty cell is 0, text that is not a number is NaN.
+        """
+        x = np.array(pd.to_numeric(values, errors="coerce"), dtype=float)
+        empty = values.isna().to_numpy() | (values.astype(str).str.strip() == "").to_numpy()
+        x[empty] = 0.0
+        return x
+
+    def _value_bitmaps(self, values: pd.Series, drop_empty: bool = False) -> Dict[str, np.ndarray]:
+        codes, levels = pd.factorize(values)
+        bitmaps = self._group_bitmaps(np.arange(self.n), codes, list(levels))
+        if drop_empty:
+            for v in _EMPTY_VALUES:
+                bitmaps.pop(v, None)
+        return bitmaps
+
+    def _tag_bitmaps(self, values: pd.Series) -> Dict[str, np.ndarray]:
+        values = values.reset_index(drop=True)
+        values = values.where(~values.str.strip().isin(_EMPTY_VALUES), "")
+        tags = values.str.split(";").explode().str.strip()
+        tags = tags[tags != ""]
+        codes, levels = pd.factorize(tags)
+        return self._group_bitmaps(tags.index.to_numpy(dtype=np.int64), codes, list(levels))
+
+    # ---------- query ----------
+
+    def _any_of(self, col: str, selected: list) -> np.ndarray:
+        out = self._none.copy()
+        for v in selected:
+            bm = self._values[col].get(str(v))
+            if bm is not None:
+                np.bitwise_or(out, bm, out=out)
+        return out
+
+    def _range(self, col: str, lo: Optional[float], hi: Optional[float]) -> np.ndarray:
+        vals, order = self._sorted[col]
+        a = 0 if lo is None else np.searchsorted(vals, lo, side="left")
+        b = len(vals) if hi is None else np.searchsorted(vals, hi, side="right")
+        mask = np.zeros(self.n, dtype=bool)
+        mask[order[a:b]] = True
+        return self._pack(mask)
+
+    def _search(self, query: str) -> np.ndarray:
+        return self._pack(self._search_text.str.contains(query, regex=False).to_numpy(dtype=bool))
+
+    def contains(self, query: str, rows: np.ndarray) -> np.ndarray:
+        """Which of `rows` hold `query` (lowercased) in their search text, as the "search" filter matches."""
+        return self._search_text.iloc[rows].str.contains(query, regex=False).to_numpy(dtype=bool)
+
+    def bitmap(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Packed bitmap of the rows matching `filters` (keys as in window.filters)."""
+        filters = normalize_filters(filters)
+        out = self._all.copy()
+
+        if "search" in filters:
+            np.bitwise_and(out, self._search(filters["search"]), out=out)
+
+        for key, col in {**VALUE_FILTERS, **TAG_FILTERS}.items():
+            if key in filters:
+                np.bitwise_and(out, self._any_of(col, filters[key]), out=out)
+
+        if "startYear" in filters:
+            np.bitwise_and(out, self._range("begin_year", filters["startYear"], None), out=out)
+        if "endYear" in filters:
+            np.bitwise_and(out, self._range("end_year", None, filters["endYear"]), out=out)
+
+        for key, col in RANGE_FILTERS.items():
+            if key in filters:
+                lo, hi = filters[key]
+                np.bitwise_and(out, self._range(col, lo, hi), out=out)
+
+        return out
+
+    def mask(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Boolean row mask of the rows matching `filters`."""
+        return np.unpackbits(self.bitmap(filters), count=self.n).astype(bool)
+
+    def rows(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Row positions (ascending) matching `filters`."""
+        return np.flatnonzero(np.unpackbits(self.bitmap(filters), count=self.n))
+
+    def nbytes(self) -> int:
+        bitmaps = sum(bm.nbytes for col in self._values.values() for bm in col.values())
+        ranges = sum(v.nbytes + o.nbytes for v, o in self._sorted.values())
+        return int(bitmaps + ranges)
@@ -0,0 +1,251 @@
+"""
+Several datasets served side by side (per region, per snapshot date, raw vs.
+cleaned exports), each under an id that the /api/* endpoints take as ?dataset=.
+
+A dataset is loaded, with every derived artifact (see dataset.py), by the first
+request that names it, and its files are watched from then on. Loaded datasets
+are kept in least-recently-used order; when their estimated memory exceeds the
+budget, the least recently used ones are unloaded (never the one just
+requested, so a dataset larger than the whole budget is still served alone).
+A reload that grows a dataset (its files changed) applies the budget the same way.
+A request that already holds an unloaded dataset's state finishes on it; the
+memory is freed when that request returns. The next request loads it again.
+"""
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .dataset import DatasetManager, DatasetState
+from .featurestore import FeatureStore
+from .snapshot import MANIFEST, is_fresh, load_snapshot
+
+DATASET_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+# table formats a dataset can be read from (data_cleaning.py writes .xlsx, or .csv when streaming)
+DATA_SUFFIXES = (".csv", ".xlsx")
+COORDINATES_SUFFIX = ".coordinates.csv"
+
+
+class UnknownDataset(LookupError):
+    """No dataset is registered under this id."""
+
+
+class DatasetLoadError(RuntimeError):
+    """A registered dataset could not be read or its artifacts not built."""
+
+
+@dataclass(frozen=True)
+class DatasetSource:
+    """
+    The files of one dataset: the table (.csv or .xlsx), optionally its columnar
+    snapshot (used when it is fresh) and the city coordinates for the map pies.
+    """
+
+    path: Path
+    snapshot: Optional[Path] = None
+    coordinates: Optional[Path] = None
+
+    def load(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """The table, from the memory-mapped snapshot when it is up to date, else from the file."""
+        if self.snapshot is not None and is_fresh(self.snapshot, self.path):
+            return load_snapshot(self.snapshot, columns=columns)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Dataset file not found at: {self.path}")
+        if self.path.suffix.lower() == ".xlsx":
+            return pd.read_excel(self.path, usecols=columns)
+        return pd.read_csv(self.path, usecols=columns)
+
+    def load_coordinates(self) -> Optional[pd.DataFrame]:
+        """City coordinates for the map pies; None (no pies from /api/map) if the file is missing."""
+        if self.coordinates is None or not self.coordinates.exists():
+            print(f"[WARN] Coordinates not found at: {self.coordinates}")
+            return None
+        return pd.read_csv(self.coordinates, keep_default_na=False)
+
+    def signature(self) -> tuple:
+        """(size, mtime_ns) of the table, the snapshot manifest and the coordinates; changes when any is rewritten."""
+        out = []
+        for p in (self.path, self.snapshot / MANIFEST if self.snapshot else None, self.coordinates):
+            try:
+                st = p.stat() if p is not None else None
+            except OSError:
+                st = None
+            out.append((st.st_size, st.st_mtime_ns) if st is not None else None)
+        return tuple(out)
+
+
+def discover(directory: Path, coordinates: Optional[Path] = None) -> Dict[str, DatasetSource]:
+    """
+    One dataset per table file in `directory`, named by its stem (region-north.csv
+    -> "region-north"; a .csv wins over an .xlsx of the same name). <id>.snapshot/
+    is used as its snapshot and <id>.coordinates.csv, if present, replaces the
+    shared `coordinates`.
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return {}
+    sources: Dict[str, DatasetSource] = {}
+    for suffix in DATA_SUFFIXES:
+        for path in sorted(directory.glob(f"*{suffix}")):
+            dataset_id = path.name[: -len(suffix)]
+            if path.name.endswith(COORDINATES_SUFFIX) or dataset_id in sources or not DATASET_ID.match(dataset_id):
+                continue
+            snapshot = directory / f"{dataset_id}.snapshot"
+            own_coordinates = directory / f"{dataset_id}{COORDINATES_SUFFIX}"
+            sources[dataset_id] = DatasetSource(
+                path,
+                snapshot=snapshot if snapshot.is_dir() else None,
+                coordinates=own_coordinates if own_coordinates.exists() else coordinates,
+            )
+    return sources
+
+
+class DatasetRegistry:
+    """
+    Lazily loaded DatasetManagers by dataset id, evicted least recently used first
+    past `memory_budget` bytes (0 = no limit).
+
+      sources:         {dataset id: DatasetSource}
+      default:         the id used when a request names none
+      store_root:      optional feature store directory; each dataset gets <store_root>/<id>
+      manager_options: passed to every DatasetManager (model_cache_size, neighbour_workers, ...)
+    """
+
+    def __init__(
+        self,
+        sources: Dict[str, DatasetSource],
+        default: str,
+        memory_budget: int = 0,
+        store_root: Optional[Path] = None,
+        **manager_options: Any,
+    ):
+        if default not in sources:
+            raise ValueError(f"Default dataset {default!r} is not among the sources")
+        self.sources = dict(sources)
+        self.default = default
+        self.memory_budget = max(0, int(memory_budget))
+        self.store_root = Path(store_root) if store_root else None
+        self._options = manager_options
+        self._watch_interval = 0.0
+
+        self._loaded: "OrderedDict[str, DatasetManager]" = OrderedDict()  # least recently used first
+        self._loading: Dict[str, threading.Lock] = {}  # one per id, so concurrent first requests load once
+        self._lock = threading.Lock()  # guards _loaded, _loading and the counters
+
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+
+    def ids(self) -> List[str]:
+        return sorted(self.sources)
+
+    def get(self, dataset_id: Optional[str] = None) -> DatasetManager:
+        """The manager of `dataset_id` (default if None), loading it first if needed."""
+        dataset_id = dataset_id or self.default
+        if dataset_id not in self.sources:
+            raise UnknownDataset(dataset_id)
+
+        with self._lock:
+            manager = self._loaded.get(dataset_id)
+            if manager is not None:
+                self._loaded.move_to_end(dataset_id)
+                return manager
+            loading = self._loading.setdefault(dataset_id, threading.Lock())
+
+        with loading:
+            with self._lock:
+                manager = self._loaded.get(dataset_id)
+                if manager is not None:  # loaded by the request we waited for
+                    self._loaded.move_to_end(dataset_id)
+                    return manager
+            manager = self._load(dataset_id)
+            with self._lock:
+                self._loaded[dataset_id] = manager
+                self.loads += 1
+        self._evict(keep=dataset_id)
+        return manager
+
+    def state(self, dataset_id: Optional[str] = None) -> DatasetState:
+        return self.get(dataset_id).current
+
+    def _load(self, dataset_id: str) -> DatasetManager:
+        source = self.sources[dataset_id]
+        store = FeatureStore(self.store_root / dataset_id) if self.store_root is not None else None
+        manager = DatasetManager(
+            source.load,
+            source.signature,
+            store=store,
+            coordinates=source.load_coordinates,
+            on_reload=self._evict,
+            **self._options,
+        )
+        try:
+            manager.load()
+        except Exception as e:
+            with self._lock:
+                self.load_failures += 1
+            raise DatasetLoadError(f"Dataset {dataset_id!r} could not be loaded: {type(e).__name__}: {e}") from e
+        manager.watch(self._watch_interval)
+        return manager
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """
+        Unload least recently used datasets until the loaded ones fit the budget,
+        never `keep` (default: the most recently used). Runs after each load and reload.
+        """
+        if not self.memory_budget:
+            return
+        sizes = {dataset_id: manager.nbytes() for dataset_id, manager in self.loaded().items()}
+        total = sum(sizes.values())
+        evicted = []
+        with self._lock:
+            if keep is None and self._loaded:
+                keep = next(reversed(self._loaded))
+            for dataset_id in list(self._loaded):
+                if total <= self.memory_budget:
+                    break
+                if dataset_id == keep:
+                    continue
+                evicted.append(self._loaded.pop(dataset_id))
+                total -= sizes.get(dataset_id, 0)
+                self.evictions += 1
+        for manager in evicted:
+            manager.stop()
+
+    def loaded(self) -> Dict[str, DatasetManager]:
+        """The loaded datasets, least recently used first."""
+        with self._lock:
+            return dict(self._loaded)
+
+    def watch(self, interval: float) -> None:
+        """Watch the files of every loaded dataset, and of each one loaded from now on (see DatasetManager.watch)."""
+        self._watch_interval = interval
+        for manager in self.loaded().values():
+            manager.watch(interval)
+
+    def stop(self) -> None:
+        self._watch_interval = 0.0
+        for manager in self.loaded().values():
+            manager.stop()
+
+    def nbytes(self) -> int:
+        return sum(manager.nbytes() for manager in self.loaded().values())
+
+    def status(self) -> Dict[str, Any]:
+        loaded = self.loaded()
+        return {
+            "default": self.default,
+            "memory_budget": self.memory_budget,
+            "bytes": sum(manager.nbytes() for manager in loaded.values()),
+            "loads": self.loads,
+            "load_failures": self.load_failures,
+            "evictions": self.evictions,
+            "datasets": [
+                {"id": dataset_id, "loaded": dataset_id in loaded, "path": str(self.sources[dataset_id].path)}
+                for dataset_id in self.ids()
+            ],
+        }
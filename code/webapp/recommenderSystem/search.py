@@ -0,0 +1,263 @@
+"""
+Full-text search over the projects for /api/search (the search bar).
+
+Built once per dataset version:
+  - a token inverted index: every word of the searchable columns -> the rows it
+    occurs in, with the weight of the best field it occurs in (CSR arrays)
+  - character trigrams over the vocabulary, to find the words containing a
+    query term (substring / prefix matching without scanning the rows)
+short_description has an index of its own, built on the first search that asks for it.
+
+A query matches a row when each of its words is a substring of some indexed word
+of the row (in any order and field). Words shorter than MIN_TERM_LENGTH are not
+looked up, and a query with anything but word characters ("st. ", "s.p.a",
+"green roof") must also occur as typed in the row's search text (the "search"
+filter's substring match, query.FilterIndex), so the matches are the rows that
+filter keeps. Rows are ranked by the summed
+field weight x match quality (exact > prefix > infix) x idf of their best word per
+query term. Term lookups are cached; while a user types ("gre" -> "gree"), a new
+term is resolved by narrowing the cached matches of its longest cached prefix.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .query import FilterIndex
+
+# how much a match in each field counts (the columns applyFilters searches, see query.SEARCH_COLUMNS)
+FIELD_WEIGHTS = {
+    "intervention_name": 3.0,
+    "city": 2.0,
+    "country": 2.0,
+    "nbs_type": 1.0,
+    "previous_area_type": 1.0,
+    "sources_of_funding": 1.0,
+}
+DESCRIPTION_WEIGHTS = {"short_description": 0.5}
+
+# query term is the whole word / starts it / occurs inside it
+MATCH_WEIGHTS = {"exact": 1.0, "prefix": 0.7, "infix": 0.4}
+
+NGRAM = 3
+# shorter query words match nearly every row: a query of only those is a plain substring match
+MIN_TERM_LENGTH = 2
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(str(text).lower())
+
+
+def _ngrams(word: str) -> set:
+    return {word[i:i + NGRAM] for i in range(len(word) - NGRAM + 1)}
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(s, s + l) for every (s, l)."""
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths - starts, lengths)
+
+
+class _TextIndex:
+    """Inverted index, vocabulary trigrams and term cache over some weighted columns."""
+
+    def __init__(self, df: pd.DataFrame, weights: Dict[str, float], term_cache_size: int = 1024):
+        self.n = len(df)
+
+        # tokenize each distinct value once: most columns repeat a few categories
+        columns = []
+        for col, weight in weights.items():
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col].fillna("").astype(str).str.lower())
+            words = pd.Series(uniques, dtype=object).str.findall(_WORD.pattern).explode().dropna()
+            words = words[~pd.MultiIndex.from_arrays([words.index, words.to_numpy()]).duplicated()]
+            columns.append((codes, len(uniques), words.index.to_numpy(dtype=np.int64), words.to_numpy(dtype=object), weight))
+
+        vocab = pd.unique(np.concatenate([w for _, _, _, w, _ in columns])) if columns else np.empty(0, dtype=object)
+        self.vocab: list[str] = sorted(vocab.tolist())
+        lookup = pd.Index(self.vocab)
+
+        # (row, word) pairs: (distinct value, word) pairs expanded through the rows holding each value
+        rows, ids, wts = [np.empty(0, np.int64)], [np.empty(0, np.int64)], [np.empty(0, np.float32)]
+        for codes, n_values, value_of, words, weight in columns:
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(n_values + 1))
+            lengths = bounds[value_of + 1] - bounds[value_of]
+            rows.append(order[_ranges(bounds[value_of], lengths)])
+            ids.append(np.repeat(lookup.get_indexer(words), lengths))
+            wts.append(np.full(int(lengths.sum()), weight, dtype=np.float32))
+        rows, ids, wts = np.concatenate(rows), np.concatenate(ids), np.concatenate(wts)
+
+        # one posting per (word, row) with its best field weight, grouped by word (CSR)
+        n = max(self.n, 1)
+        key = ids * n + rows
+        order = np.argsort(key)
+        key, wts = key[order], wts[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.empty(0, np.int64)
+        self.weights = np.maximum.reduceat(wts, starts) if len(key) else wts
+        self.rows = (key[starts] % n).astype(np.int32)
+        self.offsets = np.searchsorted(key[starts] // n, np.arange(len(self.vocab) + 1)).astype(np.int64)
+        self.idf = np.log1p(self.n / np.maximum(np.diff(self.offsets), 1)).astype(np.float32)
+
+        grams: Dict[str, list[int]] = {}
+        for i, word in enumerate(self.vocab):
+            for g in _ngrams(word):
+                grams.setdefault(g, []).append(i)
+        self._grams = {g: np.asarray(ids, dtype=np.int64) for g, ids in grams.items()}
+
+        self._terms: "OrderedDict[str, tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._term_cache_size = term_cache_size
+        self._lock = threading.Lock()
+        self.hits = 0  # term served from the cache
+        self.narrowed = 0  # term resolved from a cached prefix
+        self.misses = 0  # term resolved from the n-gram index
+
+    def _words_containing(self, term: str, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """Ids of vocabulary words that contain `term` (among `candidates`, if given)."""
+        if candidates is None and len(term) >= NGRAM:
+            for g in _ngrams(term):
+                ids = self._grams.get(g)
+                if ids is None:
+                    return np.empty(0, np.int64)
+                candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+        elif candidates is None:  # too short for a trigram: the vocabulary is far smaller than the table
+            candidates = np.arange(len(self.vocab))
+        return np.asarray([i for i in candidates.tolist() if term in self.vocab[i]], dtype=np.int64)
+
+    def _factors(self, term: str, ids: np.ndarray) -> np.ndarray:
+        """Match quality x idf of each word in `ids` for `term`."""
+        quality = np.full(len(ids), MATCH_WEIGHTS["infix"], dtype=np.float32)
+        for k, i in enumerate(ids.tolist()):
+            word = self.vocab[i]
+            if word == term:
+                quality[k] = MATCH_WEIGHTS["exact"]
+            elif word.startswith(term):
+                quality[k] = MATCH_WEIGHTS["prefix"]
+        return quality * self.idf[ids]
+
+    def term_matches(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """(vocabulary ids, score factors) of the words containing `term`."""
+        with self._lock:
+            cached = self._terms.get(term)
+            if cached is not None:
+                self._terms.move_to_end(term)
+                self.hits += 1
+                return cached
+            prefix = next((term[:k] for k in range(len(term) - 1, 0, -1) if term[:k] in self._terms), None)
+            base = self._terms[prefix][0] if prefix is not None else None
+
+        # words containing the longer term are among those containing its prefix
+        ids = self._words_containing(term, base)
+        result = (ids, self._factors(term, ids))
+
+        with self._lock:
+            if base is not None:
+                self.narrowed += 1
+            else:
+                self.misses += 1
+            self._terms[term] = result
+            while len(self._terms) > self._term_cache_size:
+                self._terms.popitem(last=False)
+        return result
+
+    def term_scores(self, term: str, out: np.ndarray) -> None:
+        """out[row] = max(out[row], best score of a word of the row containing `term`)."""
+        ids, factors = self.term_matches(term)
+        starts = self.offsets[ids]
+        lengths = self.offsets[ids + 1] - starts
+        idx = _ranges(starts, lengths)
+        np.maximum.at(out, self.rows[idx], self.weights[idx] * np.repeat(factors, lengths))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "narrowed": self.narrowed, "misses": self.misses, "size": len(self._terms)}
+
+    def nbytes(self) -> int:
+        grams = sum(ids.nbytes for ids in self._grams.values())
+        return int(self.rows.nbytes + self.weights.nbytes + self.offsets.nbytes + self.idf.nbytes + grams)
+
+
+class SearchIndex:
+    """
+    Search over the filter columns, and optionally short_description (see module
+    docstring). `filters` is the dataset's FilterIndex, whose search text checks
+    queries that are not plain words.
+    """
+
+    def __init__(self, df: pd.DataFrame, filters: FilterIndex):
+        self.n = len(df)
+        self._df = df
+        self._filters = filters
+        self._fields = _TextIndex(df, FIELD_WEIGHTS)
+        self._description: Optional[_TextIndex] = None
+        self._description_text: Optional[pd.Series] = None
+        self._lock = threading.Lock()
+
+    def _parts(self, description: bool) -> list[_TextIndex]:
+        if not description:
+            return [self._fields]
+        with self._lock:
+            if self._description is None:
+                self._description = _TextIndex(self._df, DESCRIPTION_WEIGHTS)
+                text = self._df.get("short_description", pd.Series([""] * self.n, dtype=object))
+                self._description_text = text.fillna("").astype(str).str.lower()
+        return [self._fields, self._description]
+
+    def scores(self, query: str, description: bool = False) -> Optional[np.ndarray]:
+        """
+        Score per row (0 = no match) for `query`, or None if it has no words of
+        MIN_TERM_LENGTH or more (then callers fall back to plain substring matching).
+        """
+        query = str(query).strip().lower()
+        terms = [t for t in dict.fromkeys(tokenize(query)) if len(t) >= MIN_TERM_LENGTH]
+        if not terms:
+            return None
+        parts = self._parts(description)
+
+        total = np.zeros(self.n, dtype=np.float32)
+        matched = np.ones(self.n, dtype=bool)
+        for term in terms:
+            best = np.zeros(self.n, dtype=np.float32)
+            for part in parts:
+                part.term_scores(term, best)
+            matched &= best > 0
+            total += best
+
+        if not _WORD.fullmatch(query):
+            # the words alone match more loosely than the query as typed: keep the rows holding it
+            rows = np.flatnonzero(matched)
+            keep = self._filters.contains(query, rows)
+            if description:
+                keep = keep | self._description_text.iloc[rows].str.contains(query, regex=False).to_numpy(dtype=bool)
+            matched[rows[~keep]] = False
+        return np.where(matched, total, 0).astype(np.float32)
+
+    def search(self, query: str, rows: Optional[np.ndarray] = None, description: bool = False) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """
+        (row positions, scores) of the matches, best first (ties by row position).
+        `rows`: restrict to these row positions (e.g. FilterIndex.rows(filters)).
+        """
+        scores = self.scores(query, description)
+        if scores is None:
+            return None
+        candidates = np.flatnonzero(scores) if rows is None else rows[scores[rows] > 0]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order], scores[candidates[order]]
+
+    def stats(self) -> Dict[str, int]:
+        parts = [self._fields] + ([self._description] if self._description is not None else [])
+        totals = {"hits": 0, "narrowed": 0, "misses": 0, "size": 0}
+        for part in parts:
+            for k, v in part.stats().items():
+                totals[k] += v
+        return totals
+
+    def nbytes(self) -> int:
+        description = self._description
+        return self._fields.nbytes() + (description.nbytes() if description is not None else 0)
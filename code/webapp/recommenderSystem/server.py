@@ -1,24 +1,57 @@
+import hmac
+import json
+import os
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import numpy as np
-import pandas as pd
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
 
-from .model import SimpleNBSRecommender, _split_multivalue
+from .cache import canonical_features
+from .dataset import DatasetManager, DatasetState
+from .delivery import PrecompressedStaticFiles, page_payload, versioned_html
+from .encoding import SHAPES, check_fields, encode_frame, encode_frames, parse_fields, project
+from .listing import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from .neighbours import GRAPH_MAX_ROWS
+from .model import PREFERRED_FIRST
+from .meta import etag_matches
+from .metrics import REGISTRY, stage_timer
+from .offload import ComputePool, ComputeTimeout, Overloaded
+from .profiler import SamplingProfiler
+from .query import filter_signature
+from .registry import DatasetLoadError, DatasetRegistry, DatasetSource, UnknownDataset, discover
 
 # ====== PATHS (fixed for your current structure) ======
 from pathlib import Path
 WEBAPP_DIR = Path(__file__).resolve().parents[1]
 ASSETS_DIR = WEBAPP_DIR / "assets"
 DATA_PATH  = ASSETS_DIR / "data" / "cleaned.csv"
+SNAPSHOT_DIR = ASSETS_DIR / "data" / "cleaned.snapshot"  # written by xl-csv
+COORDINATES_PATH = ASSETS_DIR / "data" / "coordinates.csv"  # written by coordinates.py
+# more datasets side by side (regions, snapshot dates, raw / cleaned exports): every <id>.csv or
+# <id>.xlsx here (+ <id>.snapshot/, <id>.coordinates.csv) is served to /api/* as ?dataset=<id>
+DATASETS_DIR = Path(os.environ.get("NBS_DATASETS_DIR", str(ASSETS_DIR / "data" / "datasets")))
+DEFAULT_DATASET = "cleaned"  # DATA_PATH, used when a request names no dataset
+# memory-mapped recommender features shared by all worker processes (one subdirectory per dataset);
+# NBS_FEATURE_STORE="" disables
+FEATURE_STORE_DIR = os.environ.get("NBS_FEATURE_STORE", str(WEBAPP_DIR / "feature_store"))
 # ======================================================
 
 
-app = FastAPI(title="NBS Recommender API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    DATASETS.watch(WATCH_INTERVAL)
+    yield
+    DATASETS.stop()
+    COMPUTE.shutdown()
+
+
+app = FastAPI(title="NBS Recommender API", lifespan=lifespan)
 
 # CORS (safe for local dev)
 app.add_middleware(
@@ -28,30 +61,144 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+HTTP_REQUESTS = REGISTRY.counter("nbs_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_SECONDS = REGISTRY.histogram("nbs_http_request_seconds", "HTTP request latency by route.", ("method", "route"))
+
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Count and time every request, labelled by route template (not raw path) to keep label sets small."""
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        HTTP_SECONDS.observe(time.perf_counter() - t0, method=request.method, route=route)
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=status)
+
 # Serve frontend static files:
 # index.html references ./assets/... so we mount /assets -> webapp/assets
-if ASSETS_DIR.exists():
-    app.mount("/assets", StaticFiles(directory=ASSETS_DIR), name="assets")
+# (text files precompressed; ?v=<content hash> URLs cached as immutable)
+ASSETS = PrecompressedStaticFiles(directory=ASSETS_DIR) if ASSETS_DIR.exists() else None
+if ASSETS is not None:
+    app.mount("/assets", ASSETS, name="assets")
 else:
     print(f"[WARN] Assets folder not found at: {ASSETS_DIR}")
 
-def load_df() -> pd.DataFrame:
-    if not DATA_PATH.exists():
-        raise FileNotFoundError(
-            f"CSV not found at: {DATA_PATH}\n"
-            f"Expected it here: webapp/assets/data/cleaned.csv"
-        )
-    return pd.read_csv(DATA_PATH)
+# the default dataset wins over a file of the same name in DATASETS_DIR
+SOURCES = {
+    **discover(DATASETS_DIR, coordinates=COORDINATES_PATH),
+    DEFAULT_DATASET: DatasetSource(DATA_PATH, snapshot=SNAPSHOT_DIR, coordinates=COORDINATES_PATH),
+}
+
+# Per dataset, the frame plus its derived artifacts: /api/rs-meta payload, bitmap indexes for
+# /api/query (filters.js::applyFilters semantics), overview aggregates (charts.js), map pies (mapVis.js),
+# fitted models (one all-features model serves every subset) and the similar-projects graph.
+# Loaded on the first request naming the dataset, rebuilt in the background and swapped in whole
+# when its files change, and unloaded (least recently used first) when the loaded datasets'
+# estimated memory exceeds NBS_DATASET_MEMORY_MB (0 = no limit).
+DATASETS = DatasetRegistry(
+    SOURCES,
+    DEFAULT_DATASET,
+    memory_budget=int(float(os.environ.get("NBS_DATASET_MEMORY_MB", "2048")) * 2 ** 20),
+    store_root=Path(FEATURE_STORE_DIR) if FEATURE_STORE_DIR else None,
+    model_cache_size=4,
+    # processes that score all project pairs for the neighbour graph (large datasets only)
+    neighbour_workers=int(os.environ.get("NBS_NEIGHBOUR_WORKERS", os.cpu_count() or 1)),
+    # the graph is O(rows^2) to build, in the background; larger datasets score each /similar lookup
+    neighbour_max_rows=int(os.environ.get("NBS_NEIGHBOUR_MAX_ROWS", GRAPH_MAX_ROWS)),
+)
+DATASETS.get()  # the default dataset is loaded up front
+
+# seconds between checks of the data files; 0 disables watching (POST /api/admin/reload still works)
+WATCH_INTERVAL = float(os.environ.get("NBS_WATCH_INTERVAL", "2"))
+
+# Scores are an (n_rows x n_profiles) matrix, so bound the batch size
+MAX_BATCH_PROFILES = 100
+
+# Threads that run recommendation work off the event loop: NBS_COMPUTE_WORKERS run at once,
+# NBS_COMPUTE_QUEUE more may wait (then 503), each request waits at most NBS_COMPUTE_TIMEOUT s (then 504)
+COMPUTE = ComputePool(
+    workers=int(os.environ.get("NBS_COMPUTE_WORKERS", min(4, os.cpu_count() or 1))),
+    queue_size=int(os.environ.get("NBS_COMPUTE_QUEUE", "16")),
+    timeout=float(os.environ.get("NBS_COMPUTE_TIMEOUT", "10")),
+)
+
+# /api/admin/* (dataset status, reload, profiler) require "Authorization: Bearer <NBS_ADMIN_TOKEN>";
+# without the variable they are disabled (404), since CORS lets any page call this API
+ADMIN_TOKEN = os.environ.get("NBS_ADMIN_TOKEN", "")
+
+# Stack sampler behind /api/admin/profiler; the endpoints exist only with NBS_PROFILER=1
+PROFILER_ENABLED = os.environ.get("NBS_PROFILER", "") == "1"
+PROFILER = SamplingProfiler()
+
+
+
+def _per_dataset(fn):
+    """{(dataset id,): fn(manager)} over the loaded datasets, for a metric labelled by dataset."""
+    return lambda: {(dataset_id,): fn(manager) for dataset_id, manager in DATASETS.loaded().items()}
+
+
+# values read when /metrics is rendered, so they follow the current dataset generations
+REGISTRY.callback("nbs_datasets_loaded", "Datasets loaded in memory.", lambda: len(DATASETS.loaded()))
+REGISTRY.callback("nbs_datasets_bytes", "Estimated memory of the loaded datasets.", lambda: DATASETS.nbytes())
+REGISTRY.callback("nbs_datasets_memory_budget_bytes", "Memory budget of the loaded datasets (0 = no limit).", lambda: DATASETS.memory_budget)
+REGISTRY.callback("nbs_dataset_loads_total", "Datasets loaded on first use (again after an eviction).", lambda: DATASETS.loads, type="counter")
+REGISTRY.callback("nbs_dataset_evictions_total", "Datasets unloaded to stay within the memory budget.", lambda: DATASETS.evictions, type="counter")
+REGISTRY.callback("nbs_dataset_bytes", "Estimated memory of each loaded dataset.", _per_dataset(lambda m: m.nbytes()), ("dataset",))
+REGISTRY.callback("nbs_dataset_rows", "Rows in each loaded dataset.", _per_dataset(lambda m: len(m.current.df)), ("dataset",))
+REGISTRY.callback("nbs_dataset_generation", "Generation being served (1 = initial load).", _per_dataset(lambda m: m.current.generation), ("dataset",))
+REGISTRY.callback("nbs_dataset_reloads_total", "Successful dataset reloads.", _per_dataset(lambda m: m.reloads), ("dataset",), type="counter")
+REGISTRY.callback("nbs_dataset_reload_failures_total", "Failed dataset reloads.", _per_dataset(lambda m: m.failures), ("dataset",), type="counter")
+REGISTRY.callback("nbs_model_cache_hits_total", "Fitted-model cache hits (current generation).", _per_dataset(lambda m: m.current.models.stats()["hits"]), ("dataset",), type="counter")
+REGISTRY.callback("nbs_model_cache_misses_total", "Fitted-model cache misses (fits, current generation).", _per_dataset(lambda m: m.current.models.stats()["misses"]), ("dataset",), type="counter")
+REGISTRY.callback("nbs_model_cache_size", "Fitted models held in the cache.", _per_dataset(lambda m: m.current.models.stats()["size"]), ("dataset",))
+REGISTRY.callback("nbs_aggregates_memo_hits", "Overview aggregate memo hits since the last reload.", _per_dataset(lambda m: m.current.aggregates.stats()["hits"]), ("dataset",))
+REGISTRY.callback("nbs_aggregates_memo_misses", "Overview aggregate memo misses since the last reload.", _per_dataset(lambda m: m.current.aggregates.stats()["misses"]), ("dataset",))
+REGISTRY.callback("nbs_compute_in_flight", "Recommendation jobs running or queued.", lambda: COMPUTE.stats()["in_flight"])
+REGISTRY.callback("nbs_compute_rejected_total", "Recommendation requests refused with 503 (pool full).", lambda: COMPUTE.stats()["rejected"], type="counter")
+REGISTRY.callback("nbs_compute_timeouts_total", "Recommendation requests that hit the compute timeout (504).", lambda: COMPUTE.stats()["timeouts"], type="counter")
+REGISTRY.callback("nbs_search_term_cache_hits", "Search term lookups served from the cache (current generation).", _per_dataset(lambda m: m.current.search.stats()["hits"]), ("dataset",))
+REGISTRY.callback("nbs_search_term_cache_narrowed", "Search terms resolved by narrowing a cached prefix (type-ahead).", _per_dataset(lambda m: m.current.search.stats()["narrowed"]), ("dataset",))
+REGISTRY.callback("nbs_search_term_cache_misses", "Search terms resolved from the n-gram index.", _per_dataset(lambda m: m.current.search.stats()["misses"]), ("dataset",))
+REGISTRY.callback("nbs_search_index_bytes", "Memory held by the /api/search index.", _per_dataset(lambda m: m.current.search.nbytes()), ("dataset",))
+REGISTRY.callback("nbs_listing_memo_hits", "/api/projects filtered-ordering memo hits since the last reload.", _per_dataset(lambda m: m.current.listing.stats()["hits"]), ("dataset",))
+REGISTRY.callback("nbs_listing_memo_misses", "/api/projects filtered-ordering memo misses since the last reload.", _per_dataset(lambda m: m.current.listing.stats()["misses"]), ("dataset",))
+REGISTRY.callback("nbs_map_memo_hits", "/api/map memo hits since the last reload.", _per_dataset(lambda m: m.current.map_cube.stats()["hits"]), ("dataset",))
+REGISTRY.callback("nbs_map_memo_misses", "/api/map memo misses since the last reload.", _per_dataset(lambda m: m.current.map_cube.stats()["misses"]), ("dataset",))
+REGISTRY.callback("nbs_neighbours_bytes", "Memory held by the similar-projects graph.", _per_dataset(lambda m: m.current.neighbours.nbytes()), ("dataset",))
+REGISTRY.callback("nbs_neighbours_build_seconds", "Time the similar-projects graph took to build or attach.", _per_dataset(lambda m: m.current.neighbours.build_seconds), ("dataset",))
+REGISTRY.callback("nbs_neighbours_scans_total", "Similar-projects lookups scored by a scan (graph not built or not covering the row).", _per_dataset(lambda m: m.current.neighbours.scans), ("dataset",), type="counter")
+REGISTRY.callback("nbs_filter_index_bytes", "Memory held by the /api/query bitmap index.", _per_dataset(lambda m: m.current.query_index.nbytes()), ("dataset",))
+
+
+def _dataset(dataset: Optional[str]) -> DatasetManager:
+    """The manager of ?dataset= (None = the default), loaded on first use; unknown id -> 404."""
+    try:
+        return DATASETS.get(dataset)
+    except UnknownDataset:
+        raise HTTPException(404, f"Unknown dataset {dataset!r}; see /api/datasets")
+    except DatasetLoadError as e:
+        raise HTTPException(500, str(e))
+
+
+def _state(dataset: Optional[str]) -> DatasetState:
+    return _dataset(dataset).current
 
-# Load once
-DF = load_df()
 
 @app.get("/")
-def home():
+def home(request: Request):
+    """index.html with content-hashed asset URLs, so the scripts and styles can be cached for good."""
     index_path = WEBAPP_DIR / "index.html"
     if not index_path.exists():
         raise HTTPException(404, f"index.html not found at: {index_path}")
-    return FileResponse(index_path)
+    html = index_path.read_text(encoding="utf-8")
+    if ASSETS is not None:
+        html = versioned_html(html, ASSETS)
+    return page_payload(html).response(request)
 
 # Optional: serve other pages like /database.html if you add them
 @app.get("/{page_name}.html")
@@ -62,45 +209,474 @@ def serve_page(page_name: str):
     return FileResponse(p)
 
 @app.get("/api/rs-meta")
-def rs_meta():
-    df = DF.copy()
-
-    b = pd.to_numeric(df.get("begin_year"), errors="coerce")
-    e = pd.to_numeric(df.get("end_year"), errors="coerce")
-    duration = (e - b).astype(float)
-
-    def safe_minmax(series):
-        s = pd.to_numeric(series, errors="coerce")
-        s = s.replace([np.inf, -np.inf], np.nan).dropna()
-        if s.empty:
-            return {"min": 0, "max": 0}
-        return {"min": float(s.min()), "max": float(s.max())}
-
-    funding_tags = df.get("sources_of_funding", pd.Series([], dtype=str)).apply(_split_multivalue)
-    funding_vocab = sorted({t for tags in funding_tags for t in tags})
-
-    payload = {
-        "categorical": {
-            "country": sorted(df["country"].dropna().astype(str).unique().tolist()) if "country" in df.columns else [],
-            "status": sorted(df["status"].dropna().astype(str).unique().tolist()) if "status" in df.columns else [],
-            "previous_area_type": sorted(df["previous_area_type"].dropna().astype(str).unique().tolist()) if "previous_area_type" in df.columns else [],
-        },
-        "numeric_ranges": {
-            "duration": safe_minmax(duration),
-            "nbs_area": safe_minmax(df.get("nbs_area")),
-            "total_cost": safe_minmax(df.get("total_cost")),
-        },
-        "funding_tags": funding_vocab,
+def rs_meta(request: Request, dataset: Optional[str] = None):
+    """Recommender panel metadata; computed once per dataset version, revalidated via ETag."""
+    meta = _state(dataset).rs_meta
+    headers = {"ETag": meta.etag, "Cache-Control": "no-cache"}
+    if meta.matches(request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=meta.body, media_type="application/json", headers=headers)
+
+@app.get("/api/data-manifest")
+def data_manifest(request: Request, dataset: Optional[str] = None):
+    """
+    Content-hashed URLs of the data the frontend loads at startup. The manifest is
+    revalidated on every load (cheap 304); the files it points to never change.
+    """
+    state = _state(dataset)
+    coords = ASSETS.file_hash("data/coordinates.csv") if ASSETS is not None else None
+    query = f"?dataset={dataset}" if dataset else ""
+    manifest = {
+        "dataset": dataset or DATASETS.default,
+        "version": state.version,
+        "browse": f"/data/browse.{state.delivery.browse.hash}.csv{query}",
+        "coordinates": f"/assets/data/coordinates.csv?v={coords}" if coords else "/assets/data/coordinates.csv",
+        "details": "/api/projects/{id}",
+    }
+    return page_payload(json.dumps(manifest), "application/json").response(request)
+
+
+@app.get("/data/browse.{digest}.csv")
+def browse_csv(digest: str, request: Request, dataset: Optional[str] = None):
+    """The browse projection of the dataset (filter/list/map columns + id); immutable under its hash."""
+    payload = _state(dataset).delivery.browse
+    if digest != payload.hash:
+        # from an older dataset version: the manifest has the new URL
+        raise HTTPException(404, "Stale dataset URL; reload /api/data-manifest")
+    return payload.response(request, immutable=True)
+
+
+def _projects_page(payload: Dict[str, Any], fields: Optional[str], shape: Optional[str], dataset: Optional[str]) -> Response:
+    filters = payload.get("filters") or {}
+    if not isinstance(filters, dict):
+        raise HTTPException(400, "filters must be an object")
+    sort = payload.get("sort") or None
+    fields_list, shape = _response_options(payload, fields, shape)
+    try:
+        limit = max(1, min(MAX_PAGE_SIZE, int(payload.get("limit", 50))))
+        offset = max(0, int(payload.get("offset", 0)))
+    except (TypeError, ValueError):
+        raise HTTPException(400, "limit and offset must be integers")
+
+    state = _state(dataset)
+    _check_fields(fields_list, [*state.df.columns, "id"])
+    try:
+        if payload.get("cursor"):
+            offset = decode_cursor(str(payload["cursor"]), state.version, filters, sort)
+        rows, total = state.listing.page(filters, sort, offset, limit)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    page = project(state.df.iloc[rows], fields_list)
+    page.insert(0, "id", rows)
+    end = offset + len(rows)
+    next_cursor = encode_cursor(state.version, filters, sort, end) if end < total else None
+    head = json.dumps({"count": total, "offset": offset, "limit": limit, "next": next_cursor})
+    body = head[:-1] + ',"items":' + encode_frame(page.reset_index(drop=True), shape) + "}"
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/api/projects")
+def projects(payload: Dict[str, Any], fields: Optional[str] = None, shape: Optional[str] = None, dataset: Optional[str] = None):
+    """
+    One page of the projects matching "filters" (window.filters shape), sorted by
+    "sort" ("total_cost", "-begin_year", ...; default row order).
+    "limit" (<= 500) rows from "offset", or from where "cursor" (the previous
+    page's "next") points. "fields" / "shape" as for /api/recommend; every item has its "id".
+    Returns {"count": total matches, "offset", "limit", "next": cursor or null, "items"}.
+    """
+    return _projects_page(payload, fields, shape, dataset)
+
+
+@app.get("/api/projects")
+def projects_get(sort: Optional[str] = None, limit: int = 50, offset: int = 0, cursor: Optional[str] = None,
+                 fields: Optional[str] = None, shape: Optional[str] = None, dataset: Optional[str] = None):
+    """Unfiltered pages (see POST /api/projects), e.g. for links and scripts."""
+    payload = {"sort": sort, "limit": limit, "offset": offset, "cursor": cursor}
+    return _projects_page(payload, fields, shape, dataset)
+
+
+@app.get("/api/projects/{project_id}")
+def project_details(project_id: int, request: Request, dataset: Optional[str] = None):
+    """Every column of one project (row position = the browse CSV id), for the detail and comparison views."""
+    state = _state(dataset)
+    if not 0 <= project_id < len(state.df):
+        raise HTTPException(404, f"No project with id {project_id}")
+    etag = f'"{state.version}-{project_id}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    row = state.df.iloc[[project_id]]
+    body = encode_frame(row)[1:-1]  # the one record, without the list brackets
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/projects/{project_id}/similar")
+def similar_projects(project_id: int, request: Request, k: int = 10, fields: Optional[str] = None, shape: Optional[str] = None,
+                     dataset: Optional[str] = None):
+    """
+    The k (<= 20) projects most similar to one project, best first, by cosine over
+    every recommender feature: from the precomputed neighbour graph, or scored for
+    this project alone while the graph builds (see neighbours.py). "fields" / "shape" as for
+    /api/recommend; every item has its "id" and "similarity".
+    Returns {"id", "items"}.
+    """
+    state = _state(dataset)
+    if not 0 <= project_id < len(state.df):
+        raise HTTPException(404, f"No project with id {project_id}")
+    fields_list, shape = _response_options({}, fields, shape)
+    _check_fields(fields_list, [*state.df.columns, "id", "similarity"])
+    etag = f'"{state.version}-{project_id}-similar"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    ids, sims = state.neighbours.similar(project_id, max(1, k))
+    items = project(state.df.iloc[ids], fields_list).reset_index(drop=True)
+    items.insert(0, "id", ids)
+    items.insert(1, "similarity", np.round(sims.astype(float), 4))
+    body = '{"id":' + str(project_id) + ',"items":' + encode_frame(items, shape) + "}"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.post("/api/query")
+def query(payload: Dict[str, Any], dataset: Optional[str] = None):
+    """
+    Rows matching a filter object shaped like window.filters (sets sent as arrays).
+    Returns {"count": n, "ids": [row positions in cleaned.csv]}.
+    """
+    filters = payload.get("filters", payload)
+    if not isinstance(filters, dict):
+        raise HTTPException(400, "filters must be an object")
+    try:
+        rows = _state(dataset).query_index.rows(filters)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return JSONResponse({"count": int(len(rows)), "ids": rows.tolist()})
+
+
+@app.post("/api/search")
+def search(payload: Dict[str, Any], dataset: Optional[str] = None):
+    """
+    Ranked full-text search: {"q": "...", "filters": {...}, "description": false, "limit": null}.
+    Matches projects whose indexed words contain every word of q, and whose search
+    text contains q itself when q is not a single word (see search.py);
+    "filters" (window.filters shape, its "search" key ignored) restricts the rows,
+    "description": true also searches short_description.
+    Returns {"count": n, "ids": [row positions, best first], "scores": [...]}.
+    """
+    q = str(payload.get("q") or "").strip()
+    filters = payload.get("filters") or {}
+    if not isinstance(filters, dict):
+        raise HTTPException(400, "filters must be an object")
+    filters = {k: v for k, v in filters.items() if k != "search"}
+    limit = payload.get("limit")
+    try:
+        limit = None if limit is None else max(0, int(limit))
+    except (TypeError, ValueError):
+        raise HTTPException(400, "limit must be an integer")
+
+    state = _state(dataset)
+    try:
+        rows = state.query_index.rows(filters) if filters else None
+        result = state.search.search(q, rows=rows, description=bool(payload.get("description"))) if q else None
+        if result is None:
+            # no words of 2+ characters in q: plain substring match, like applyFilters
+            ids = state.query_index.rows({**filters, "search": q})
+            result = (ids, np.zeros(len(ids), dtype=np.float32))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    ids, scores = result
+    count = len(ids)
+    if limit is not None:
+        ids, scores = ids[:limit], scores[:limit]
+    return JSONResponse({"count": int(count), "ids": ids.tolist(), "scores": np.round(scores.astype(float), 4).tolist()})
+
+
+@app.post("/api/map")
+def map_pies(payload: Dict[str, Any], dataset: Optional[str] = None):
+    """
+    Pie glyph data for the map: {"metric": one of the #pie-metric options, "filters": {...}}.
+    A word search in the filters matches like /api/search (what the results list shows).
+    Returns {"metric", "categories": [colour domain], "cities": [{city, country, latitude,
+    longitude, count, slices: [{key, value}]}]}.
+    """
+    filters = payload.get("filters") or {}
+    if not isinstance(filters, dict):
+        raise HTTPException(400, "filters must be an object")
+    metric = str(payload.get("metric") or "nbs_type")
+
+    state = _state(dataset)
+    try:
+        signature = filter_signature(filters)
+        search = str(filters.get("search") or "").strip()
+        mask = state.query_index.mask({k: v for k, v in filters.items() if k != "search"})
+        scores = state.search.scores(search) if search else None
+        if scores is not None:
+            mask &= scores > 0
+        elif search:
+            mask &= state.query_index.mask({"search": search})
+        return state.map_cube.pies(metric, mask, signature)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+def _filters_and_int(payload: Dict[str, Any], name: str, default: int, lo: int, hi: int) -> tuple[Dict[str, Any], int]:
+    filters = payload.get("filters") or {}
+    if not isinstance(filters, dict):
+        raise HTTPException(400, "filters must be an object")
+    try:
+        value = int(payload.get(name, default))
+    except (TypeError, ValueError):
+        raise HTTPException(400, f"{name} must be an integer")
+    return filters, max(lo, min(hi, value))
+
+
+@app.post("/api/aggregates/countries")
+def aggregate_countries(payload: Dict[str, Any], dataset: Optional[str] = None):
+    """Projects per country for the filtered rows: top-N (default 15) + "Other"."""
+    filters, top = _filters_and_int(payload, "top", 15, 1, 200)
+    try:
+        return JSONResponse(_state(dataset).aggregates.country_counts(filters, top=top))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@app.post("/api/aggregates/cost-histogram")
+def aggregate_cost_histogram(payload: Dict[str, Any], dataset: Optional[str] = None):
+    """total_cost histogram for the filtered rows, binned like d3.bin over scale.ticks(bins)."""
+    filters, bins = _filters_and_int(payload, "bins", 10, 1, 100)
+    try:
+        return JSONResponse(_state(dataset).aggregates.cost_histogram(filters, bins=bins))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@app.post("/api/aggregates/years")
+def aggregate_years(payload: Dict[str, Any], dataset: Optional[str] = None):
+    """Projects per begin_year for the filtered rows, ascending."""
+    filters = payload.get("filters") or {}
+    if not isinstance(filters, dict):
+        raise HTTPException(400, "filters must be an object")
+    try:
+        return JSONResponse(_state(dataset).aggregates.yearly_counts(filters))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+def _scoring_options(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Feature selection / weights / k / columns shared by the recommend endpoints."""
+    weights = payload.get("weights") or {}
+    if not isinstance(weights, dict):
+        raise HTTPException(400, "weights must be an object of {feature: number}")
+    selected = payload.get("selected_features") or []
+    if not isinstance(selected, list):
+        raise HTTPException(400, "selected_features must be a list of feature keys")
+    columns = payload.get("columns")
+    if columns is not None and not isinstance(columns, list):
+        raise HTTPException(400, "columns must be a list of names")
+    nprobe = payload.get("nprobe")
+    if nprobe is not None:
+        try:
+            nprobe = int(nprobe)
+        except (TypeError, ValueError):
+            raise HTTPException(400, "nprobe must be an integer")
+    try:
+        k = int(payload.get("k", 5))
+    except (TypeError, ValueError):
+        raise HTTPException(400, "k must be a positive integer")
+    if k < 1:
+        raise HTTPException(400, "k must be a positive integer")
+    return {
+        "features": canonical_features(selected),
+        "weights": weights,
+        "columns": columns,  # extra result columns; None = all
+        "n_results": k,
+        # only used once the table is large enough to carry an IVF index (model.ANN_MIN_ROWS)
+        "nprobe": nprobe,
+        "exact": bool(payload.get("exact", False)),
     }
-    return JSONResponse(payload)
+
+
+def _response_options(payload: Dict[str, Any], fields: Optional[str], shape: Optional[str]) -> tuple[Optional[List[str]], str]:
+    """`fields` / `shape` from the body, else from the query string."""
+    try:
+        fields_list = parse_fields(payload.get("fields", fields))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    shape = payload.get("shape", shape) or "records"
+    if shape not in SHAPES:
+        raise HTTPException(400, f"shape must be one of: {', '.join(SHAPES)}")
+    return fields_list, shape
+
+
+def _check_fields(fields: Optional[List[str]], available) -> None:
+    """400 listing the requested fields a response cannot have."""
+    try:
+        check_fields(fields, available)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+def _result_fields(state: DatasetState) -> List[str]:
+    """Fields a recommendation result can have: the frame's columns, the derived ones and "similarity"."""
+    return [*state.df.columns, *PREFERRED_FIRST, "similarity"]
+
+
+async def _offload(fn, *args):
+    """Run fn on the compute pool; overload and timeouts become 503 / 504."""
+    try:
+        return await COMPUTE.run(fn, *args)
+    except Overloaded:
+        raise HTTPException(503, "Server busy, retry shortly", headers={"Retry-After": "1"})
+    except ComputeTimeout:
+        raise HTTPException(504, f"Recommendation took longer than {COMPUTE.timeout:g} s")
+
+
+def _recommend_body(state, preferences: Dict[str, Any], options: Dict[str, Any], fields, shape: str) -> bytes:
+    with stage_timer("model_cache"):
+        rs = state.models.get(state.df)
+    try:
+        result_df = rs.recommend(preferences, **options)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    with stage_timer("serialize"):
+        return encode_frame(project(result_df, fields), shape)
+
+
+def _recommend_batch_body(state, preferences_list: List[Dict[str, Any]], options: Dict[str, Any], fields, shape: str) -> bytes:
+    with stage_timer("model_cache"):
+        rs = state.models.get(state.df)
+    try:
+        result_dfs = rs.recommend_batch(preferences_list, **options)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    with stage_timer("serialize"):
+        return encode_frames((project(r, fields) for r in result_dfs), shape)
+
 
 @app.post("/api/recommend")
-async def recommend(payload: Dict[str, Any]):
-    selected_features: List[str] = payload.get("selected_features", [])
+async def recommend(payload: Dict[str, Any], fields: Optional[str] = None, shape: Optional[str] = None, dataset: Optional[str] = None):
+    """
+    Top-k projects for one preference profile.
+    fields: only these result fields, in this order (e.g. what the panel renders)
+    shape:  "records" (default, list of objects) or "columnar" ({columns, data})
+    The scoring runs on the compute pool: 503 when it is full, 504 past its timeout.
+    """
     preferences: Dict[str, Any] = payload.get("preferences", {})
-    k = int(payload.get("k", 5))
+    if not isinstance(preferences, dict):
+        raise HTTPException(400, "preferences must be an object")
+    options = _scoring_options(payload)
+    fields, shape = _response_options(payload, fields, shape)
+    if fields is not None:
+        options["columns"] = fields
+
+    # a dataset not loaded yet is loaded on a threadpool thread, not on the event loop
+    state = await run_in_threadpool(_state, dataset)
+    _check_fields(fields, _result_fields(state))
+    body = await _offload(_recommend_body, state, preferences, options, fields, shape)
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/api/recommend/batch")
+async def recommend_batch(payload: Dict[str, Any], fields: Optional[str] = None, shape: Optional[str] = None, dataset: Optional[str] = None):
+    """Many preference profiles, one shared selected_features: one result set per profile (fields / shape as in /api/recommend)."""
+    preferences_list = payload.get("preferences", [])
+    if not isinstance(preferences_list, list) or not all(isinstance(p, dict) for p in preferences_list):
+        raise HTTPException(400, "preferences must be a list of objects")
+    if len(preferences_list) > MAX_BATCH_PROFILES:
+        raise HTTPException(400, f"At most {MAX_BATCH_PROFILES} preference profiles per batch")
+    options = _scoring_options(payload)
+    fields, shape = _response_options(payload, fields, shape)
+    if fields is not None:
+        options["columns"] = fields
+
+    state = await run_in_threadpool(_state, dataset)
+    _check_fields(fields, _result_fields(state))
+    body = await _offload(_recommend_batch_body, state, preferences_list, options, fields, shape)
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/api/datasets")
+def datasets():
+    """The dataset ids /api/* accept as ?dataset=, the default, and which are loaded (with their row counts)."""
+    loaded = DATASETS.loaded()
+    items = [
+        {"id": dataset_id, "loaded": dataset_id in loaded, "rows": len(loaded[dataset_id].current.df) if dataset_id in loaded else None}
+        for dataset_id in DATASETS.ids()
+    ]
+    return {"default": DATASETS.default, "datasets": items}
+
+
+def _require_admin(request: Request) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(404, "Admin endpoints disabled (start the server with NBS_ADMIN_TOKEN=<token>)")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(401, "Admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+
+@app.get("/api/admin/datasets")
+def datasets_status(request: Request):
+    """Registry status: memory budget and use, loads, evictions, and every dataset's source file."""
+    _require_admin(request)
+    return DATASETS.status()
+
+
+@app.get("/api/admin/dataset")
+def dataset_status(request: Request, dataset: Optional[str] = None):
+    """Generation, content version, estimated memory and reload counters of a dataset (loaded if needed)."""
+    _require_admin(request)
+    return _dataset(dataset).status()
+
+
+@app.post("/api/admin/reload")
+def dataset_reload(request: Request, wait: bool = False, dataset: Optional[str] = None):
+    """
+    Re-read the data files and swap in the result; requests keep using the current
+    generation until then. wait=false (default) returns 202 while it builds.
+    "started": false means a build was already running; this reload is queued after it.
+    """
+    _require_admin(request)
+    manager = _dataset(dataset)
+    started = manager.reload(wait=wait)
+    status = {**manager.status(), "started": started}
+    if wait and started and status["last_error"]:
+        raise HTTPException(500, f"Reload failed: {status['last_error']}")
+    return JSONResponse(status, status_code=200 if wait and started else 202)
+
+
+@app.get("/metrics")
+def metrics():
+    """Counters and latency histograms in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def _require_profiler(request: Request) -> None:
+    _require_admin(request)
+    if not PROFILER_ENABLED:
+        raise HTTPException(404, "Profiler disabled (start the server with NBS_PROFILER=1)")
+
+
+@app.post("/api/admin/profiler/start")
+def profiler_start(request: Request, interval: float = 0.005, duration: float = 60.0):
+    """Start sampling every thread's stack every `interval` s, for at most `duration` s."""
+    _require_profiler(request)
+    if not PROFILER.start(interval=interval, duration=duration):
+        raise HTTPException(409, "Profiler already running")
+    return PROFILER.status()
+
+
+@app.get("/api/admin/profiler")
+def profiler_status(request: Request):
+    _require_profiler(request)
+    return PROFILER.status()
 
-    rs = SimpleNBSRecommender().fit(DF, selected_features)
-    result_df = rs.recommend(preferences, n_results=k)
 
-    return JSONResponse(result_df.to_dict(orient="records"))
+@app.post("/api/admin/profiler/stop")
+def profiler_stop(request: Request):
+    """Stop sampling; returns collapsed stacks ("frame;frame count" lines) for flamegraph tools."""
+    _require_profiler(request)
+    return PlainTextResponse(PROFILER.stop())
@@ -0,0 +1,161 @@
+"""
+Typed columnar snapshot of the cleaned dataset: one .npy file per column plus a
+manifest.json, so the server can memory-map it instead of re-parsing the CSV.
+
+Column kinds:
+  - number:   int64 / float64 / bool array
+  - category: int32 codes (-1 = missing) + categories in the manifest
+  - text:     UTF-8 blob (uint8) + int64 character offsets + bool null mask
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT = 1
+MANIFEST = "manifest.json"
+
+# string columns with at most this share of distinct values are stored as codes
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _source_stat(source: Optional[Path]) -> Optional[Dict[str, int]]:
+    if source is None or not Path(source).exists():
+        return None
+    st = Path(source).stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _write_text(values: pd.Series, prefix: Path) -> None:
+    isnull = values.isna().to_numpy()
+    strs = values.where(~values.isna(), "").astype(str).tolist()
+    lengths = np.fromiter((len(s) for s in strs), dtype=np.int64, count=len(strs))
+    offsets = np.zeros(len(strs) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    blob = np.frombuffer("".join(strs).encode("utf-8"), dtype=np.uint8)
+    np.save(f"{prefix}.blob.npy", blob)
+    np.save(f"{prefix}.offsets.npy", offsets)
+    np.save(f"{prefix}.null.npy", isnull)
+
+
+def _read_text(prefix: Path, mmap_mode: Optional[str]) -> np.ndarray:
+    blob = np.load(f"{prefix}.blob.npy", mmap_mode=mmap_mode)
+    offsets = np.load(f"{prefix}.offsets.npy", mmap_mode=mmap_mode).tolist()
+    isnull = np.load(f"{prefix}.null.npy")
+
+    # one C-level decode, then slice by character offsets
+    text = bytes(blob).decode("utf-8")
+    out = np.array([text[a:b] for a, b in zip(offsets[:-1], offsets[1:])], dtype=object)
+    out[isnull] = np.nan
+    return out
+
+
+def write_snapshot(df: pd.DataFrame, directory: Path, source: Optional[Path] = None) -> Path:
+    """
+    Write `df` as a snapshot directory (replaced atomically).
+    `source` is the CSV this frame mirrors; its size/mtime are recorded so
+    load_df can tell whether the snapshot is stale.
+    """
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=directory.name + ".", dir=directory.parent))
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        prefix = tmp / f"c{i}"
+        entry: Dict[str, Any] = {"name": str(name)}
+
+        if pd.api.types.is_bool_dtype(col) or pd.api.types.is_numeric_dtype(col):
+            if pd.api.types.is_bool_dtype(col):
+                arr = col.to_numpy(dtype=bool)
+            elif pd.api.types.is_integer_dtype(col) and not col.isna().any():
+                arr = col.to_numpy(dtype=np.int64)
+            else:
+                arr = col.to_numpy(dtype=np.float64, na_value=np.nan)
+            np.save(f"{prefix}.npy", arr)
+            entry.update(kind="number", dtype=str(arr.dtype))
+        else:
+            nunique = col.nunique(dropna=True)
+            if len(col) and nunique <= CATEGORY_MAX_RATIO * len(col):
+                codes, categories = pd.factorize(col.astype(object), use_na_sentinel=True)
+                np.save(f"{prefix}.codes.npy", codes.astype(np.int32))
+                entry.update(kind="category", categories=[str(c) for c in categories])
+            else:
+                _write_text(col.astype(object), prefix)
+                entry.update(kind="text")
+        columns.append(entry)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "rows": int(len(df)),
+        "source": _source_stat(source),
+        "columns": columns,
+    }
+    with open(tmp / MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    old = None
+    if directory.exists():
+        old = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(directory, old)
+    os.replace(tmp, directory)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+    return directory
+
+
+def read_manifest(directory: Path) -> Optional[Dict[str, Any]]:
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest if manifest.get("format") == SNAPSHOT_FORMAT else None
+
+
+def is_fresh(directory: Path, source: Optional[Path]) -> bool:
+    """True if the snapshot exists and was written from `source` as it is now (or source is gone)."""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return False
+    current = _source_stat(source)
+    return current is None or manifest.get("source") == current
+
+
+def load_snapshot(directory: Path, columns: Optional[Iterable[str]] = None, mmap: bool = True) -> pd.DataFrame:
+    """
+    Load a snapshot; `columns` restricts which columns are read (others are never touched).
+    Numeric columns are memory-mapped read-only when mmap=True.
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in: {directory}")
+
+    wanted = None if columns is None else set(columns)
+    mmap_mode = "r" if mmap else None
+
+    data: Dict[str, Any] = {}
+    for i, entry in enumerate(manifest["columns"]):
+        name = entry["name"]
+        if wanted is not None and name not in wanted:
+            continue
+        prefix = directory / f"c{i}"
+        if entry["kind"] == "number":
+            data[name] = np.load(f"{prefix}.npy", mmap_mode=mmap_mode)
+        elif entry["kind"] == "category":
+            codes = np.load(f"{prefix}.codes.npy", mmap_mode=mmap_mode)
+            categories = np.array(entry["categories"] + [np.nan], dtype=object)
+            data[name] = categories[codes]  # code -1 -> trailing NaN
+        else:
+            data[name] = _read_text(prefix, mmap_mode)
+
+    return pd.DataFrame(data, copy=False)
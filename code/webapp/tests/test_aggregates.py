@@ -0,0 +1,72 @@
+"""Overview chart numbers (charts.js semantics), d3 tick helpers and the _Memo LRU."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommenderSystem.aggregates import OverviewAggregates, _Memo, d3_nice, d3_ticks
+from recommenderSystem.query import FilterIndex
+
+
+@pytest.fixture
+def aggregates():
+    df = pd.DataFrame({
+        "country": ["France", "Germany", "Germany", "Italy", None, "France", "Germany", "Spain"],
+        "total_cost": [100, 2500, np.nan, 9800, 40, 0, 560, 7000],
+        "begin_year": [2001, 2001, 2005, np.nan, 2010, 2005, 2005, 2020],
+    })
+    return OverviewAggregates(df, FilterIndex(df))
+
+
+def test_d3_ticks_and_nice():
+    assert d3_ticks(0, 1, 5) == pytest.approx([0, 0.2, 0.4, 0.6, 0.8, 1])
+    assert d3_ticks(0, 10, 10) == list(range(11))
+    assert d3_ticks(1, 1000, 10) == [100 * i for i in range(1, 11)]
+    assert d3_nice(0.2, 9.7, 10) == (0, 10)
+    assert d3_nice(13, 987, 10) == (0, 1000)
+
+
+def test_country_counts_top_n_and_other(aggregates):
+    assert aggregates.country_counts({}, top=2) == [
+        {"country": "Germany", "count": 3},
+        {"country": "France", "count": 2},
+        {"country": "Other", "count": 3, "isOther": True},
+    ]
+    # ties keep first-appearance order (d3.rollups); a missing country is "Unknown"
+    assert [c["country"] for c in aggregates.country_counts({}, top=15)] == ["Germany", "France", "Italy", "Unknown", "Spain"]
+    assert aggregates.country_counts({"countries": ["Italy"]}) == [{"country": "Italy", "count": 1}]
+
+
+def test_cost_histogram_counts_positive_costs(aggregates):
+    hist = aggregates.cost_histogram({})
+    assert hist["domain"] == [0, 10000]
+    assert sum(b["count"] for b in hist["bins"]) == 6  # NaN and 0 are left out
+    assert [b["count"] for b in hist["bins"][:3]] == [3, 0, 1]
+    # d3.bin keeps a threshold equal to the domain end: a last, empty-width bin for values == x1
+    assert hist["bins"][-1] == {"x0": 10000, "x1": 10000, "count": 0}
+    assert aggregates.cost_histogram({"countries": ["Nowhere"]}) == {"domain": None, "bins": []}
+
+
+def test_yearly_counts(aggregates):
+    assert aggregates.yearly_counts({}) == [
+        {"year": 2001, "count": 2},
+        {"year": 2005, "count": 3},
+        {"year": 2010, "count": 1},
+        {"year": 2020, "count": 1},
+    ]
+
+
+def test_results_are_memoized_per_filter_signature(aggregates):
+    first = aggregates.country_counts({"countries": ["France", "Germany"]})
+    again = aggregates.country_counts({"countries": ["Germany", "France"], "cities": []})
+    assert again is first
+    assert aggregates.stats()["hits"] >= 1
+
+
+def test_memo_is_a_bounded_lru():
+    memo = _Memo(maxsize=2)
+    calls = []
+    for key in ["a", "b", "a", "c", "b"]:
+        memo.get_or_compute(key, lambda key=key: calls.append(key) or key.upper())
+    # "a" was used again before "c" arrived, so "b" was evicted and recomputed
+    assert calls == ["a", "b", "c", "b"]
+    assert memo.stats() == {"hits": 1, "misses": 4, "size": 2}
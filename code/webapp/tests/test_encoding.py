@@ -0,0 +1,71 @@
+"""encode_frame gives the JSON of DataFrame.to_dict (missing and non-finite values as null)."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommenderSystem.encoding import check_fields, encode_frame, encode_frames, parse_fields, project
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "name": ['Park "Nord"', "Überseeinsel", None, "línea\nverde"],
+        "similarity": [0.1 + 0.2, 1e-17, np.nan, np.inf],
+        "rows": np.array([1, 2, 3, 2 ** 40], dtype=np.int64),
+        "small": np.array([1, 2, 3, 4], dtype=np.float32),
+        "flag": [True, False, True, False],
+        "count": pd.array([1, None, 3, 4], dtype="Int64"),
+        "mixed": ["a", 2, np.nan, 1.5],
+    })
+
+
+def _expected(df):
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+    return [{k: (None if isinstance(v, float) and not np.isfinite(v) else v) for k, v in r.items()} for r in records]
+
+
+def test_records_match_to_dict(df):
+    assert json.loads(encode_frame(df)) == _expected(df)
+
+
+def test_columnar(df):
+    out = json.loads(encode_frame(df, shape="columnar"))
+    assert out["columns"] == list(df.columns)
+    assert [list(r) for r in zip(*out["data"])] == [list(r.values()) for r in _expected(df)]
+
+
+def test_floats_round_trip_exactly(df):
+    values = [r["similarity"] for r in json.loads(encode_frame(df))]
+    assert values[:2] == [0.1 + 0.2, 1e-17]
+
+
+def test_empty_frame_and_many_frames(df):
+    assert encode_frame(df.iloc[:0]) == "[]"
+    assert json.loads(encode_frame(df.iloc[:0], shape="columnar")) == {"columns": list(df.columns), "data": [[]] * len(df.columns)}
+    assert json.loads(encode_frames([df.iloc[:1], df.iloc[:0]])) == [_expected(df.iloc[:1]), []]
+
+
+def test_unknown_shape(df):
+    with pytest.raises(ValueError):
+        encode_frame(df, shape="rows")
+
+
+def test_fields():
+    assert parse_fields(None) is None
+    assert parse_fields(" name, similarity ,,") == ["name", "similarity"]
+    assert parse_fields(["name", ""]) == ["name"]
+    assert parse_fields("") is None
+    with pytest.raises(ValueError):
+        parse_fields({"name": 1})
+
+    check_fields(None, [])
+    check_fields(["name", "name"], ["name"])
+    with pytest.raises(ValueError, match="Unknown fields: nope, gone"):
+        check_fields(["name", "nope", "gone", "nope"], ["name"])
+
+
+def test_project(df):
+    assert list(project(df, ["similarity", "name", "similarity"]).columns) == ["similarity", "name"]
+    assert project(df, None) is df
@@ -0,0 +1,100 @@
+"""FeatureStore: publish once under the lock, attach read-only, same scores as a fitted model."""
+import threading
+
+import numpy as np
+import pytest
+from pandas.testing import assert_frame_equal
+
+from benchmarks.synthetic import synthetic_nbs_frame
+from recommenderSystem.featurestore import KEEP_VERSIONS, FeatureStore
+from recommenderSystem.model import SimpleNBSRecommender
+
+PREFERENCES = [
+    {"country": "Country 001", "total_cost": 250000, "sources_of_funding": "Angel / informal investors"},
+    {"status": "Completed", "duration": 4, "nbs_area": 12000},
+    {},
+]
+
+
+@pytest.fixture(scope="module")
+def df():
+    return synthetic_nbs_frame(300, seed=2)
+
+
+@pytest.mark.parametrize("preferences", PREFERENCES)
+def test_attached_model_scores_like_a_fitted_one(tmp_path, df, preferences):
+    attached = FeatureStore(tmp_path).load_or_fit(df, "v1")
+    fitted = SimpleNBSRecommender().fit(df)
+    for features in [None, ["country", "total_cost"]]:
+        assert_frame_equal(
+            attached.recommend(preferences, n_results=10, features=features, exact=True),
+            fitted.recommend(preferences, n_results=10, features=features, exact=True),
+        )
+
+
+def test_attached_arrays_are_read_only_maps(tmp_path, df):
+    model = FeatureStore(tmp_path).load_or_fit(df, "v1")
+    for block in model._blocks.values():
+        assert isinstance(block.sq_norms, np.memmap)
+        assert not block.sq_norms.flags.writeable
+
+
+def test_second_call_attaches_without_refitting(tmp_path, df):
+    store = FeatureStore(tmp_path)
+    store.load_or_fit(df, "v1")
+    published = (tmp_path / "v1" / "features.json").stat().st_mtime_ns
+    store.load_or_fit(df, "v1")
+    assert (tmp_path / "v1" / "features.json").stat().st_mtime_ns == published
+
+
+def test_concurrent_callers_publish_once(tmp_path, df):
+    store = FeatureStore(tmp_path)
+    models, errors = [], []
+
+    def run():
+        try:
+            models.append(store.load_or_fit(df, "v1"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == [] and len(models) == 4
+    # one published version, no temporary directory left behind
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == ["v1"]
+
+
+def test_keeps_the_newest_versions(tmp_path, df):
+    store = FeatureStore(tmp_path)
+    for version in ["v1", "v2", "v3", "v4"]:
+        store.load_or_fit(df, version)
+    assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == KEEP_VERSIONS
+    assert (tmp_path / "v4" / "features.json").exists()
+
+
+def test_attach_rejects_another_frame(tmp_path, df):
+    FeatureStore(tmp_path).load_or_fit(df, "v1")
+    with pytest.raises(ValueError):
+        SimpleNBSRecommender.attach_features(tmp_path / "v1", df.iloc[:10])
+
+
+def test_neighbour_graph_is_built_once_and_saved(tmp_path, df):
+    store = FeatureStore(tmp_path)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return np.arange(6, dtype=np.int32).reshape(3, 2), np.ones((3, 2), dtype=np.float32)
+
+    with pytest.raises(FileNotFoundError):
+        store.load_or_build_neighbours("v1", 2, build)
+    store.load_or_fit(df, "v1")
+    ids, sims = store.load_or_build_neighbours("v1", 2, build)
+    again, _ = store.load_or_build_neighbours("v1", 2, build)
+    assert builds == [1]
+    assert isinstance(again, np.memmap)
+    assert again.tolist() == ids.tolist() == [[0, 1], [2, 3], [4, 5]]
+    assert sims.dtype == np.float32
@@ -0,0 +1,92 @@
+"""/api/projects orderings (missing last, ties in row order) and cursor pagination."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommenderSystem.listing import ProjectListing, decode_cursor, encode_cursor, parse_sort
+from recommenderSystem.query import FilterIndex
+
+
+@pytest.fixture
+def listing():
+    df = pd.DataFrame({
+        "intervention_name": ["b park", "A roof", "c garden", "", "a Roof", "D trees"],
+        "country": ["Italy", "France", "Italy", "Germany", "France", "Italy"],
+        "total_cost": [300, np.nan, 100, 300, 50, np.nan],
+    })
+    return ProjectListing(df, FilterIndex(df))
+
+
+def test_parse_sort():
+    assert parse_sort(None) == (None, False)
+    assert parse_sort("") == (None, False)
+    assert parse_sort("total_cost") == ("total_cost", False)
+    assert parse_sort(" -total_cost ") == ("total_cost", True)
+
+
+def test_numeric_sort_puts_missing_last_and_keeps_ties_in_row_order(listing):
+    assert listing.ordered({}, "total_cost").tolist() == [4, 2, 0, 3, 1, 5]
+    assert listing.ordered({}, "-total_cost").tolist() == [0, 3, 2, 4, 1, 5]
+
+
+def test_text_sort_is_case_insensitive_with_empty_last(listing):
+    assert listing.ordered({}, "intervention_name").tolist() == [1, 4, 0, 2, 5, 3]
+    assert listing.ordered({}, "-intervention_name").tolist() == [5, 2, 0, 1, 4, 3]
+
+
+def test_filtered_order_is_the_permutation_restricted_to_matches(listing):
+    assert listing.ordered({"countries": ["Italy"]}, "total_cost").tolist() == [2, 0, 5]
+    assert listing.ordered({"countries": ["Italy"]}, None).tolist() == [0, 2, 5]
+    assert listing.ordered({"countries": ["Nowhere"]}, "total_cost").tolist() == []
+
+
+def test_pages_concatenate_to_the_full_order(listing):
+    filters, sort = {"countries": ["Italy", "France"]}, "-total_cost"
+    full = listing.ordered(filters, sort).tolist()
+    seen, offset = [], 0
+    while True:
+        rows, total = listing.page(filters, sort, offset, 2)
+        assert total == len(full)
+        if not len(rows):
+            break
+        seen += rows.tolist()
+        offset += len(rows)
+    assert seen == full
+
+
+def test_unknown_sort_column(listing):
+    with pytest.raises(ValueError):
+        listing.ordered({}, "budget")
+    assert listing.stats()["size"] == 0
+
+
+def test_orderings_are_memoized(listing):
+    first = listing.ordered({"countries": ["France", "Italy"]}, "country")
+    assert listing.ordered({"countries": ["Italy", "France"]}, "country") is first
+    assert listing.stats()["hits"] == 1
+
+
+def test_cursor_round_trip_and_stability():
+    filters, sort = {"countries": ["Italy"]}, "-total_cost"
+    cursor = encode_cursor("v1", filters, sort, 40)
+    assert decode_cursor(cursor, "v1", filters, sort) == 40
+    # equivalent filters share a cursor
+    assert decode_cursor(cursor, "v1", {"countries": ["Italy"], "cities": []}, sort) == 40
+    assert encode_cursor("v1", filters, sort, 40) == cursor
+
+
+@pytest.mark.parametrize("version, filters, sort", [
+    ("v2", {"countries": ["Italy"]}, "-total_cost"),  # the dataset was reloaded
+    ("v1", {"countries": ["France"]}, "-total_cost"),
+    ("v1", {"countries": ["Italy"]}, "total_cost"),
+])
+def test_cursor_rejects_another_query_or_version(version, filters, sort):
+    cursor = encode_cursor("v1", {"countries": ["Italy"]}, "-total_cost", 40)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, version, filters, sort)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "e30", "eyJvIjoieCJ9"])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ValueError, match="Malformed"):
+        decode_cursor(cursor, "v1", {}, None)
@@ -0,0 +1,82 @@
+"""CityCube pies equal assets/js/mapVis.js::localCityPies (ported below) over the filtered rows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommenderSystem.mapcube import PIE_METRICS, CityCube
+from recommenderSystem.query import FilterIndex, filter_signature
+
+PLACES = [("Berlin", "Germany"), ("Paris", "France"), ("Milan", "Italy"), ("Atlantis", "Nowhere"), ("", "")]
+
+
+def local_city_pies(records, coordinates, metric):
+    """mapVis.js::localCityPies over d3.csv-style records ("" for missing)."""
+    groups = {}
+    for d in records:
+        groups.setdefault((d["city"], d["country"]), []).append(d)
+    cities = []
+    for (city, country), projects in groups.items():
+        coords = next((c for c in coordinates if c["city"] == city and c["country"] == country), None)
+        if coords is None:
+            continue
+        slices = {}
+        for p in projects:
+            key = p[metric] or "Unknown"
+            slices[key] = slices.get(key, 0) + 1
+        cities.append({
+            "city": city, "country": country, "count": len(projects),
+            "latitude": float(coords["latitude"]), "longitude": float(coords["longitude"]),
+            "slices": [{"key": k, "value": v} for k, v in slices.items()],
+        })
+    categories = list(dict.fromkeys(s["key"] for c in cities for s in c["slices"]))
+    return {"cities": cities, "categories": categories}
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(5)
+    n = 300
+    places = [PLACES[i] for i in rng.integers(0, len(PLACES), n)]
+    df = pd.DataFrame({
+        "city": [p[0] for p in places],
+        "country": [p[1] for p in places],
+        "begin_year": rng.integers(2000, 2020, n),
+        **{m: rng.choice(["a", "b", "c; d", "", None], n) for m in PIE_METRICS},
+    })
+    coordinates = pd.DataFrame({
+        "city": ["Paris", "Berlin", "Milan", "Paris"],
+        "country": ["France", "Germany", "Italy", "France"],
+        "latitude": [48.86, 52.52, 45.46, 0.0],  # duplicates: the first entry wins, as with Array.find
+        "longitude": [2.35, 13.40, 9.19, 0.0],
+    })
+    return df, FilterIndex(df), CityCube(df, coordinates), coordinates.to_dict("records")
+
+
+@pytest.mark.parametrize("metric", PIE_METRICS)
+@pytest.mark.parametrize("filters", [{}, {"startYear": 2012}, {"countries": ["France"]}, {"countries": ["Nowhere"]}])
+def test_matches_local_city_pies(data, metric, filters):
+    df, index, cube, coordinates = data
+    mask = index.mask(filters)
+    records = df[mask].astype(object).where(df[mask].notna(), "").to_dict("records")
+    result = cube.pies(metric, mask, filter_signature(filters))
+    assert result["metric"] == metric
+    assert {k: result[k] for k in ["cities", "categories"]} == local_city_pies(records, coordinates, metric)
+
+
+def test_pies_are_memoized_per_signature(data):
+    _, index, cube, _ = data
+    mask = index.mask({"startYear": 2015})
+    first = cube.pies("nbs_type", mask, filter_signature({"startYear": 2015}))
+    assert cube.pies("nbs_type", mask, filter_signature({"startYear": 2015.0})) is first
+
+
+def test_unknown_metric(data):
+    _, index, cube, _ = data
+    with pytest.raises(ValueError):
+        cube.pies("country", index.mask({}), "{}")
+
+
+def test_without_coordinates_nothing_is_drawn():
+    df = pd.DataFrame({"city": ["Paris"], "country": ["France"], "nbs_type": ["a"]})
+    cube = CityCube(df, None)
+    assert cube.pies("nbs_type", np.ones(1, dtype=bool), "{}") == {"metric": "nbs_type", "categories": [], "cities": []}
@@ -0,0 +1,76 @@
+"""Prometheus text rendering of counters, histograms and callbacks."""
+import os
+from pathlib import Path
+
+import pytest
+
+from recommenderSystem.metrics import Registry
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "assets" / "data" / "cleaned.csv"
+
+
+def _lines(registry):
+    return registry.render().splitlines()
+
+
+def test_counter_with_labels():
+    registry = Registry()
+    requests = registry.counter("nbs_requests_total", "Requests.", labels=("route",))
+    requests.inc(route="/api/query")
+    requests.inc(2, route='/api/"x"\n')
+    assert registry.counter("nbs_requests_total", "again") is requests
+    assert _lines(registry) == [
+        "# HELP nbs_requests_total Requests.",
+        "# TYPE nbs_requests_total counter",
+        'nbs_requests_total{route="/api/\\"x\\"\\n"} 2',
+        'nbs_requests_total{route="/api/query"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    seconds = registry.histogram("nbs_seconds", "Latency.", buckets=(0.1, 1))
+    for v in [0.05, 0.1, 0.5, 3]:
+        seconds.observe(v)
+    assert _lines(registry)[2:] == [
+        'nbs_seconds_bucket{le="0.1"} 2',
+        'nbs_seconds_bucket{le="1"} 3',
+        'nbs_seconds_bucket{le="+Inf"} 4',
+        "nbs_seconds_sum 3.65",
+        "nbs_seconds_count 4",
+    ]
+
+
+def test_callbacks_are_read_at_render_time():
+    registry = Registry()
+    sizes = {("a",): 3}
+    registry.callback("nbs_size", "Size.", lambda: sizes, labels=("dataset",))
+    registry.callback("nbs_hits_total", "Hits.", lambda: 1.5, type="counter")
+    registry.callback("nbs_none", "Nothing yet.", lambda: None)
+    registry.callback("nbs_broken", "Raises.", lambda: 1 / 0)
+    sizes[("b",)] = 4
+    assert _lines(registry) == [
+        "# HELP nbs_size Size.",
+        "# TYPE nbs_size gauge",
+        'nbs_size{dataset="a"} 3',
+        'nbs_size{dataset="b"} 4',
+        "# HELP nbs_hits_total Hits.",
+        "# TYPE nbs_hits_total counter",
+        "nbs_hits_total 1.5",
+        "# HELP nbs_none Nothing yet.",
+        "# TYPE nbs_none gauge",
+    ]
+
+
+def test_server_renders_the_per_dataset_memo_counters():
+    if not DATA_PATH.exists():
+        pytest.skip("needs assets/data/cleaned.csv (run data_cleaning.py)")
+    os.environ.setdefault("NBS_FEATURE_STORE", "")
+    from fastapi.testclient import TestClient
+
+    from recommenderSystem import server
+
+    response = TestClient(server.app).get("/metrics")
+    assert response.status_code == 200
+    for name in ["nbs_aggregates_memo_hits", "nbs_listing_memo_hits", "nbs_map_memo_hits", "nbs_model_cache_hits_total"]:
+        assert f'{name}{{dataset="cleaned"}} ' in response.text
@@ -0,0 +1,78 @@
+"""The vectorized fit encodes every row as the per-row loops it replaced did."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_nbs_frame
+from recommenderSystem.model import SimpleNBSRecommender, _explode_multivalue, _split_multivalue
+
+
+@pytest.fixture(scope="module")
+def df():
+    df = synthetic_nbs_frame(400, seed=4)
+    rng = np.random.default_rng(4)
+    messy = ["EU funds, Public national budget", "Private\nEU funds", "Unknown", " ", None, "EU funds;;Private ; EU funds"]
+    picked = rng.random(len(df)) < 0.3
+    df.loc[picked, "sources_of_funding"] = rng.choice(np.array(messy, dtype=object), picked.sum())
+    df.loc[rng.random(len(df)) < 0.1, "country"] = None
+    df.loc[rng.random(len(df)) < 0.1, "total_cost"] = np.nan
+    return df
+
+
+def _naive_rows(model, df):
+    """Dense feature rows as the per-row encoder built them: numeric, one-hot categoricals, funding multi-hot."""
+    parts = []
+    for c in model.numeric_cols:
+        if c == "duration":
+            x = (pd.to_numeric(df["end_year"], errors="coerce") - pd.to_numeric(df["begin_year"], errors="coerce")).astype(float)
+        else:
+            x = pd.to_numeric(df[c], errors="coerce")
+        x = x.fillna(x.median()).to_numpy(dtype=float)
+        if c != "duration":
+            x = np.log1p(np.clip(x, 0, None))
+        parts.append(((x - x.mean()) / (x.std() or 1.0)).reshape(-1, 1))
+    for c in model.categorical_cols:
+        levels = sorted(df[c].fillna("Unknown").astype(str).unique().tolist())
+        index = {lvl: j for j, lvl in enumerate(levels)}
+        block = np.zeros((len(df), len(levels)))
+        for i, v in enumerate(df[c].fillna("Unknown").astype(str)):
+            block[i, index[v]] = 1.0
+        parts.append(block)
+    if model.use_funding:
+        tags = df["sources_of_funding"].apply(_split_multivalue)
+        vocab = sorted({t for row in tags for t in row})
+        index = {t: j for j, t in enumerate(vocab)}
+        block = np.zeros((len(df), len(vocab)))
+        for i, row in enumerate(tags):
+            for t in row:
+                block[i, index[t]] = 1.0
+        parts.append(block)
+    return np.hstack(parts)
+
+
+@pytest.mark.parametrize("features", [None, ["country", "sources_of_funding"], ["duration", "total_cost", "status"]])
+def test_encoding_matches_the_row_by_row_encoder(df, features):
+    model = SimpleNBSRecommender().fit(df, features)
+    np.testing.assert_allclose(model._take_rows(np.arange(len(df))), _naive_rows(model, df), rtol=1e-6, atol=1e-6)
+
+
+def test_explode_matches_split(df):
+    rows, codes, vocab = _explode_multivalue(df["sources_of_funding"])
+    pairs = sorted(zip(rows.tolist(), [vocab[c] for c in codes.tolist()]))
+    expected = sorted({(i, t) for i, v in enumerate(df["sources_of_funding"]) for t in _split_multivalue(v)})
+    assert pairs == expected
+    assert vocab == sorted(vocab)
+
+
+def test_fit_with_previous_levels_scores_the_same(df):
+    base = SimpleNBSRecommender().fit(df.iloc[:300])
+    appended = SimpleNBSRecommender().fit(df, levels=base.levels())
+    fresh = SimpleNBSRecommender().fit(df)
+    # earlier levels keep their columns, new ones follow
+    for feature, levels in base.levels().items():
+        assert appended.levels()[feature][:len(levels)] == levels
+    preferences = {"country": df["country"].dropna().iloc[0], "total_cost": 1e5, "sources_of_funding": "EU funds"}
+    a = appended.recommend(preferences, n_results=10, exact=True)
+    b = fresh.recommend(preferences, n_results=10, exact=True)
+    assert a.index.tolist() == b.index.tolist()
+    np.testing.assert_allclose(a["similarity"], b["similarity"], rtol=1e-6)
@@ -0,0 +1,126 @@
+"""ComputePool bounds (Overloaded / ComputeTimeout) and the 503 / 504 they become on /api/recommend."""
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from recommenderSystem.offload import ComputePool, ComputeTimeout, Overloaded
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "assets" / "data" / "cleaned.csv"
+
+
+async def _hold(pool: ComputePool, release: threading.Event) -> asyncio.Task:
+    """Occupy one pool slot until `release` is set."""
+    task = asyncio.ensure_future(pool.run(release.wait))
+    await asyncio.sleep(0)  # let it take its slot
+    return task
+
+
+def test_runs_jobs_and_propagates_errors():
+    pool = ComputePool(workers=2, queue_size=0)
+
+    async def main():
+        assert await pool.run(sum, [1, 2, 3]) == 6
+        with pytest.raises(ZeroDivisionError):
+            await pool.run(lambda: 1 / 0)
+
+    asyncio.run(main())
+    assert pool.stats()["completed"] == 2
+    assert pool.stats()["in_flight"] == 0
+    pool.shutdown()
+
+
+def test_refuses_work_beyond_workers_plus_queue():
+    pool = ComputePool(workers=1, queue_size=1, timeout=None)
+    release = threading.Event()
+
+    async def main():
+        running = await _hold(pool, release)
+        queued = await _hold(pool, release)
+        with pytest.raises(Overloaded):
+            await pool.run(sum, [1])
+        release.set()
+        await asyncio.gather(running, queued)
+        assert await pool.run(sum, [1]) == 1  # slots are free again
+
+    asyncio.run(main())
+    assert pool.stats()["rejected"] == 1
+    pool.shutdown()
+
+
+def test_timeout_gives_up_the_request_but_keeps_the_slot():
+    pool = ComputePool(workers=1, queue_size=0, timeout=0.05)
+    release = threading.Event()
+
+    async def main():
+        with pytest.raises(ComputeTimeout):
+            await pool.run(release.wait)
+        # the abandoned job still runs, so it still holds its slot
+        assert pool.stats()["in_flight"] == 1
+        with pytest.raises(Overloaded):
+            await pool.run(sum, [1])
+        release.set()
+        for _ in range(100):
+            if pool.stats()["in_flight"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await pool.run(sum, [1]) == 1
+
+    asyncio.run(main())
+    assert pool.stats()["timeouts"] == 1
+    pool.shutdown()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    if not DATA_PATH.exists():
+        pytest.skip("needs assets/data/cleaned.csv (run data_cleaning.py)")
+    os.environ.setdefault("NBS_FEATURE_STORE", "")
+    from fastapi.testclient import TestClient
+
+    from recommenderSystem import server
+
+    def use_pool(**options):
+        pool = ComputePool(**options)
+        monkeypatch.setattr(server, "COMPUTE", pool)
+        return pool
+
+    return TestClient(server.app), use_pool
+
+
+def _occupy(pool: ComputePool, release: threading.Event) -> threading.Thread:
+    """Hold a pool slot from another thread (its own event loop) until `release` is set."""
+    async def hold():
+        try:
+            await pool.run(release.wait)
+        except ComputeTimeout:
+            pass
+
+    thread = threading.Thread(target=asyncio.run, args=(hold(),), daemon=True)
+    thread.start()
+    while pool.stats()["in_flight"] == 0:
+        time.sleep(0.01)
+    return thread
+
+
+@pytest.mark.parametrize("queue_size, status", [(0, 503), (1, 504)])
+def test_recommend_maps_a_full_or_slow_pool_to_503_504(client, queue_size, status):
+    http, use_pool = client
+    pool = use_pool(workers=1, queue_size=queue_size, timeout=0.2)
+    release = threading.Event()
+    thread = _occupy(pool, release)
+    try:
+        response = http.post("/api/recommend", json={"preferences": {}})
+    finally:
+        release.set()
+        thread.join()
+    assert response.status_code == status
+    if status == 503:
+        assert response.headers["retry-after"] == "1"
+    pool.shutdown()
+
+    use_pool(workers=1, queue_size=0, timeout=None)
+    assert http.post("/api/recommend", json={"preferences": {}}).status_code == 200
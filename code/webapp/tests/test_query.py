@@ -0,0 +1,182 @@
+"""
+FilterIndex answers the filters exactly like assets/js/filters.js::applyFilters
+(ported below row by row, on values as d3.csv hands them over: strings, "" for missing).
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommenderSystem.query import FilterIndex, filter_signature, normalize_filters
+
+COUNTRIES = ["Germany", "France", "Italy", "", "Unknown"]
+CITIES = ["Berlin", "Paris", "Milan", "Rome", ""]
+AREAS = ["Residential", "Industrial", "Waterfront", "Unknown", ""]
+FUNDING = ["EU funds", "Public national budget", "Unknown", ""]
+TAGS = ["Green roofs", "Parks", "Rain gardens", "Wetlands"]
+
+
+def _tags(rng, n):
+    out = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.1:
+            out.append("")
+        elif r < 0.2:
+            out.append("Unknown")
+        else:
+            picked = rng.choice(TAGS, size=rng.integers(1, 4), replace=False)
+            out.append("; ".join(picked) if rng.random() < 0.5 else ";".join(picked))
+    return out
+
+
+def _frame(n=400, seed=3):
+    rng = np.random.default_rng(seed)
+    begin = rng.integers(1995, 2025, n).astype(float)
+    begin[rng.random(n) < 0.05] = np.nan
+    area = np.round(rng.lognormal(8, 2, n))
+    area[rng.random(n) < 0.1] = np.nan
+    cost = np.round(rng.lognormal(12, 2, n))
+    cost[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        "intervention_name": [f"Project {i} {rng.choice(['green', 'blue', 'St. Anna'])}" for i in range(n)],
+        "country": rng.choice(COUNTRIES, n),
+        "city": rng.choice(CITIES, n),
+        "begin_year": begin,
+        "end_year": begin + rng.integers(0, 10, n),
+        "nbs_area": area,
+        "total_cost": cost,
+        "previous_area_type": rng.choice(AREAS, n),
+        "nbs_type": _tags(rng, n),
+        "sources_of_funding": rng.choice(FUNDING, n),
+        "environmental_impacts": _tags(rng, n),
+        "economic_impacts": _tags(rng, n),
+    })
+
+
+def _number(s: str) -> float:
+    """JavaScript's unary +."""
+    s = s.strip()
+    if s == "":
+        return 0.0
+    try:
+        return float(s)
+    except ValueError:
+        return math.nan
+
+
+def _has_tag(value: str, selected: set) -> bool:
+    if not value or value == "Unknown":
+        return False
+    return any(t.strip() in selected for t in value.split(";"))
+
+
+def apply_filters(records, f):
+    """filters.js::applyFilters (substring search branch) over d3.csv-style records."""
+    out = []
+    for i, d in enumerate(records):
+        if f["search"]:
+            text = " ".join(d[c] for c in ["intervention_name", "country", "city", "nbs_type", "previous_area_type", "sources_of_funding"] if d[c]).lower()
+            if f["search"] not in text:
+                continue
+        if f["countries"] and d["country"] not in f["countries"]:
+            continue
+        if f["cities"] and d["city"] not in f["cities"]:
+            continue
+        if f["startYear"] is not None and not _number(d["begin_year"]) >= f["startYear"]:
+            continue
+        if f["endYear"] is not None and not _number(d["end_year"]) <= f["endYear"]:
+            continue
+        if f["nbsArea"] and f["nbsArea"][0] is not None:
+            v = _number(d["nbs_area"])
+            if not (v >= f["nbsArea"][0] and v <= f["nbsArea"][1]):
+                continue
+        if f["previousArea"] and d["previous_area_type"] not in f["previousArea"]:
+            continue
+        if f["nbsType"] and not _has_tag(d["nbs_type"], f["nbsType"]):
+            continue
+        if f["totalCost"] and f["totalCost"][0] is not None:
+            v = _number(d["total_cost"])
+            if math.isnan(v) or not (v >= f["totalCost"][0] and v <= f["totalCost"][1]):
+                continue
+        if f["funding"] and not (d["sources_of_funding"] and d["sources_of_funding"] != "Unknown" and d["sources_of_funding"] in f["funding"]):
+            continue
+        if f["envImpacts"] and not _has_tag(d["environmental_impacts"], f["envImpacts"]):
+            continue
+        if f["econImpacts"] and not _has_tag(d["economic_impacts"], f["econImpacts"]):
+            continue
+        out.append(i)
+    return out
+
+
+def _js_filters(**active):
+    """window.filters (assets/js/state.js) with some filters set."""
+    f = {
+        "search": "", "countries": set(), "cities": set(), "startYear": None, "endYear": None,
+        "nbsArea": [None, None], "previousArea": set(), "nbsType": set(), "totalCost": [None, None],
+        "funding": set(), "envImpacts": set(), "econImpacts": set(),
+    }
+    f.update(active)
+    return f
+
+
+def _payload(f):
+    """The JSON body filtersPayload() sends."""
+    return {k: sorted(v) if isinstance(v, set) else v for k, v in f.items()}
+
+
+@pytest.fixture(scope="module")
+def data():
+    df = _frame()
+    csv = df.astype(object).where(df.notna(), "")
+    for c in ["begin_year", "end_year", "nbs_area", "total_cost"]:
+        csv[c] = [("" if v == "" else f"{v:g}") for v in csv[c]]
+    return FilterIndex(df), csv.to_dict("records")
+
+
+CASES = [
+    {},
+    {"search": "green"},
+    {"search": "st. anna"},
+    {"countries": {"Germany", "France"}},
+    {"countries": {"Unknown"}},
+    {"cities": {"Berlin"}, "countries": {"Germany"}},
+    {"startYear": 2010},
+    {"endYear": 2015},
+    {"startYear": 2005, "endYear": 2020},
+    {"nbsArea": [100, 5000]},
+    {"totalCost": [10_000, 1_000_000]},
+    {"previousArea": {"Residential", "Unknown"}},
+    {"nbsType": {"Green roofs"}},
+    {"nbsType": {"Parks", "Wetlands"}, "envImpacts": {"Rain gardens"}},
+    {"funding": {"EU funds", "Unknown"}},
+    {"econImpacts": {"Unknown"}},
+    {"search": "project 1", "countries": {"Italy"}, "totalCost": [0, 1e12], "nbsType": {"Parks"}},
+]
+
+
+@pytest.mark.parametrize("active", CASES, ids=[filter_signature(_payload(_js_filters(**c))) for c in CASES])
+def test_matches_apply_filters(data, active):
+    index, records = data
+    f = _js_filters(**active)
+    assert index.rows(_payload(f)).tolist() == apply_filters(records, f)
+
+
+def test_mask_and_rows_agree(data):
+    index, _ = data
+    filters = _payload(_js_filters(countries={"Germany"}, startYear=2000))
+    assert np.flatnonzero(index.mask(filters)).tolist() == index.rows(filters).tolist()
+
+
+def test_equivalent_filters_share_a_signature():
+    a = {"countries": ["France", "Germany"], "search": " Green ", "nbsArea": [500, 10]}
+    b = {"countries": ["Germany", "France", "Germany"], "search": "green", "nbsArea": [10, 500], "cities": []}
+    assert normalize_filters(a) == normalize_filters(b)
+    assert filter_signature(a) == filter_signature(b)
+
+
+def test_rejects_non_numbers(data):
+    index, _ = data
+    with pytest.raises(ValueError):
+        index.rows({"startYear": "soon"})
@@ -0,0 +1,104 @@
+"""DatasetRegistry: discovery, lazy loading and LRU eviction under the memory budget."""
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_nbs_frame
+from recommenderSystem.registry import DatasetLoadError, DatasetRegistry, UnknownDataset, discover
+
+# no background neighbour graph, so a dataset's size does not change while a test runs
+OPTIONS = {"neighbour_max_rows": 0}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for i, name in enumerate(["a", "b", "c"]):
+        synthetic_nbs_frame(200, seed=i).to_csv(directory / f"{name}.csv", index=False)
+    pd.DataFrame({"city": ["Paris"], "country": ["France"], "latitude": [48.86], "longitude": [2.35]}).to_csv(
+        tmp_path / "coordinates.csv", index=False
+    )
+    return directory
+
+
+def _registry(data_dir, budget=0, **options):
+    sources = discover(data_dir, coordinates=data_dir.parent / "coordinates.csv")
+    return DatasetRegistry(sources, default="a", memory_budget=budget, **{**OPTIONS, **options})
+
+
+def test_discover(data_dir):
+    (data_dir / "a.xlsx").touch()
+    (data_dir / "b.coordinates.csv").write_text("city,country,latitude,longitude\n")
+    (data_dir / "b.snapshot").mkdir()
+    (data_dir / "-hidden.csv").touch()
+    sources = discover(data_dir, coordinates=data_dir.parent / "coordinates.csv")
+    assert sorted(sources) == ["a", "b", "c"]
+    assert sources["a"].path.suffix == ".csv"  # a .csv wins over an .xlsx of the same name
+    assert sources["a"].coordinates == data_dir.parent / "coordinates.csv"
+    assert sources["b"].coordinates == data_dir / "b.coordinates.csv"
+    assert sources["b"].snapshot == data_dir / "b.snapshot"
+    assert sources["a"].snapshot is None
+    assert discover(data_dir / "missing") == {}
+
+
+def test_loads_lazily_and_once(data_dir):
+    registry = _registry(data_dir)
+    assert registry.loaded() == {}
+    manager = registry.get()
+    assert registry.get("a") is manager
+    assert list(registry.loaded()) == ["a"]
+    assert registry.loads == 1
+    assert len(registry.state("a").df) == 200
+
+
+def test_unknown_and_broken_datasets(data_dir):
+    registry = _registry(data_dir)
+    with pytest.raises(UnknownDataset):
+        registry.get("nope")
+    (data_dir / "c.csv").write_text("not,a\nnbs,table\n")
+    with pytest.raises(DatasetLoadError):
+        registry.get("c")
+    assert registry.load_failures == 1
+    assert "c" not in registry.loaded()
+
+
+def test_evicts_least_recently_used_past_the_budget(data_dir):
+    size = _registry(data_dir).get("a").nbytes()
+    registry = _registry(data_dir, budget=int(size * 2.5))
+    for name in ["a", "b", "c"]:
+        registry.get(name)
+    assert list(registry.loaded()) == ["b", "c"]
+    registry.get("b")  # now c is the least recently used
+    registry.get("a")
+    assert list(registry.loaded()) == ["b", "a"]
+    assert registry.evictions == 2
+    assert registry.nbytes() <= registry.memory_budget
+
+
+def test_a_dataset_larger_than_the_budget_is_served_alone(data_dir):
+    registry = _registry(data_dir, budget=1)
+    registry.get("a")
+    manager = registry.get("b")
+    assert list(registry.loaded()) == ["b"]
+    assert manager.current is not None
+
+
+def test_no_budget_keeps_everything(data_dir):
+    registry = _registry(data_dir)
+    for name in ["a", "b", "c"]:
+        registry.get(name)
+    assert list(registry.loaded()) == ["a", "b", "c"]
+    assert registry.evictions == 0
+
+
+def test_reload_that_grows_a_dataset_applies_the_budget(data_dir):
+    size = _registry(data_dir).get("a").nbytes()
+    registry = _registry(data_dir, budget=int(size * 2.5))
+    registry.get("a")
+    manager = registry.get("b")
+    assert list(registry.loaded()) == ["a", "b"]
+
+    synthetic_nbs_frame(600, seed=1).to_csv(data_dir / "b.csv", index=False)
+    manager.reload(wait=True)
+    assert manager.current.generation == 2
+    assert list(registry.loaded()) == ["b"]
@@ -0,0 +1,56 @@
+"""
+/api/search matches the rows the "search" filter (applyFilters' substring scan)
+keeps. Run from code/webapp: python -m pytest -q tests
+"""
+import pandas as pd
+import pytest
+
+from recommenderSystem.query import FilterIndex
+from recommenderSystem.search import SearchIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    df = pd.DataFrame({
+        "intervention_name": ["Green roof St. Anna", "Stadtpark renewal", "Rain garden", "Tree planting S.p.A. pilot", "Istanbul street trees"],
+        "city": ["Vienna", "Hamburg", "Paris", "Milan", "İzmir"],
+        "country": ["Austria", "Germany", "France", "Italy", "Turkey"],
+        "nbs_type": ["green roof", "park", "rain garden", "street trees", "street trees"],
+        "previous_area_type": ["roof", "park", "street", "street", "street"],
+        "sources_of_funding": ["public", "public", "private", "public, private", "public"],
+        "short_description": ["A roof.", "Parks, ponds and paths.", "", "Trees on the high street.", "st. trees"],
+    })
+    filters = FilterIndex(df)
+    return filters, SearchIndex(df, filters)
+
+
+@pytest.mark.parametrize("query", ["st. ", "s.p.a", "s.p.a. pilot", "pilot s.p.a.", "İ", "green roof", "public, private", "green", "stadt", "tree", "x", "-"])
+def test_matches_substring_filter(index, query):
+    filters, search = index
+    expected = filters.rows({"search": query}).tolist()
+    result = search.search(query)
+    if result is None:  # no word of MIN_TERM_LENGTH: callers run the substring filter themselves
+        return
+    assert sorted(result[0].tolist()) == expected
+
+
+def test_short_words_are_not_looked_up(index):
+    _, search = index
+    assert search.scores("s.p.a") is None
+    assert search.scores("İ") is None
+    assert search.scores("a b") is None
+
+
+def test_punctuation_needs_the_query_as_typed(index):
+    _, search = index
+    assert search.search("st. ")[0].tolist() == [0]
+    assert search.search("s.p.a. pilot")[0].tolist() == [3]
+    assert search.search("pilot s.p.a.")[0].tolist() == []
+    assert sorted(search.search("st. ", description=True)[0].tolist()) == [0, 4]
+
+
+def test_words_match_in_any_field(index):
+    _, search = index
+    rows, scores = search.search("street")
+    assert sorted(rows.tolist()) == [2, 3, 4]
+    assert (scores > 0).all()
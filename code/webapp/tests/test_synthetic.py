@@ -0,0 +1,48 @@
+"""The synthetic benchmark tables: cleaned.csv schema, deterministic per seed."""
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from benchmarks.synthetic import CLEANED_COLUMNS, COST_RANGES, FUNDING_TAGS, STATUS_SHARES, synthetic_nbs_frame, synthetic_raw_export
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "assets" / "data" / "cleaned.csv"
+
+
+@pytest.fixture(scope="module")
+def df():
+    return synthetic_nbs_frame(2000, seed=1)
+
+
+def test_columns_follow_cleaned_csv(df):
+    assert list(df.columns) == CLEANED_COLUMNS
+    if DATA_PATH.exists():
+        assert list(pd.read_csv(DATA_PATH, nrows=0).columns) == CLEANED_COLUMNS
+    for c in ["begin_year", "end_year", "total_cost"]:
+        assert pd.api.types.is_integer_dtype(df[c])
+    assert pd.api.types.is_float_dtype(df["nbs_area"])
+
+
+def test_deterministic_per_seed(df):
+    assert_frame_equal(synthetic_nbs_frame(2000, seed=1), df)
+    assert not synthetic_nbs_frame(2000, seed=2)["country"].equals(df["country"])
+
+
+def test_values_look_like_the_export(df):
+    assert (df["end_year"] >= df["begin_year"]).all()
+    assert set(df["status"]) <= set(STATUS_SHARES)
+    assert (df.groupby("city")["country"].nunique() == 1).all()  # a city lies in one country
+    tags = {t for cell in df["sources_of_funding"] if cell != "Unknown" for t in cell.split("\n")}
+    assert tags <= set(FUNDING_TAGS)
+    assert (df["total_cost"] >= 10_000).all()
+
+
+def test_raw_export_has_the_worksheet_layout():
+    raw = synthetic_raw_export(300, seed=1)
+    assert "Duration" in raw.columns and "Begin" not in raw.columns
+    assert not {"intervention_name", "begin_year", "total_cost"} & set(raw.columns)
+    assert set(raw["Total cost"]) <= set(COST_RANGES) | {"Unknown"}
+    known = raw["Duration"] != "Unknown"
+    begin, end = raw.loc[known, "Duration"].str.split(" - ", expand=True).astype(int).T.to_numpy()
+    assert (end >= begin).all()